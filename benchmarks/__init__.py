@@ -0,0 +1 @@
+# Benchmarks package for BentoML University Admission Service
@@ -0,0 +1,31 @@
+'''
+Load benchmark comparing the single-row predict endpoint with the adaptive
+micro-batching predict_adaptive endpoint. Requests rotate through distinct applicants, so
+they reach the model instead of the prediction cache. Start the API first (make start_api).
+'''
+import argparse
+import asyncio
+import json
+from benchmarks.common import fetch_auth_headers, run_http_load, sample_inputs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare predict and predict_adaptive under concurrent load.')
+    parser.add_argument('--url', default='http://localhost:3000', help='Base URL of the running service.')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 64])
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per run.')
+    args = parser.parse_args()
+
+    headers = fetch_auth_headers(args.url)
+    inputs = sample_inputs()
+    results = []
+    for concurrency in args.concurrency:
+        for endpoint, payload in (('predict', [{'input_data': i} for i in inputs]), ('predict_adaptive', [{'inputs': [i]} for i in inputs])):
+            summary = asyncio.run(run_http_load(f'{args.url}/{endpoint}', payload, concurrency, args.duration, headers))
+            results.append({'endpoint': endpoint, 'concurrency': concurrency, **summary})
+            print(f"{endpoint:<18} c={concurrency:<4} rps={summary['rps']:>9.1f} "
+                  f"p50={summary['p50_ms']:>7.2f}ms p99={summary['p99_ms']:>7.2f}ms errors={summary['errors']}")
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+'''
+In-process benchmark of UniversityAdmissionService.predict at realistic prediction cache hit
+rates, using the latest model in the BentoML model store (make train_model).
+'''
+import argparse
+import json
+import time
+import numpy as np
+from benchmarks.common import summarize
+from src.cache import PredictionCache
+from src.service import UniversityAdmissionService, InputModel, CACHE_SIZE, CACHE_TTL
+
+
+def random_profiles(rng: np.random.Generator, n: int) -> list[InputModel]:
+    '''Draw applicant profiles from the valid input grid'''
+    return [
+        InputModel(
+            gre_score=int(rng.integers(290, 341)), toefl_score=int(rng.integers(92, 121)),
+            university_rating=int(rng.integers(1, 6)), sop=float(rng.integers(2, 11) / 2),
+            lor=float(rng.integers(2, 11) / 2), cgpa=round(float(rng.uniform(6.8, 9.92)), 2),
+            research=int(rng.integers(0, 2))
+        )
+        for _ in range(n)
+    ]
+
+
+def run(service: UniversityAdmissionService, requests: list[InputModel]) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    for input_data in requests:
+        t = time.perf_counter()
+        service.predict(input_data)
+        latencies.append(time.perf_counter() - t)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure predict latency at several cache hit rates.')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--hit-rates', type=float, nargs='+', default=[0.0, 0.5, 0.8, 0.95])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    service = UniversityAdmissionService()
+    hot_profiles = random_profiles(rng, 200)
+    results = []
+    for hit_rate in args.hit_rates:
+        # Repeat a hot set of profiles with probability hit_rate, otherwise send a new profile
+        fresh = iter(random_profiles(rng, args.requests))
+        requests = [hot_profiles[rng.integers(len(hot_profiles))] if rng.random() < hit_rate else next(fresh) for _ in range(args.requests)]
+        for label, maxsize in (('no_cache', 0), ('cache', CACHE_SIZE)):
+            service.models.active.cache = PredictionCache(maxsize, CACHE_TTL)
+            for input_data in hot_profiles:
+                service.predict(input_data)
+            service.cache.hits = service.cache.misses = 0
+            summary = run(service, requests)
+            results.append({'target_hit_rate': hit_rate, 'mode': label, 'hit_rate': service.cache.stats()['hit_rate'], **summary})
+            print(f"hit_rate={hit_rate:<5} {label:<9} p50={summary['p50_ms'] * 1000:>8.1f}us p99={summary['p99_ms'] * 1000:>8.1f}us rps={summary['rps']:>9.0f}")
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
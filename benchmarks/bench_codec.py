@@ -0,0 +1,89 @@
+'''
+CPU per request of request decoding and response encoding: pydantic (the regular endpoints)
+against the fast codec (msgspec if installed, json otherwise). In-process by default. With
+--url and --pid, also loads /predict and /fast/predict on a running API and divides the
+server's CPU time (process tree of --pid) by the number of requests.
+'''
+import argparse
+import asyncio
+import json
+import time
+from pydantic import BaseModel
+from benchmarks.common import SAMPLE_INPUT, fetch_auth_headers, run_http_load, sample_inputs
+from src import fast_codec
+from src.features import input_to_row, inputs_to_matrix
+from src.service import InputModel
+
+
+class PredictBody(BaseModel):
+    '''Request model BentoML derives from predict's signature'''
+    input_data: InputModel
+
+
+class PredictBatchBody(BaseModel):
+    inputs: list[InputModel]
+
+
+def cpu_per_call(call, n: int) -> float:
+    '''Process CPU time per call, in microseconds.'''
+    call()
+    start = time.process_time()
+    for _ in range(n):
+        call()
+    return (time.process_time() - start) / n * 1e6
+
+
+def run_in_process(n: int, batch_rows: int) -> dict:
+    body = json.dumps({'input_data': SAMPLE_INPUT}).encode()
+    batch_body = json.dumps({'inputs': [SAMPLE_INPUT] * batch_rows}).encode()
+    results = {
+        'predict_pydantic_us': cpu_per_call(
+            lambda: json.dumps({'admission_chance': float(input_to_row(PredictBody.model_validate_json(body).input_data)[0, 0])}), n),
+        'predict_fast_us': cpu_per_call(lambda: fast_codec.encode_prediction(fast_codec.decode_predict(body)[0, 0]), n),
+        f'batch{batch_rows}_pydantic_us': cpu_per_call(lambda: inputs_to_matrix(PredictBatchBody.model_validate_json(batch_body).inputs), max(1, n // 10)),
+        f'batch{batch_rows}_fast_us': cpu_per_call(lambda: fast_codec.decode_predict_batch(batch_body), max(1, n // 10))
+    }
+    results['decoder'] = 'msgspec' if fast_codec.msgspec is not None else 'json'
+    return results
+
+
+def run_http(url: str, pid: int, concurrency: int, duration: float) -> dict:
+    import psutil
+
+    def server_cpu() -> float:
+        root = psutil.Process(pid)
+        return sum(sum(p.cpu_times()[:2]) for p in [root] + root.children(recursive=True))
+
+    headers = fetch_auth_headers(url)
+    # Distinct inputs, so the server CPU includes the model rather than prediction cache hits
+    payloads = [{'input_data': i} for i in sample_inputs()]
+    results = {}
+    for endpoint in ('predict', 'fast/predict'):
+        before = server_cpu()
+        summary = asyncio.run(run_http_load(f'{url}/{endpoint}', payloads, concurrency, duration, headers))
+        cpu_us = (server_cpu() - before) / max(1, summary['requests'] + summary['errors']) * 1e6
+        results[endpoint] = {**summary, 'server_cpu_us_per_request': cpu_us}
+        print(f"/{endpoint:<14} rps={summary['rps']:>9.1f} p50={summary['p50_ms']:>7.2f}ms "
+              f"p99={summary['p99_ms']:>7.2f}ms server_cpu={cpu_us:>7.1f}us/request")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare CPU per request of pydantic and the fast codec.')
+    parser.add_argument('--requests', type=int, default=20000, help='Calls per in-process measurement.')
+    parser.add_argument('--batch-rows', type=int, default=1000)
+    parser.add_argument('--url', default=None, help='Base URL of a running service for the HTTP comparison.')
+    parser.add_argument('--pid', type=int, default=None, help='PID of the bentoml serve process (with --url).')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    results = {'in_process': run_in_process(args.requests, args.batch_rows)}
+    for name, value in results['in_process'].items():
+        print(f'{name:<24} {value:>9.2f}' if isinstance(value, float) else f'{name:<24} {value:>9}')
+    if args.url and args.pid:
+        results['http'] = run_http(args.url, args.pid, args.concurrency, args.duration)
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
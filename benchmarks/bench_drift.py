@@ -0,0 +1,45 @@
+'''
+Request-path cost of drift monitoring: DriftMonitor.observe per single-row request, averaged
+over enough calls to include the batched binning (one fold per DRIFT_BUFFER_ROWS rows), and
+the cost of one fold and one score on their own. Runs in-process on synthetic rows.
+'''
+import argparse
+import json
+import time
+from benchmarks.bench_flat_forest import time_call
+from src.drift import DRIFT_BUFFER_ROWS, DriftMonitor, DriftReference
+from src.features import sample_rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure the per-request cost of drift monitoring.')
+    parser.add_argument('--requests', type=int, default=200000)
+    parser.add_argument('--max-overhead-us', type=float, default=None, help='Exit with status 1 above this amortized cost.')
+    args = parser.parse_args()
+
+    X = sample_rows(5000, seed=0)
+    reference = DriftReference.fit(X, X[:, 5] / 10)
+    rows = [X[i:i + 1] for i in range(len(X))]
+    predictions = [[float(x[0, 5] / 10)] for x in rows]
+
+    # Long interval: every fold is triggered by a full buffer, as under load
+    drift = DriftMonitor(reference, 'bench', interval=3600)
+    n = args.requests
+    start = time.perf_counter()
+    for i in range(n):
+        drift.observe(rows[i % len(rows)], predictions[i % len(rows)])
+    amortized_us = (time.perf_counter() - start) / n * 1e6
+
+    pending = [(rows[i], predictions[i]) for i in range(DRIFT_BUFFER_ROWS)]
+    results = {
+        'observe_amortized_us': amortized_us,
+        'fold_us': time_call(lambda: drift.fold(pending), 200),
+        'score_us': time_call(drift.score, 200),
+        'monitor_bytes': int(sum(counts.nbytes for counts in drift.counts) + sum(e.nbytes + s.nbytes for e, s in zip(reference.edges, reference.shares)))
+    }
+    print(json.dumps(results, indent=2))
+    if args.max_overhead_us is not None and amortized_us > args.max_overhead_us:
+        raise SystemExit(f'observe costs {amortized_us:.3f}us per request, above {args.max_overhead_us}us.')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+'''
+Cost of explanations against predictions: latency of AdmissionModel.explain and predict at
+batch sizes 1, 64 and 1024, their ratio, and how far baseline + contributions is from the
+prediction. Uses the latest model in the BentoML model store (make train_model).
+'''
+import argparse
+import json
+import bentoml
+import numpy as np
+from benchmarks.bench_flat_forest import time_call
+from src.features import sample_rows
+from src.service import load_engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare explanation and prediction latency.')
+    parser.add_argument('--model', default='university_admission_rf_model:latest')
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    model = load_engine(bentoml.models.get(args.model))
+    results = {}
+    for batch_size in (1, 64, 1024):
+        X = sample_rows(batch_size, seed=batch_size)
+        repeat = max(args.repeat // batch_size, 20)
+        predict = time_call(lambda: model.predict(X), repeat)
+        explain = time_call(lambda: model.explain(X), repeat)
+        predictions, _, _ = model.explain(X)
+        results[f'batch_{batch_size}'] = {
+            'predict': predict,
+            'explain': explain,
+            'explain_to_predict_p50': explain['p50_us'] / predict['p50_us'],
+            'max_abs_sum_error': float(np.abs(predictions - model.predict(X)).max())
+        }
+        print(f"batch={batch_size:<5} predict p50={predict['p50_us']:>9.1f}us explain p50={explain['p50_us']:>9.1f}us "
+              f"ratio={results[f'batch_{batch_size}']['explain_to_predict_p50']:>5.2f}")
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
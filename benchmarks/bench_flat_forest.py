@@ -0,0 +1,57 @@
+'''
+Microbenchmark of the flat-array forest engine against sklearn's RandomForestRegressor.predict,
+using the latest model in the BentoML model store (make train_model).
+'''
+import argparse
+import json
+import pickle
+import time
+import bentoml
+import numpy as np
+from src.service import load_engine
+
+
+def time_call(func, repeat: int) -> dict:
+    '''
+    Time repeated calls of `func` after a short warm-up.
+    Parameters:
+    - func: callable : The function to time.
+    - repeat: int : The number of timed calls.
+    Returns:
+    - dict : Median and p99 latency per call in microseconds.
+    '''
+    for _ in range(min(repeat, 10)):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return {'p50_us': float(np.percentile(samples, 50)), 'p99_us': float(np.percentile(samples, 99))}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare sklearn and flat-array forest inference.')
+    parser.add_argument('--model', default='university_admission_rf_model:latest')
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    bento_model = bentoml.models.get(args.model)
+    sklearn_model = bento_model.load_model()
+    flat_forest = load_engine(bento_model)
+
+    rng = np.random.default_rng(0)
+    results = {
+        'sklearn_pickle_bytes': len(pickle.dumps(sklearn_model)),
+        'flat_forest_bytes': flat_forest.nbytes
+    }
+    for batch_size in (1, 64, 1024):
+        X = rng.uniform(0, 1, size=(batch_size, flat_forest.feature.max() + 1))
+        repeat = max(args.repeat // batch_size, 20)
+        results[f'sklearn_batch_{batch_size}'] = time_call(lambda: sklearn_model.predict(X), repeat)
+        results[f'flat_forest_batch_{batch_size}'] = time_call(lambda: flat_forest.predict(X), repeat)
+        results[f'max_abs_diff_batch_{batch_size}'] = float(np.abs(sklearn_model.predict(X) - flat_forest.predict(X)).max())
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+'''
+Per-request cost of the hot-path instrumentation. A minimal endpoint timing the same stages
+as predict is driven through the ASGI interface with instrumentation disabled
+(ADMISSION_METRICS=0), enabled, and enabled with the slow-request profiler running. Exits
+with status 1 if the disabled mode adds more than --max-overhead-us over an endpoint
+without any stage timers.
+'''
+import argparse
+import asyncio
+import json
+import sys
+import time
+from starlette.responses import Response
+from benchmarks.common import summarize
+from src import instrumentation
+from src.instrumentation import InstrumentationMiddleware, stage
+
+PATH = '/predict'
+
+RESPONSE = Response('{"admission_chance":0.5}', media_type='application/json')
+
+
+async def plain_endpoint(scope, receive, send):
+    await RESPONSE(scope, receive, send)
+
+
+async def staged_endpoint(scope, receive, send):
+    with stage('features'):
+        pass
+    with stage('cache'):
+        pass
+    with stage('model'):
+        pass
+    await RESPONSE(scope, receive, send)
+
+
+async def run(app, requests: int) -> dict:
+    async def receive():
+        return {'type': 'http.request', 'body': b'{}', 'more_body': False}
+
+    async def send(message):
+        pass
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        scope = {'type': 'http', 'method': 'POST', 'path': PATH, 'raw_path': PATH.encode(), 'query_string': b'',
+                 'headers': [], 'scheme': 'http', 'server': ('test', 80), 'client': ('127.0.0.1', 1), 'root_path': ''}
+        t = time.perf_counter()
+        await app(scope, receive, send)
+        latencies.append(time.perf_counter() - t)
+    return {**summarize(latencies, time.perf_counter() - start), 'mean_us': sum(latencies) / len(latencies) * 1e6}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure the overhead of stage timing and the slow-request profiler.')
+    parser.add_argument('--requests', type=int, default=50000)
+    parser.add_argument('--max-overhead-us', type=float, default=2.0, help='Allowed mean overhead of disabled instrumentation.')
+    args = parser.parse_args()
+
+    modes = {
+        'no_instrumentation': (False, plain_endpoint),
+        'disabled': (False, staged_endpoint),
+        'enabled': (True, InstrumentationMiddleware(staged_endpoint, routes={PATH})),
+        'enabled_with_profiler': (True, InstrumentationMiddleware(staged_endpoint, routes={PATH}, profile_slow_ms=1000, profile_output='/dev/null'))
+    }
+    results = {}
+    for name, (enabled, app) in modes.items():
+        instrumentation.METRICS_ENABLED = enabled
+        results[name] = asyncio.run(run(app, args.requests))
+    modes['enabled_with_profiler'][1].profiler.stop()
+
+    baseline = results['no_instrumentation']['mean_us']
+    for result in results.values():
+        result['overhead_mean_us'] = result['mean_us'] - baseline
+    print(json.dumps(results, indent=2))
+
+    overhead = results['disabled']['overhead_mean_us']
+    if overhead > args.max_overhead_us:
+        print(f'Disabled instrumentation adds {overhead:.2f}us per request (limit {args.max_overhead_us}us).')
+        sys.exit(1)
+    print(f'Disabled instrumentation adds {overhead:.2f}us per request (limit {args.max_overhead_us}us): OK')
+
+if __name__ == "__main__":
+    main()
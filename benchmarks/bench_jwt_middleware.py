@@ -0,0 +1,79 @@
+'''
+Per-request overhead of JWT authentication: the previous BaseHTTPMiddleware implementation
+against the pure ASGI JWTAuthMiddleware with a cold and a warm verified-token cache. Requests
+are driven straight through the ASGI interface so client overhead does not hide the difference.
+'''
+import argparse
+import asyncio
+import json
+import time
+import jwt
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse, Response
+from benchmarks.common import summarize
+from src.jwt_middleware import JWTAuthMiddleware, VerifiedTokenCache, create_jwt_token, JWT_SECRET_KEY, JWT_ALGORITHM
+
+PATH = '/predict'
+
+
+class LegacyJWTAuthMiddleware(BaseHTTPMiddleware):
+    '''The middleware as it was before: BaseHTTPMiddleware, full jwt.decode on every request'''
+
+    async def dispatch(self, request, call_next):
+        if request.url.path == PATH:
+            token = request.headers.get('Authorization')
+            if not token:
+                return JSONResponse(status_code=401, content={'detail': 'Missing authentication token'})
+            try:
+                payload = jwt.decode(token.split()[1], JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+            except jwt.InvalidTokenError:
+                return JSONResponse(status_code=401, content={'detail': 'Invalid token'})
+            request.state.user = payload.get('sub')
+        return await call_next(request)
+
+
+async def endpoint(scope, receive, send):
+    await Response('{"admission_chance":0.5}', media_type='application/json')(scope, receive, send)
+
+
+async def run(app, token: str, requests: int) -> dict:
+    headers = [(b'authorization', f'Bearer {token}'.encode()), (b'content-type', b'application/json')]
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'{}', 'more_body': False}
+
+    async def send(message):
+        pass
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        scope = {'type': 'http', 'method': 'POST', 'path': PATH, 'raw_path': PATH.encode(), 'query_string': b'',
+                 'headers': headers, 'scheme': 'http', 'server': ('test', 80), 'client': ('127.0.0.1', 1), 'root_path': ''}
+        t = time.perf_counter()
+        await app(scope, receive, send)
+        latencies.append(time.perf_counter() - t)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure JWT authentication overhead per request.')
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    token = create_jwt_token('user123')
+    apps = {
+        'no_auth': endpoint,
+        'legacy_base_http_middleware': LegacyJWTAuthMiddleware(endpoint),
+        'asgi_cold_cache': JWTAuthMiddleware(endpoint, protected_paths={PATH}, token_cache=VerifiedTokenCache(maxsize=0)),
+        'asgi_warm_cache': JWTAuthMiddleware(endpoint, protected_paths={PATH})
+    }
+    results = {name: asyncio.run(run(app, token, args.requests)) for name, app in apps.items()}
+    baseline = results['no_auth']['p50_ms']
+    for result in results.values():
+        result['auth_overhead_p50_us'] = (result['p50_ms'] - baseline) * 1000
+    results['asgi_warm_cache']['hit_rate'] = apps['asgi_warm_cache'].token_cache.hit_rate()
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
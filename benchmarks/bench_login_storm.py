@@ -0,0 +1,41 @@
+'''
+Predict latency with and without a concurrent login storm. The storm sends logins for
+unknown users, which cost a full password hash each but never hit the per-user rate
+limit. Predicts rotate through distinct applicants, so they run the model rather than
+hit the prediction cache. Start the API first (make start_api).
+'''
+import argparse
+import asyncio
+import json
+from benchmarks.common import fetch_auth_headers, run_http_load, sample_inputs
+
+
+async def run(url: str, headers: dict, payloads: list[dict], concurrency: int, storm_concurrency: int, duration: float) -> dict:
+    predict = run_http_load(f'{url}/predict', payloads, concurrency, duration, headers)
+    if not storm_concurrency:
+        return {'predict': await predict}
+    storm = run_http_load(f'{url}/login', {'credentials': {'username': 'storm', 'password': 'storm'}}, storm_concurrency, duration)
+    predict_summary, storm_summary = await asyncio.gather(predict, storm)
+    # Rejected logins (401 or 503) are the expected outcome of the storm
+    return {'predict': predict_summary, 'login_attempts_per_sec': storm_summary['errors'] / duration}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure predict latency during a login storm.')
+    parser.add_argument('--url', default='http://localhost:3000', help='Base URL of the running service.')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent predict clients.')
+    parser.add_argument('--storm-concurrency', type=int, default=64, help='Concurrent login clients during the storm.')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per run.')
+    args = parser.parse_args()
+
+    headers = fetch_auth_headers(args.url)
+    payloads = [{'input_data': i} for i in sample_inputs()]
+    results = {}
+    for label, storm_concurrency in (('baseline', 0), ('login_storm', args.storm_concurrency)):
+        results[label] = asyncio.run(run(args.url, headers, payloads, args.concurrency, storm_concurrency, args.duration))
+        summary = results[label]['predict']
+        print(f"{label:<12} predict rps={summary['rps']:>9.1f} p50={summary['p50_ms']:>7.2f}ms p99={summary['p99_ms']:>7.2f}ms errors={summary['errors']}")
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
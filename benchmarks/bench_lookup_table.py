@@ -0,0 +1,54 @@
+'''
+Startup time, RSS and predict latency of the forest and lookup table serving modes. Each mode
+runs in a fresh process; build the table first (make build_lookup_table).
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Runs in the child process: construct the service, then time single-row predictions
+CHILD = '''
+import json, time, psutil
+import numpy as np
+started = time.perf_counter()
+from src.service import UniversityAdmissionService, InputModel
+service = UniversityAdmissionService()
+startup = time.perf_counter() - started
+rss_startup = psutil.Process().memory_info().rss
+rng = np.random.default_rng(0)
+inputs = [InputModel(gre_score=int(rng.integers(290, 341)), toefl_score=int(rng.integers(92, 121)),
+                     university_rating=int(rng.integers(1, 6)), sop=float(rng.integers(2, 11) / 2),
+                     lor=float(rng.integers(2, 11) / 2), cgpa=round(float(rng.uniform(6.8, 9.92)), 2),
+                     research=int(rng.integers(0, 2))) for _ in range({requests})]
+latencies = []
+for input_data in inputs:
+    t = time.perf_counter()
+    service.predict(input_data)
+    latencies.append(time.perf_counter() - t)
+print(json.dumps({{
+    'startup_s': startup,
+    'rss_after_startup_mb': rss_startup / 1e6,
+    'rss_after_requests_mb': psutil.Process().memory_info().rss / 1e6,
+    'p50_us': float(np.percentile(latencies, 50) * 1e6),
+    'p99_us': float(np.percentile(latencies, 99) * 1e6)
+}}))
+'''
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare the forest and lookup table serving modes.')
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ('forest', 'lookup_table'):
+        # Disable the prediction cache so every request reaches the forest or the table
+        env = dict(os.environ, ADMISSION_SERVING_MODE=mode, ADMISSION_CACHE_SIZE='0')
+        output = subprocess.run([sys.executable, '-c', CHILD.format(requests=args.requests)], env=env, capture_output=True, text=True, check=True)
+        results[mode] = json.loads(output.stdout.strip().splitlines()[-1])
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
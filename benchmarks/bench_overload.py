@@ -0,0 +1,36 @@
+'''
+Overload behaviour of /predict (BentoML's thread pool, unbounded queue) against
+/predict_async (sized pool, bounded queue with 503 rejections) at rising concurrency. Past
+saturation, /predict latency keeps growing with the queue while /predict_async keeps the p99
+of accepted requests bounded and rejects the excess. Requests rotate through distinct
+applicants, so the pool runs real inference instead of returning prediction cache hits.
+Start the API first (make start_api).
+'''
+import argparse
+import asyncio
+import json
+from benchmarks.common import fetch_auth_headers, run_http_load, sample_inputs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare predict and predict_async latency under overload.')
+    parser.add_argument('--url', default='http://localhost:3000', help='Base URL of the running service.')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[8, 64, 256, 512])
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per run.')
+    args = parser.parse_args()
+
+    headers = fetch_auth_headers(args.url)
+    payloads = [{'input_data': i} for i in sample_inputs()]
+    results = []
+    for endpoint in ('predict', 'predict_async'):
+        for concurrency in args.concurrency:
+            summary = asyncio.run(run_http_load(f'{args.url}/{endpoint}', payloads, concurrency, args.duration, headers))
+            # Errors are the 503 rejections of admission control (and timeouts for /predict)
+            rejected = summary['errors'] / (summary['errors'] + summary['requests']) if summary['errors'] else 0.0
+            results.append({'endpoint': endpoint, 'concurrency': concurrency, 'rejected_share': rejected, **summary})
+            print(f"{endpoint:<14} c={concurrency:<4} rps={summary['rps']:>9.1f} p50={summary['p50_ms']:>8.2f}ms "
+                  f"p99={summary['p99_ms']:>8.2f}ms rejected={rejected:>6.1%}")
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+'''
+Memory of `bentoml serve` at several worker counts, with the flat forest memory-mapped by all
+workers (default) and loaded privately by each worker (ADMISSION_MMAP_MODEL=0). Uses the
+latest model in the BentoML model store (make train_model); Linux only, for PSS/USS.
+
+RSS counts shared pages in every worker, so the host total is the sum of PSS (shared pages
+split between the processes mapping them) over the whole server process tree.
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import httpx
+import psutil
+from benchmarks.common import SAMPLE_INPUT, fetch_auth_headers
+from benchmarks.suite import wait_until_ready
+
+
+def process_tree_memory(root: psutil.Process) -> dict:
+    '''
+    RSS, PSS and USS of every process in the tree, in MB.
+    '''
+    processes = []
+    for process in [root] + root.children(recursive=True):
+        try:
+            info = process.memory_full_info()
+        except psutil.NoSuchProcess:
+            continue
+        processes.append({'pid': process.pid, 'rss_mb': info.rss / 1e6, 'pss_mb': info.pss / 1e6, 'uss_mb': info.uss / 1e6})
+    return {
+        'processes': len(processes),
+        'max_rss_mb': max(p['rss_mb'] for p in processes),
+        'max_uss_mb': max(p['uss_mb'] for p in processes),
+        'total_rss_mb': sum(p['rss_mb'] for p in processes),
+        'total_pss_mb': sum(p['pss_mb'] for p in processes)
+    }
+
+
+def measure(workers: int, mmap_model: bool, port: int, requests: int) -> dict:
+    url = f'http://127.0.0.1:{port}'
+    env = dict(os.environ, ADMISSION_WORKERS=str(workers), ADMISSION_MMAP_MODEL='1' if mmap_model else '0')
+    host_before = psutil.virtual_memory().used
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'bentoml', 'serve', 'src.service:UniversityAdmissionService', '--port', str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(url, server, timeout=300.0)
+        headers = fetch_auth_headers(url)
+        # Spread requests over the workers so every one of them has touched the model
+        with httpx.Client(headers=headers, timeout=30.0) as client:
+            for _ in range(requests):
+                client.post(f'{url}/predict', json={'input_data': SAMPLE_INPUT})
+        time.sleep(1.0)
+        memory = process_tree_memory(psutil.Process(server.pid))
+        memory['host_used_delta_mb'] = (psutil.virtual_memory().used - host_before) / 1e6
+        return memory
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure per-worker and total memory at several worker counts.')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=500, help='Predict requests sent before measuring.')
+    parser.add_argument('--port', type=int, default=3200)
+    args = parser.parse_args()
+
+    results = []
+    for workers in args.workers:
+        for mmap_model in (True, False):
+            memory = measure(workers, mmap_model, args.port, args.requests)
+            results.append({'workers': workers, 'mode': 'mmap' if mmap_model else 'private', **memory})
+            print(f"workers={workers:<3} {results[-1]['mode']:<8} max_rss={memory['max_rss_mb']:>8.1f}MB "
+                  f"max_uss={memory['max_uss_mb']:>8.1f}MB total_pss={memory['total_pss_mb']:>9.1f}MB "
+                  f"host_delta={memory['host_used_delta_mb']:>9.1f}MB")
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
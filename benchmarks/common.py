@@ -0,0 +1,108 @@
+import asyncio
+import time
+import itertools
+import httpx
+import numpy as np
+from src.features import FEATURE_COLUMNS, FEATURE_DTYPES, INPUT_FIELDS, sample_rows
+
+# Representative request payload shared by the benchmarks
+SAMPLE_INPUT = {
+    'gre_score': 320,
+    'toefl_score': 110,
+    'university_rating': 4,
+    'sop': 4.5,
+    'lor': 4.0,
+    'cgpa': 9.0,
+    'research': 1
+}
+
+# Distinct applicants loaded in turn by the HTTP benchmarks; more than the default prediction
+# cache holds (10000), so the runs measure features and model rather than cache hits
+PAYLOAD_POOL_SIZE = 50000
+
+# Demo credentials used to obtain a token from /login
+BENCH_CREDENTIALS = {'username': 'user123', 'password': 'password123'}
+
+
+def sample_inputs(n: int = PAYLOAD_POOL_SIZE, seed: int = 0) -> list[dict]:
+    '''
+    Distinct plausible applicants as request inputs (InputModel fields), drawn with sample_rows.
+    Parameters:
+    - n: int : The number of inputs.
+    - seed: int : The random seed.
+    Returns:
+    - list[dict] : One input dict per applicant.
+    '''
+    integer = [np.issubdtype(FEATURE_DTYPES[column], np.integer) for column in FEATURE_COLUMNS]
+    return [
+        {field: int(value) if is_int else float(value) for field, value, is_int in zip(INPUT_FIELDS, row, integer)}
+        for row in sample_rows(n, seed).tolist()
+    ]
+
+
+def fetch_auth_headers(url: str, credentials: dict = BENCH_CREDENTIALS) -> dict:
+    '''
+    Log in to the running service and return the Authorization header for the protected endpoints.
+    Parameters:
+    - url: str : Base URL of the service.
+    - credentials: dict : Username and password to log in with.
+    Returns:
+    - dict : The request headers carrying the Bearer token.
+    '''
+    response = httpx.post(f'{url}/login', json={'credentials': credentials}, timeout=30.0)
+    response.raise_for_status()
+    return {'Authorization': f"Bearer {response.json()['token']}"}
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict:
+    '''
+    Summarize a list of per-request latencies (in seconds).
+    Parameters:
+    - latencies: list[float] : The measured request latencies.
+    - elapsed: float : The wall-clock duration of the whole run.
+    Returns:
+    - dict : Request count, requests/sec and p50/p99 latency in milliseconds.
+    '''
+    samples = np.asarray(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': float(np.percentile(samples, 50)) if len(samples) else 0.0,
+        'p99_ms': float(np.percentile(samples, 99)) if len(samples) else 0.0
+    }
+
+
+async def run_http_load(url: str, payload: dict | list[dict], concurrency: int, duration: float, headers: dict | None = None) -> dict:
+    '''
+    Send POST requests from `concurrency` concurrent clients for `duration` seconds.
+    Parameters:
+    - url: str : The endpoint to load.
+    - payload: dict | list[dict] : The JSON body to send with every request, or a list of
+      bodies sent in turn (e.g. distinct inputs, so the prediction cache does not serve them).
+    - concurrency: int : The number of concurrent clients.
+    - duration: float : The length of the run in seconds.
+    - headers: dict | None : Optional extra request headers.
+    Returns:
+    - dict : The latency summary of all successful requests plus the error count.
+    '''
+    latencies: list[float] = []
+    errors = 0
+    payloads = itertools.cycle(payload if isinstance(payload, list) else [payload])
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0, headers=headers) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker() -> None:
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.post(url, json=next(payloads))
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {**summarize(latencies, elapsed), 'errors': errors}
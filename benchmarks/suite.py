@@ -0,0 +1,198 @@
+'''
+Reproducible benchmark suite (make bench). Trains a model on synthetic admission data in a
+throwaway BentoML home, so the real model store is untouched, then:
+- microbenchmarks predict, login and the JWT middleware in-process,
+- load-tests predict over HTTP against `bentoml serve` at several concurrency levels,
+- writes the results as JSON and compares them with a stored baseline.
+
+Exits with status 1 if any latency (p50/p99) or throughput (rps) metric is worse than the
+baseline by more than --threshold.
+'''
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from os import path
+import httpx
+
+RESULTS_FILE = path.join('benchmarks', 'results', 'latest.json')
+BASELINE_FILE = path.join('benchmarks', 'baseline.json')
+
+# Metrics compared with the baseline and whether higher values are better
+COMPARED_METRICS = {'p50_ms': False, 'p99_ms': False, 'rps': True}
+
+
+def train_synthetic_model(work_dir: str, rows: int, seed: int) -> None:
+    '''
+    Generate synthetic raw data, prepare it and train the model into the current BentoML home.
+    '''
+    from src.data.prepare_data import prepare_data
+    from src.data.synthetic_data import generate_admission_data
+    from src.model.train_model import train_random_forest_model
+
+    raw_file = path.join(work_dir, 'raw', 'admission.csv')
+    processed_path = path.join(work_dir, 'processed')
+    os.makedirs(path.dirname(raw_file), exist_ok=True)
+    os.makedirs(processed_path, exist_ok=True)
+    generate_admission_data(rows, seed).to_csv(raw_file, index=False)
+    prepare_data(raw_file, processed_path)
+    train_random_forest_model(processed_path, path.join(work_dir, 'models'), model_name='university_admission_rf_model', store_to_disk=False)
+
+
+def run_microbenchmarks(requests: int, seed: int) -> dict:
+    '''
+    Time predict (with and without the prediction cache), login and the JWT middleware in-process.
+    '''
+    import numpy as np
+    from benchmarks.bench_cache import random_profiles
+    from benchmarks.bench_jwt_middleware import endpoint, run as run_middleware
+    from benchmarks.common import summarize, BENCH_CREDENTIALS
+    from src.cache import PredictionCache
+    from src.credentials import LoginRateLimiter
+    from src.jwt_middleware import JWTAuthMiddleware, create_jwt_token
+    from src.service import UniversityAdmissionService, CACHE_SIZE, CACHE_TTL
+
+    def timed(call, n: int) -> dict:
+        latencies = []
+        start = time.perf_counter()
+        for i in range(n):
+            t = time.perf_counter()
+            call(i)
+            latencies.append(time.perf_counter() - t)
+        return summarize(latencies, time.perf_counter() - start)
+
+    service = UniversityAdmissionService()
+    profiles = random_profiles(np.random.default_rng(seed), requests)
+    results = {}
+    for label, maxsize in (('predict_no_cache', 0), ('predict_cache', CACHE_SIZE)):
+        service.models.active.cache = PredictionCache(maxsize, CACHE_TTL)
+        # Half of the profiles repeat, so the cached run sees a 50% hit rate
+        results[label] = timed(lambda i: service.predict(profiles[i % (requests // 2 or 1)]), requests)
+
+    # Logins are deliberately slow (password hashing); keep the count low and the rate limit off
+    service.login_limiter = LoginRateLimiter(per_minute=0)
+    login_requests = max(1, requests // 100)
+    results['login'] = timed(lambda i: asyncio.run(service.login(BENCH_CREDENTIALS)), login_requests)
+
+    middleware = JWTAuthMiddleware(endpoint, protected_paths={'/predict'})
+    results['jwt_middleware'] = asyncio.run(run_middleware(middleware, create_jwt_token('user123'), requests))
+    return results
+
+
+def wait_until_ready(url: str, server: subprocess.Popen, timeout: float = 120.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'bentoml serve exited with status {server.returncode}.')
+        try:
+            if httpx.get(f'{url}/readyz', timeout=1.0).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f'Service at {url} not ready after {timeout}s.')
+
+
+def run_load_tests(port: int, concurrency_levels: list[int], duration: float) -> dict:
+    '''
+    Start `bentoml serve` on the synthetic model and load predict at each concurrency level.
+    '''
+    from benchmarks.common import fetch_auth_headers, run_http_load, sample_inputs
+
+    url = f'http://127.0.0.1:{port}'
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'bentoml', 'serve', 'src.service:UniversityAdmissionService', '--port', str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(url, server)
+        headers = fetch_auth_headers(url)
+        # Distinct inputs, so the baseline tracks features and model, not prediction cache hits
+        payloads = [{'input_data': i} for i in sample_inputs()]
+        results = {}
+        for concurrency in concurrency_levels:
+            summary = asyncio.run(run_http_load(f'{url}/predict', payloads, concurrency, duration, headers))
+            results[f'predict_c{concurrency}'] = summary
+            print(f"predict c={concurrency:<4} rps={summary['rps']:>9.1f} p50={summary['p50_ms']:>7.2f}ms "
+                  f"p99={summary['p99_ms']:>7.2f}ms errors={summary['errors']}")
+        return results
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    '''
+    List the metrics that regressed by more than threshold (a fraction) against the baseline.
+    Benchmarks or metrics missing from either side are skipped.
+    '''
+    regressions = []
+    for group, benchmarks in baseline.get('results', {}).items():
+        for name, base in benchmarks.items():
+            current = results.get(group, {}).get(name)
+            if current is None:
+                continue
+            for metric, higher_is_better in COMPARED_METRICS.items():
+                if metric not in base or metric not in current or not base[metric]:
+                    continue
+                change = (current[metric] - base[metric]) / base[metric]
+                if (-change if higher_is_better else change) > threshold:
+                    regressions.append(f'{group}.{name}.{metric}: {base[metric]:.4g} -> {current[metric]:.4g} ({change:+.1%})')
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Run the benchmark suite and compare it with a baseline.')
+    parser.add_argument('--rows', type=int, default=500, help='Rows of synthetic training data.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per microbenchmark.')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per load test run.')
+    parser.add_argument('--port', type=int, default=3100)
+    parser.add_argument('--skip-http', action='store_true', help='Only run the in-process microbenchmarks.')
+    parser.add_argument('--output', default=RESULTS_FILE)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--threshold', type=float, default=0.10, help='Allowed relative regression, e.g. 0.10 for 10%%.')
+    parser.add_argument('--save-baseline', action='store_true', help='Store the results as the new baseline.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='admission-bench-') as work_dir:
+        # Isolated model store, set before anything imports bentoml; inherited by bentoml serve
+        os.environ['BENTOML_HOME'] = path.join(work_dir, 'bentoml')
+        train_synthetic_model(work_dir, args.rows, args.seed)
+        results = {'micro': run_microbenchmarks(args.requests, args.seed)}
+        if not args.skip_http:
+            results['http'] = run_load_tests(args.port, args.concurrency, args.duration)
+
+    report = {
+        'config': {k: v for k, v in vars(args).items() if k in ('rows', 'seed', 'requests', 'concurrency', 'duration')},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'results': results
+    }
+    os.makedirs(path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results written to {args.output}.')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Baseline stored in {args.baseline}.')
+        return
+    if not path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}; run with --save-baseline to create one.')
+        return
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    if regressions:
+        print(f'Regressions over {args.threshold:.0%}:\n' + '\n'.join(f'  {r}' for r in regressions))
+        sys.exit(1)
+    print(f'No regressions over {args.threshold:.0%} against {args.baseline}.')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+'''
+Admission control for CPU-bound request work. Work runs on a dedicated, fixed-size thread
+pool instead of BentoML's shared one, and the queue in front of it is bounded: once too many
+calls are waiting, or a call has waited too long for a thread, it is rejected with 503 and a
+Retry-After hint. Under overload, latency of the accepted requests stays bounded instead of
+growing with the queue.
+'''
+import asyncio
+import contextvars
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+import bentoml
+from starlette.responses import JSONResponse
+from src.instrumentation import METRICS_ENABLED, record_stage
+
+REJECTED_REQUESTS = bentoml.metrics.Counter(
+    name='admission_rejected_requests_total',
+    documentation='Requests rejected by admission control, by pool and reason (queue_full, queue_wait)',
+    labelnames=['pool', 'reason']
+)
+QUEUE_DEPTH = bentoml.metrics.Gauge(
+    name='admission_queue_depth',
+    documentation='Calls submitted to a pool and not finished yet (running or waiting)',
+    labelnames=['pool']
+)
+
+
+class Overloaded(Exception):
+    '''
+    Raised when admission control rejects a call.
+    '''
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f'Overloaded ({reason}); retry after {retry_after}s.')
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def overloaded_response(message: str, retry_after: int) -> JSONResponse:
+    '''
+    503 response telling the client when to try again.
+    '''
+    return JSONResponse(status_code=503, content={'message': message}, headers={'Retry-After': str(retry_after)})
+
+
+class BoundedExecutor:
+    '''
+    Thread pool with a bounded queue, used from the event loop:
+        result = await executor.run(function, *args)
+    The pending count is only touched on the event loop thread, so it needs no lock.
+    '''
+
+    def __init__(self, name: str, workers: int, max_queue: int, max_wait_ms: float):
+        '''
+        Parameters:
+        - name: str : Pool name, used for thread names and metric labels.
+        - workers: int : Threads running calls.
+        - max_queue: int : Calls allowed to wait for a thread; more are rejected at once.
+        - max_wait_ms: float : Calls that waited longer for a thread are rejected instead of run
+          (0 disables the check).
+        '''
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_wait = max_wait_ms / 1000
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._depth = QUEUE_DEPTH.labels(pool=name)
+        self._rejected = {reason: REJECTED_REQUESTS.labels(pool=name, reason=reason) for reason in ('queue_full', 'queue_wait')}
+
+    @property
+    def retry_after(self) -> int:
+        '''Seconds a rejected client should wait: about the time to drain a full queue.'''
+        return max(1, math.ceil(self.max_wait * (self.max_queue / self.workers + 1)))
+
+    async def run(self, function: Callable[..., Any], *args) -> Any:
+        '''
+        Run function(*args) on the pool, in a copy of the caller's context so stage timings
+        land in the current request.
+        Raises:
+        - Overloaded : The queue is full, or the call waited longer than max_wait_ms.
+        '''
+        if self.pending >= self.workers + self.max_queue:
+            self._rejected['queue_full'].inc()
+            raise Overloaded('queue_full', self.retry_after)
+        self.pending += 1
+        self._depth.set(self.pending)
+        context = contextvars.copy_context()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, context.run, self._call, time.perf_counter(), function, args)
+        finally:
+            self.pending -= 1
+            self._depth.set(self.pending)
+
+    def _call(self, submitted: float, function: Callable[..., Any], args: tuple) -> Any:
+        waited = time.perf_counter() - submitted
+        if METRICS_ENABLED:
+            record_stage('queue', waited)
+        if self.max_wait and waited > self.max_wait:
+            # The client has already waited its budget: shed the work rather than add to it
+            self._rejected['queue_wait'].inc()
+            raise Overloaded('queue_wait', self.retry_after)
+        return function(*args)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
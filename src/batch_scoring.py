@@ -0,0 +1,196 @@
+'''
+Chunked bulk scoring shared by the predict_batch API and the score_file CLI. Inputs are
+read, scored and written a fixed number of rows at a time, so memory stays flat however
+large the file is.
+'''
+import argparse
+import csv
+import logging
+import time
+from os import path
+from typing import Callable, Iterable, Iterator
+import numpy as np
+from src.features import FEATURE_COLUMNS, INPUT_FIELDS, ROW_DTYPE, inputs_to_matrix, validate_rows
+
+# Rows read and scored per chunk
+DEFAULT_CHUNK_SIZE = 4096
+
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+
+
+class ScoringStats:
+    '''
+    Running row count and throughput of a scoring job.
+    '''
+
+    def __init__(self):
+        self.rows = 0
+        self.started = time.perf_counter()
+        self.finished = None
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def _feature_indices(header: list[str]) -> list[int]:
+    '''
+    Locate the feature columns in a file header. Columns may be named as in the training
+    data (e.g. 'GRE Score') or as InputModel fields (e.g. 'gre_score'); others are ignored.
+    Parameters:
+    - header: list[str] : The column names of the file.
+    Returns:
+    - list[int] : Position of each feature in FEATURE_COLUMNS order.
+    '''
+    indices = []
+    for column, field in zip(FEATURE_COLUMNS, INPUT_FIELDS):
+        if column in header:
+            indices.append(header.index(column))
+        elif field in header:
+            indices.append(header.index(field))
+        else:
+            raise ValueError(f'Missing feature column "{column}" (or "{field}").')
+    return indices
+
+
+def iter_csv_chunks(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    '''
+    Read a CSV file with a header row in chunks of feature rows. Blank lines are skipped; an
+    empty file, or a cell that is not a finite number (integral in the integer columns),
+    raises ValueError (InvalidArgument in the service).
+    Parameters:
+    - file_path: str : The CSV file to read.
+    - chunk_size: int : The number of rows per chunk.
+    Yields:
+    - np.ndarray : Feature matrix of up to chunk_size rows, in FEATURE_COLUMNS order.
+    '''
+    with open(file_path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError('The CSV file is empty; expected a header row with the feature columns.')
+        indices = _feature_indices(header)
+        rows = []
+        for record in reader:
+            if not record:
+                continue
+            rows.append([record[i] for i in indices])
+            if len(rows) == chunk_size:
+                yield validate_rows(np.array(rows, dtype=ROW_DTYPE))
+                rows = []
+        if rows:
+            yield validate_rows(np.array(rows, dtype=ROW_DTYPE))
+
+
+def iter_parquet_chunks(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    '''
+    Read a Parquet file in chunks of feature rows (requires pyarrow), validated like CSV rows.
+    Parameters:
+    - file_path: str : The Parquet file to read.
+    - chunk_size: int : The number of rows per chunk.
+    Yields:
+    - np.ndarray : Feature matrix of up to chunk_size rows, in FEATURE_COLUMNS order.
+    '''
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError('Reading Parquet files requires pyarrow: pip install pyarrow') from e
+    parquet_file = pq.ParquetFile(file_path)
+    header = parquet_file.schema_arrow.names
+    columns = [header[i] for i in _feature_indices(header)]
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+        yield validate_rows(np.column_stack([batch.column(i).to_numpy(zero_copy_only=False) for i in range(len(columns))]).astype(ROW_DTYPE))
+
+
+def iter_file_chunks(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    '''
+    Read a CSV or Parquet file (chosen by suffix) in chunks of feature rows.
+    '''
+    if path.splitext(str(file_path))[1].lower() in PARQUET_SUFFIXES:
+        return iter_parquet_chunks(file_path, chunk_size)
+    return iter_csv_chunks(file_path, chunk_size)
+
+
+def iter_input_chunks(inputs: list, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    '''
+    Split a list of InputModel payloads into chunks of feature rows.
+    '''
+    for start in range(0, len(inputs), chunk_size):
+        yield inputs_to_matrix(inputs[start:start + chunk_size])
+
+
+def score_chunks(model, chunks: Iterable[np.ndarray], stats: ScoringStats | None = None,
+                 observe: Callable[[np.ndarray, np.ndarray], None] | None = None) -> Iterator[np.ndarray]:
+    '''
+    Score feature chunks one at a time.
+    Parameters:
+    - model: object : Anything with a predict(X) method, e.g. the service's FlatForest.
+    - chunks: Iterable[np.ndarray] : Feature matrices in FEATURE_COLUMNS order.
+    - stats: ScoringStats | None : Optional stats object updated as chunks are scored.
+    - observe: Callable | None : Optionally called with each chunk and its predictions (e.g. drift monitoring).
+    Yields:
+    - np.ndarray : The predictions for each chunk.
+    '''
+    for chunk in chunks:
+        predictions = model.predict(chunk)
+        if stats is not None:
+            stats.rows += len(chunk)
+        if observe is not None:
+            observe(chunk, predictions)
+        yield predictions
+    if stats is not None:
+        stats.finished = time.perf_counter()
+
+
+def iter_csv_lines(predictions: Iterable[np.ndarray]) -> Iterator[str]:
+    '''
+    Format chunks of predictions as CSV text with an admission_chance header. The header is
+    sent together with the first chunk, so errors in reading the input surface before any output.
+    '''
+    header = 'admission_chance\n'
+    for chunk in predictions:
+        yield header + ''.join(f'{p!r}\n' for p in chunk.tolist())
+        header = ''
+    if header:
+        yield header
+
+
+def score_file(model, input_path: str, output_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> ScoringStats:
+    '''
+    Score a CSV or Parquet file on disk into a CSV file of predictions, in input row order.
+    Parameters:
+    - model: object : Anything with a predict(X) method.
+    - input_path: str : The file with the applicant features.
+    - output_path: str : The CSV file to write the predictions to.
+    - chunk_size: int : The number of rows scored at a time.
+    Returns:
+    - ScoringStats : Row count and throughput of the job.
+    '''
+    stats = ScoringStats()
+    with open(output_path, 'w') as f:
+        f.writelines(iter_csv_lines(score_chunks(model, iter_file_chunks(input_path, chunk_size), stats)))
+    return stats
+
+
+def main() -> None:
+    import bentoml
+    from src.service import load_engine
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Score a CSV or Parquet file of applicants offline.')
+    parser.add_argument('input', help='CSV or Parquet file with the feature columns.')
+    parser.add_argument('output', help='CSV file to write the predictions to.')
+    parser.add_argument('--model', default='university_admission_rf_model:latest', help='BentoML model tag.')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    model = load_engine(bentoml.models.get(args.model))
+    stats = score_file(model, args.input, args.output, args.chunk_size)
+    logging.info(f'Scored {stats.rows} rows from {args.input} into {args.output} in {stats.seconds:.2f}s ({stats.rows_per_sec:.0f} rows/sec).')
+
+if __name__ == "__main__":
+    main()
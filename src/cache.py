@@ -0,0 +1,133 @@
+'''
+Bounded in-process LRU/TTL cache of predictions, keyed on the canonical feature row.
+'''
+import threading
+import time
+from collections import OrderedDict
+import bentoml
+import numpy as np
+
+CACHE_REQUESTS = bentoml.metrics.Counter(
+    name='admission_prediction_cache_requests_total',
+    documentation='Prediction cache lookups by cache (predictions or explanations) and result (hit or miss)',
+    labelnames=['cache', 'result']
+)
+CACHE_EVICTIONS = bentoml.metrics.Counter(
+    name='admission_prediction_cache_evictions_total',
+    documentation='Prediction cache entries dropped for size, age or a model change, by cache',
+    labelnames=['cache', 'reason']
+)
+
+
+def row_key(row: np.ndarray) -> bytes:
+    '''
+    Canonical cache key of one raw feature row. Inputs are integers or decimal scores, so the
+    float64 row is exact; adding 0.0 folds -0.0 into 0.0.
+    '''
+    return (np.asarray(row, dtype=np.float64) + 0.0).tobytes()
+
+
+class PredictionCache:
+    '''
+    Thread-safe LRU cache with a time-to-live, bound to one model version: binding it to a
+    different model tag drops every entry.
+    '''
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600.0, name: str = 'predictions'):
+        '''
+        Parameters:
+        - maxsize: int : Maximum number of entries; 0 disables the cache.
+        - ttl: float : Seconds an entry stays valid.
+        - name: str : What the cache holds, the cache label of its metrics.
+        '''
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self.model_tag = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[bytes, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hit_counter = CACHE_REQUESTS.labels(cache=name, result='hit')
+        self._miss_counter = CACHE_REQUESTS.labels(cache=name, result='miss')
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def bind(self, model_tag: str) -> None:
+        '''
+        Associate the cache with a model version, invalidating it if the version changed.
+        '''
+        with self._lock:
+            if model_tag != self.model_tag:
+                self._evict_all('model_change')
+                self.model_tag = model_tag
+
+    def clear(self) -> None:
+        with self._lock:
+            self._evict_all('clear')
+
+    def get(self, key: bytes) -> float | tuple | None:
+        '''
+        Look up a prediction; returns None on a miss or an expired entry.
+        '''
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self._hit_counter.inc()
+                    return entry[1]
+                del self._entries[key]
+                self._count_evictions('expired', 1)
+            self.misses += 1
+        self._miss_counter.inc()
+        return None
+
+    def put(self, key: bytes, value: float | tuple) -> None:
+        '''
+        Store a prediction (or another immutable per-row result, e.g. an explanation),
+        evicting the least recently used entries beyond maxsize.
+        '''
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            overflow = len(self._entries) - self.maxsize
+            for _ in range(overflow):
+                self._entries.popitem(last=False)
+            if overflow > 0:
+                self._count_evictions('size', overflow)
+
+    def stats(self) -> dict:
+        '''
+        Hit/miss/eviction counters of this cache instance.
+        '''
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'model_tag': self.model_tag
+        }
+
+    def _evict_all(self, reason: str) -> None:
+        count = len(self._entries)
+        self._entries.clear()
+        if count:
+            self._count_evictions(reason, count)
+
+    def _count_evictions(self, reason: str, count: int) -> None:
+        self.evictions += count
+        CACHE_EVICTIONS.labels(cache=self.name, reason=reason).inc(count)
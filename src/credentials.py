@@ -0,0 +1,160 @@
+'''
+Hashed credential store and per-user login rate limiting for the login API. Passwords are
+stored as scrypt hashes; verifying one deliberately costs tens of milliseconds of CPU, so
+the service runs it on a small thread pool instead of the event loop.
+'''
+import argparse
+import getpass
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+
+# scrypt cost parameters of new hashes (~16 MiB and ~50ms per hash)
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_DKLEN = 32
+
+# JSON file ({"username": "<hash>", ...}) or JSON string with the credentials to serve
+CREDENTIALS_FILE_ENV = 'ADMISSION_CREDENTIALS_FILE'
+CREDENTIALS_ENV = 'ADMISSION_CREDENTIALS'
+
+# Demo users (user123/password123, user456/password456), used when no credentials are configured
+DEFAULT_CREDENTIALS = {
+    'user123': 'scrypt$16384$8$1$2099d4e75d85f978f98b9aacc943af1f$9c928a32c34cf3963307e75e2dc67d40da56382d961f1a7a07ea5da7583ddbd2',
+    'user456': 'scrypt$16384$8$1$82043747d18bd7a42421ac6c56186481$c56cc589a0d4f0a9fca54b22a9a097e5d838a99637e429d45f2164efbd6fbc33'
+}
+
+
+def hash_password(password: str, salt: bytes | None = None) -> str:
+    '''
+    Hash a password with scrypt.
+    Parameters:
+    - password: str : The plaintext password.
+    - salt: bytes | None : The salt; a random 16-byte salt by default.
+    Returns:
+    - str : The encoded hash, 'scrypt$n$r$p$salt$hash' with hex salt and hash.
+    '''
+    salt = salt if salt is not None else secrets.token_bytes(16)
+    digest = hashlib.scrypt(password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, dklen=SCRYPT_DKLEN)
+    return f'scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${digest.hex()}'
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    '''
+    Check a password against an encoded scrypt hash in constant time. A malformed hash (not a
+    string, bad hex, non-numeric or invalid scrypt parameters) never matches.
+    '''
+    try:
+        scheme, n, r, p, salt, expected = encoded.split('$')
+        if scheme != 'scrypt':
+            return False
+        expected = bytes.fromhex(expected)
+        digest = hashlib.scrypt(password.encode(), salt=bytes.fromhex(salt), n=int(n), r=int(r), p=int(p), dklen=len(expected))
+    except (AttributeError, ValueError, TypeError, OverflowError):
+        return False
+    return hmac.compare_digest(digest, expected)
+
+
+class CredentialStore:
+    '''
+    Username to password hash mapping. Unknown users are checked against a dummy hash, so a
+    failed login costs the same whether or not the username exists.
+    '''
+
+    def __init__(self, hashes: dict[str, str]):
+        '''
+        Parameters:
+        - hashes: dict[str, str] : Encoded password hash of each username.
+        Raises:
+        - ValueError : The mapping is not a JSON object of string usernames to string hashes,
+          so a broken credentials setting fails at startup instead of on every login.
+        '''
+        if not isinstance(hashes, dict) or not all(isinstance(k, str) and isinstance(v, str) for k, v in hashes.items()):
+            raise ValueError('Credentials must map usernames to password hash strings.')
+        self.hashes = dict(hashes)
+        self._dummy_hash = hash_password(secrets.token_hex(16))
+
+    def __contains__(self, username) -> bool:
+        return isinstance(username, str) and username in self.hashes
+
+    @classmethod
+    def from_env(cls) -> 'CredentialStore':
+        '''
+        Load the credentials from ADMISSION_CREDENTIALS_FILE, else ADMISSION_CREDENTIALS, else the demo users.
+        '''
+        file_path = os.environ.get(CREDENTIALS_FILE_ENV)
+        if file_path:
+            with open(file_path) as f:
+                return cls(json.load(f))
+        credentials = os.environ.get(CREDENTIALS_ENV)
+        if credentials:
+            return cls(json.loads(credentials))
+        return cls(DEFAULT_CREDENTIALS)
+
+    def verify(self, username, password) -> bool:
+        '''
+        Verify a username and password; CPU-bound, call it off the event loop.
+        '''
+        if not isinstance(username, str) or not isinstance(password, str):
+            return False
+        encoded = self.hashes.get(username)
+        valid = verify_password(password, encoded or self._dummy_hash)
+        return valid and encoded is not None
+
+
+class LoginRateLimiter:
+    '''
+    Per-user token bucket: each user may attempt `burst` logins at once, refilled at
+    `per_minute` attempts per minute. Only known users get a bucket, so memory is bounded
+    by the size of the credential store.
+    '''
+
+    def __init__(self, per_minute: float = 30.0, burst: int = 10):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def allow(self, username: str) -> bool:
+        '''
+        Take one attempt from the user's bucket; returns False when it is empty.
+        '''
+        if not self.enabled:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(username, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            if tokens < 1.0:
+                self._buckets[username] = (tokens, now)
+                return False
+            self._buckets[username] = (tokens - 1.0, now)
+            return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Add a user to a credentials file for ADMISSION_CREDENTIALS_FILE.')
+    parser.add_argument('username')
+    parser.add_argument('--file', default='credentials.json', help='JSON credentials file to create or update.')
+    args = parser.parse_args()
+
+    hashes = {}
+    if os.path.exists(args.file):
+        with open(args.file) as f:
+            hashes = json.load(f)
+    hashes[args.username] = hash_password(getpass.getpass(f'Password for {args.username}: '))
+    with open(args.file, 'w') as f:
+        json.dump(hashes, f, indent=2)
+    print(f'Stored the password hash of {args.username} in {args.file}.')
+
+if __name__ == "__main__":
+    main()
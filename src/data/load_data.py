@@ -1,30 +1,75 @@
 import os
 from os import path
+import argparse
+import hashlib
+import json
 import logging
 import requests
 
 logging.basicConfig(level=logging.INFO)
 
-def load_data(url: str, file_path: str) -> None:
+# Bytes written per chunk while streaming the download to disk
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+def meta_path(file_path: str) -> str:
+    '''Path of the JSON file recording the URL, ETag and SHA-256 of a download.'''
+    return f'{file_path}.meta.json'
+
+def load_data(url: str, file_path: str, force: bool = False) -> bool:
     '''
-    Download data from a URL and save it to a specified file path.
+    Download data from a URL and save it to a specified file path. The response is streamed
+    to disk in chunks. The download is skipped when the server confirms the stored ETag, and
+    the existing file is kept untouched when the new content has the same SHA-256.
     Parameters:
     - url: str : The URL to download the data from.
     - file_path: str : The local file path to save the downloaded data.
+    - force: bool : Download even if the server reports the file as unchanged.
+    Returns:
+    - bool : Whether the file content changed.
     '''
     os.makedirs(path.dirname(file_path), exist_ok=True)
+    meta = {}
+    if path.exists(file_path) and path.exists(meta_path(file_path)):
+        with open(meta_path(file_path)) as f:
+            meta = json.load(f)
+        if meta.get('url') != url:
+            meta = {}
 
-    response = requests.get(url)
-    response.raise_for_status()
-    with open(file_path, 'wb') as f:
-        f.write(response.content)
-    logging.info(f"Data downloaded from {url} and saved to {file_path}")
+    headers = {'If-None-Match': meta['etag']} if meta.get('etag') and not force else {}
+    with requests.get(url, headers=headers, stream=True, timeout=60) as response:
+        if response.status_code == 304:
+            logging.info(f'{file_path} is up to date with {url} (ETag {meta["etag"]}).')
+            return False
+        response.raise_for_status()
+        digest = hashlib.sha256()
+        part_path = f'{file_path}.part'
+        with open(part_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+                digest.update(chunk)
+        etag = response.headers.get('ETag')
+
+    changed = meta.get('sha256') != digest.hexdigest()
+    if changed:
+        os.replace(part_path, file_path)
+        logging.info(f"Data downloaded from {url} and saved to {file_path}")
+    else:
+        # Same content: keep the old file, so its mtime (and downstream stage caches) stay valid
+        os.remove(part_path)
+        logging.info(f'{file_path} is unchanged at {url}.')
+    with open(meta_path(file_path), 'w') as f:
+        json.dump({'url': url, 'etag': etag, 'sha256': digest.hexdigest()}, f, indent=2)
+    return changed
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description='Download the raw admission data.')
+    parser.add_argument('--force', action='store_true', help='Download even if the server reports the file as unchanged.')
+    args = parser.parse_args()
+
     url = 'https://assets-datascientest.s3.eu-west-1.amazonaws.com/MLOPS/bentoml/admission.csv'
     file_name = url.split('/')[-1]
     file_path = path.join(os.getcwd(), 'data', 'raw', file_name)
-    load_data(url, file_path)
+    load_data(url, file_path, force=args.force)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
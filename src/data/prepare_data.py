@@ -1,49 +1,97 @@
 import os
 from os import path
+import argparse
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 import sklearn.model_selection
 import logging
+import joblib
+from src.features import TARGET_COLUMN, FEATURE_COLUMNS, FEATURE_MAX_SCORES, SCALER_FILE, ROW_DTYPE, FeatureScaler
+from src.data.stage_cache import StageCache
 logging.basicConfig(level=logging.INFO)
 
-def prepare_data(raw_file: str, processed_path: str) -> None:
+# Processed splits, as .npy arrays: X_* in FEATURE_COLUMNS order, y_* the chance of admission
+SPLIT_NAMES = ('X_train', 'y_train', 'X_test', 'y_test')
+
+# Manifest of the last run, used to skip the stage when nothing changed
+MANIFEST_FILE = 'prepare_data.manifest.json'
+
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+
+def split_path(processed_path: str, name: str) -> str:
+    '''Path of a processed split (one of SPLIT_NAMES).'''
+    return path.join(processed_path, f'{name}.npy')
+
+def load_split(processed_path: str, name: str, mmap_mode: str | None = 'r') -> np.ndarray:
+    '''
+    Load a processed split, memory-mapped by default so large splits are not read up front.
+    '''
+    return np.load(split_path(processed_path, name), mmap_mode=mmap_mode)
+
+def read_raw(raw_file: str) -> pd.DataFrame:
     '''
-    Prepare raw data by handling missing values and encoding categorical variables.
+    Read the feature and target columns of the raw CSV as float64. The multi-threaded pyarrow
+    parser is used when pyarrow is installed.
+    '''
+    columns = list(FEATURE_COLUMNS) + [TARGET_COLUMN]
+    engine = 'pyarrow' if importlib.util.find_spec('pyarrow') else 'c'
+    return pd.read_csv(raw_file, usecols=columns, dtype={c: ROW_DTYPE for c in columns}, engine=engine)[columns]
+
+def prepare_data(raw_file: str, processed_path: str, force: bool = False) -> bool:
+    '''
+    Prepare raw data by handling missing values, scaling the scores and splitting it into
+    train and test sets. Skipped when the raw file content and the parameters are unchanged
+    since the last run and its outputs are still in place.
     Parameters:
     - raw_file: str : The file path to the raw data.
-    - processed_path: str : The file path to save the processed data.
+    - processed_path: str : The directory to save the processed data to.
+    - force: bool : Run even if the previous outputs are up to date.
+    Returns:
+    - bool : Whether the stage ran (False if it was skipped).
     '''
-    os.makedirs(path.dirname(processed_path), exist_ok=True)
+    os.makedirs(processed_path, exist_ok=True)
+    inputs = {'raw': raw_file}
+    params = {'test_size': TEST_SIZE, 'random_state': RANDOM_STATE, 'max_scores': FEATURE_MAX_SCORES, 'columns': list(FEATURE_COLUMNS)}
+    outputs = {name: split_path(processed_path, name) for name in SPLIT_NAMES}
+    outputs['scaler'] = path.join(processed_path, SCALER_FILE)
+    cache = StageCache(path.join(processed_path, MANIFEST_FILE))
+    if not force and cache.is_fresh(inputs, params, outputs):
+        logging.info(f'Processed data in {processed_path} is up to date with {raw_file}; skipping.')
+        return False
 
-    df = pd.read_csv(raw_file)
-
-    # Drop serial number column
-    if 'Serial No.' in df.columns:
-        df.drop('Serial No.', axis=1, inplace=True)
+    df = read_raw(raw_file)
 
     # Handle missing values
     df.fillna(df.median(), inplace=True)
 
-    # Scale numerical values according to their different scoring scales
-    numerical_columns = {'GRE Score': 340, 'TOEFL Score': 120, 'University Rating': 5, 'SOP': 5.0, 'LOR ': 5.0, 'CGPA': 10.0}
-    for col, max_value in numerical_columns.items():
-        df[col] = df[col] / max_value
+    # Scale numerical values according to their different scoring scales; the fitted scaler
+    # is saved so that training stores the very same transform with the model for serving
+    scaler = FeatureScaler.fit()
+    X = scaler.transform(df[list(FEATURE_COLUMNS)].to_numpy())
+    y = df[TARGET_COLUMN].to_numpy()
+    del df
+    joblib.dump(scaler, outputs['scaler'])
 
     # Train-test split
-    train_df, test_df = sklearn.model_selection.train_test_split(df, test_size=0.2, random_state=42)
-
-    X_train = train_df.drop('Chance of Admit ', axis=1)
-    y_train = train_df['Chance of Admit ']
-    X_test = test_df.drop('Chance of Admit ', axis=1)
-    y_test = test_df['Chance of Admit ']
-    X_train.to_csv(path.join(processed_path, 'X_train.csv'), index=False)
-    y_train.to_csv(path.join(processed_path, 'y_train.csv'), index=False)
-    X_test.to_csv(path.join(processed_path, 'X_test.csv'), index=False)
-    y_test.to_csv(path.join(processed_path, 'y_test.csv'), index=False)
+    X_train, X_test, y_train, y_test = sklearn.model_selection.train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    splits = {'X_train': X_train, 'y_train': y_train, 'X_test': X_test, 'y_test': y_test}
+    with ThreadPoolExecutor(max_workers=len(splits)) as executor:
+        list(executor.map(lambda name: np.save(outputs[name], np.ascontiguousarray(splits[name])), splits))
+    cache.record(inputs, params, outputs)
+    logging.info(f'{len(X_train)} train and {len(X_test)} test rows written to {processed_path}.')
+    return True
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description='Scale and split the raw admission data.')
+    parser.add_argument('--force', action='store_true', help='Run even if the processed data is up to date.')
+    args = parser.parse_args()
+
     raw_file = path.join(os.getcwd(), 'data', 'raw', 'admission.csv')
     processed_path = path.join(os.getcwd(), 'data', 'processed')
-    prepare_data(raw_file, processed_path)
+    prepare_data(raw_file, processed_path, force=args.force)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,98 @@
+'''
+Content-hash based caching of pipeline stages. Each stage keeps a small JSON manifest with
+the SHA-256 of its input files, its parameters and the size/mtime of the outputs it wrote;
+when all of them still match, the stage can be skipped.
+'''
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from os import path
+
+# Bytes read per hash update; large reads let hashlib release the GIL for most of the work
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_digest(file_path: str) -> str:
+    '''
+    SHA-256 of a file's content, read in chunks so any file size fits in memory.
+    '''
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_stamp(file_path: str) -> list[int]:
+    '''
+    Size and modification time of a file, as a cheap change check.
+    '''
+    stat = os.stat(file_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class StageCache:
+    '''
+    Manifest of one pipeline stage. Input digests are remembered together with the file's
+    size and mtime, so an input that was not touched is not hashed again on the next run.
+    '''
+
+    def __init__(self, manifest_path: str):
+        self.manifest_path = manifest_path
+        self.manifest = {}
+        if path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+
+    def input_digests(self, inputs: dict[str, str]) -> dict[str, str]:
+        '''
+        Content digests of the named input files, hashing new or changed files in parallel.
+        Parameters:
+        - inputs: dict[str, str] : The input file of each input name.
+        Returns:
+        - dict[str, str] : The SHA-256 of each input name.
+        '''
+        known = self.manifest.get('inputs', {})
+        digests, to_hash = {}, {}
+        for name, file_path in inputs.items():
+            entry = known.get(name)
+            if entry is not None and entry['stamp'] == file_stamp(file_path):
+                digests[name] = entry['sha256']
+            else:
+                to_hash[name] = file_path
+        if to_hash:
+            with ThreadPoolExecutor(max_workers=len(to_hash)) as executor:
+                digests.update(zip(to_hash, executor.map(file_digest, to_hash.values())))
+        return digests
+
+    def is_fresh(self, inputs: dict[str, str], params: dict, outputs: dict[str, str]) -> bool:
+        '''
+        Whether the stage already ran on these input contents and parameters, and its outputs
+        are still there unmodified.
+        '''
+        if not self.manifest or self.manifest.get('params') != params:
+            return False
+        recorded = self.manifest.get('inputs', {})
+        if set(recorded) != set(inputs):
+            return False
+        digests = self.input_digests(inputs)
+        if any(recorded[name]['sha256'] != digest for name, digest in digests.items()):
+            return False
+        recorded_outputs = self.manifest.get('outputs', {})
+        return set(recorded_outputs) == set(outputs) and all(
+            path.exists(file_path) and file_stamp(file_path) == recorded_outputs[name] for name, file_path in outputs.items()
+        )
+
+    def record(self, inputs: dict[str, str], params: dict, outputs: dict[str, str]) -> None:
+        '''
+        Store the manifest after a successful run of the stage.
+        '''
+        digests = self.input_digests(inputs)
+        self.manifest = {
+            'inputs': {name: {'sha256': digests[name], 'stamp': file_stamp(file_path)} for name, file_path in inputs.items()},
+            'params': params,
+            'outputs': {name: file_stamp(file_path) for name, file_path in outputs.items()}
+        }
+        with open(self.manifest_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
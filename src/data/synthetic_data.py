@@ -0,0 +1,51 @@
+import os
+from os import path
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+from src.features import ID_COLUMN, TARGET_COLUMN, FEATURE_COLUMNS
+logging.basicConfig(level=logging.INFO)
+
+# Approximate linear relation of the features to the chance of admission in admission.csv
+TARGET_INTERCEPT = -1.28
+TARGET_COEFFICIENTS = {'GRE Score': 0.0019, 'TOEFL Score': 0.0028, 'University Rating': 0.006, 'SOP': 0.002, 'LOR ': 0.017, 'CGPA': 0.118, 'Research': 0.024}
+
+def generate_admission_data(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    '''
+    Generate a synthetic dataset with the columns, value ranges and rough feature/target
+    relation of admission.csv, for benchmarks and tests that must not depend on the download.
+    Parameters:
+    - n_rows: int : The number of applicants to generate.
+    - seed: int : The random seed; the same seed gives the same data.
+    Returns:
+    - pd.DataFrame : The raw data, in the column order of admission.csv.
+    '''
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        ID_COLUMN: np.arange(1, n_rows + 1),
+        'GRE Score': np.clip(np.rint(rng.normal(316, 11, n_rows)), 290, 340).astype(np.int64),
+        'TOEFL Score': np.clip(np.rint(rng.normal(107, 6, n_rows)), 92, 120).astype(np.int64),
+        'University Rating': rng.integers(1, 6, n_rows),
+        'SOP': rng.integers(2, 11, n_rows) / 2,
+        'LOR ': rng.integers(2, 11, n_rows) / 2,
+        'CGPA': np.round(np.clip(rng.normal(8.6, 0.6, n_rows), 6.8, 9.92), 2),
+        'Research': rng.binomial(1, 0.56, n_rows)
+    })
+    chance = TARGET_INTERCEPT + sum(df[column] * coefficient for column, coefficient in TARGET_COEFFICIENTS.items())
+    df[TARGET_COLUMN] = np.round(np.clip(chance + rng.normal(0, 0.05, n_rows), 0.34, 0.97), 2)
+    return df[[ID_COLUMN] + list(FEATURE_COLUMNS) + [TARGET_COLUMN]]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Write a synthetic dataset with the admission.csv schema.')
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=path.join(os.getcwd(), 'data', 'raw', 'synthetic_admission.csv'))
+    args = parser.parse_args()
+
+    os.makedirs(path.dirname(args.output), exist_ok=True)
+    generate_admission_data(args.rows, args.seed).to_csv(args.output, index=False)
+    logging.info(f'{args.rows} synthetic rows written to {args.output}.')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+'''
+Online drift monitoring of the served inputs and predictions, in fixed memory. train_model
+stores a DriftReference with the model: the decile edges of every input field on the training
+rows and of the predicted admission chance on the held-out test rows, with the share of
+reference rows in each bin.
+
+In the service, each model version with a reference gets a DriftMonitor. The request path
+only appends a reference to its rows and predictions to a short pending list. Every
+DRIFT_BUFFER_ROWS rows, or once the evaluation interval has passed, the pending rows are
+binned into per-field counts in one vectorized pass, so memory stays at one small histogram
+per field whatever the traffic. Once per interval, the counts of the window are compared
+with the reference (PSI and Kolmogorov-Smirnov distance), exported as gauges, and reset.
+'''
+import threading
+import time
+import bentoml
+import numpy as np
+from src.features import INPUT_FIELDS
+
+# Name of the reference in the custom objects of the BentoML model
+DRIFT_REFERENCE_KEY = 'drift_reference'
+
+# Quantile bins per field; fields with few distinct values (e.g. research) get fewer
+DRIFT_BINS = 10
+
+# Monitored fields: the InputModel fields, then the prediction
+PREDICTION_FIELD = 'admission_chance'
+DRIFT_FIELDS = INPUT_FIELDS + (PREDICTION_FIELD,)
+
+# Pending rows binned at once; bounds the memory held between two folds
+DRIFT_BUFFER_ROWS = 1024
+
+# Windows with fewer rows are not scored (their PSI would be mostly noise) and keep counting
+DRIFT_MIN_ROWS = 200
+
+# Floor of the bin shares in PSI, so empty bins do not make it infinite
+PSI_EPSILON = 1e-4
+
+DRIFT_PSI = bentoml.metrics.Gauge(
+    name='admission_drift_psi',
+    documentation='Population stability index of the last window against the training reference, per field',
+    labelnames=['model_version', 'field']
+)
+DRIFT_KS = bentoml.metrics.Gauge(
+    name='admission_drift_ks',
+    documentation='Kolmogorov-Smirnov distance of the last window to the training reference, per field (on the reference bins)',
+    labelnames=['model_version', 'field']
+)
+DRIFT_WINDOW_ROWS = bentoml.metrics.Gauge(
+    name='admission_drift_window_rows',
+    documentation='Rows in the last scored drift window',
+    labelnames=['model_version']
+)
+
+
+class DriftReference:
+    '''
+    Bin edges and training shares of every monitored field, in DRIFT_FIELDS order.
+    '''
+
+    def __init__(self, edges: list[np.ndarray], shares: list[np.ndarray]):
+        '''
+        Parameters:
+        - edges: list[np.ndarray] : Inner bin edges of each field; a value v falls into bin
+          searchsorted(edges, v, side='right'), so there is one bin more than edges.
+        - shares: list[np.ndarray] : Share of the reference rows in each bin.
+        '''
+        self.edges = [np.asarray(e, dtype=np.float64) for e in edges]
+        self.shares = [np.asarray(s, dtype=np.float64) for s in shares]
+
+    @classmethod
+    def fit(cls, X, predictions, bins: int = DRIFT_BINS) -> 'DriftReference':
+        '''
+        Build the reference from raw feature rows and model predictions.
+        Parameters:
+        - X: array-like : Raw feature rows, shape (n_rows, n_features) in FEATURE_COLUMNS order.
+        - predictions: array-like : The model's predictions on rows it was not trained on; a
+          forest's predictions on its own training rows sit closer to the targets than those
+          of new applicants, and would read as drift on unchanged traffic.
+        - bins: int : Quantile bins per field.
+        Returns:
+        - DriftReference : The edges and shares of every field.
+        '''
+        columns = list(np.asarray(X, dtype=np.float64).T) + [np.asarray(predictions, dtype=np.float64)]
+        quantiles = np.linspace(0, 1, bins + 1)[1:-1]
+        edges = [np.unique(np.quantile(column, quantiles)) for column in columns]
+        return cls(edges, [bin_counts(e, column) / len(column) for e, column in zip(edges, columns)])
+
+
+def bin_counts(edges: np.ndarray, values: np.ndarray) -> np.ndarray:
+    '''Number of values in each bin of edges.'''
+    return np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+
+
+def psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    '''
+    Population stability index of two distributions over the same bins (shares summing to 1).
+    Below 0.1 is usually read as stable, above 0.25 as a significant shift.
+    '''
+    expected = np.maximum(expected, PSI_EPSILON)
+    actual = np.maximum(actual, PSI_EPSILON)
+    return float(((actual - expected) * np.log(actual / expected)).sum())
+
+
+def ks_distance(expected: np.ndarray, actual: np.ndarray) -> float:
+    '''
+    Largest gap between the cumulative shares of two distributions over the same bins.
+    '''
+    return float(np.abs(np.cumsum(actual) - np.cumsum(expected)).max())
+
+
+class DriftMonitor:
+    '''
+    Streaming drift monitor of one model version. observe() is called on the request path;
+    binning and scoring run on the request that fills the pending list or ends the interval.
+    '''
+
+    def __init__(self, reference: DriftReference, model_version: str, interval: float = 60.0,
+                 buffer_rows: int = DRIFT_BUFFER_ROWS, min_rows: int = DRIFT_MIN_ROWS):
+        '''
+        Parameters:
+        - reference: DriftReference : The training distribution saved with the model.
+        - model_version: str : Model tag, the model_version label of the gauges.
+        - interval: float : Seconds between two scored windows.
+        - buffer_rows: int : Pending rows that trigger binning.
+        - min_rows: int : Rows a window needs to be scored.
+        '''
+        self.reference = reference
+        self.interval = interval
+        self.buffer_rows = buffer_rows
+        self.min_rows = min_rows
+        self.counts = [np.zeros(len(e) + 1, dtype=np.int64) for e in reference.edges]
+        self.window_rows = 0
+        self.scores: dict[str, dict[str, float]] = {}
+        self._pending: list[tuple[np.ndarray, list[float] | np.ndarray]] = []
+        self._pending_rows = 0
+        self._next_score = time.monotonic() + interval
+        self._lock = threading.Lock()
+        self._fold_lock = threading.Lock()
+        self._psi = [DRIFT_PSI.labels(model_version=model_version, field=field) for field in DRIFT_FIELDS]
+        self._ks = [DRIFT_KS.labels(model_version=model_version, field=field) for field in DRIFT_FIELDS]
+        self._window_rows = DRIFT_WINDOW_ROWS.labels(model_version=model_version)
+
+    def observe(self, X: np.ndarray, predictions: list[float] | np.ndarray) -> None:
+        '''
+        Record served rows and their predictions, from single requests or bulk scoring chunks.
+        Only keeps references, the rows are binned later.
+        '''
+        with self._lock:
+            self._pending.append((X, predictions))
+            self._pending_rows += len(predictions)
+            if self._pending_rows < self.buffer_rows and time.monotonic() < self._next_score:
+                return
+            pending, self._pending, self._pending_rows = self._pending, [], 0
+        self.fold(pending)
+
+    def fold(self, pending: list[tuple[np.ndarray, list[float] | np.ndarray]]) -> None:
+        '''
+        Bin pending rows into the window counts, and score the window if the interval has passed.
+        '''
+        with self._fold_lock:
+            if pending:
+                columns = np.column_stack([
+                    np.concatenate([X for X, _ in pending]),
+                    np.concatenate([np.asarray(p, dtype=np.float64) for _, p in pending])
+                ])
+                for counts, edges, column in zip(self.counts, self.reference.edges, columns.T):
+                    counts += bin_counts(edges, column)
+                self.window_rows += len(columns)
+            if time.monotonic() >= self._next_score:
+                if self.window_rows >= self.min_rows:
+                    self.score()
+                else:
+                    # Too few rows to score yet: the window runs for another interval
+                    self._next_score = time.monotonic() + self.interval
+
+    def flush(self) -> None:
+        '''Bin the pending rows now (e.g. in tests and benchmarks).'''
+        with self._lock:
+            pending, self._pending, self._pending_rows = self._pending, [], 0
+        self.fold(pending)
+
+    def score(self) -> dict[str, dict[str, float]]:
+        '''
+        Compare the window with the reference, export the scores and start a new window.
+        Returns:
+        - dict[str, dict[str, float]] : PSI and KS distance per field.
+        '''
+        scores = {}
+        for i, field in enumerate(DRIFT_FIELDS):
+            actual = self.counts[i] / max(self.window_rows, 1)
+            scores[field] = {'psi': psi(self.reference.shares[i], actual), 'ks': ks_distance(self.reference.shares[i], actual)}
+            self._psi[i].set(scores[field]['psi'])
+            self._ks[i].set(scores[field]['ks'])
+            self.counts[i][:] = 0
+        self._window_rows.set(self.window_rows)
+        self.window_rows = 0
+        self._next_score = time.monotonic() + self.interval
+        self.scores = scores
+        return scores
@@ -0,0 +1,227 @@
+'''
+Fast request decoding and response encoding for the /fast routes. Request bodies are decoded
+straight into NumPy feature rows, with msgspec when it is installed and the json module
+otherwise. Responses are written as bytes. The pydantic InputModel objects and response dicts
+of the regular endpoints are skipped.
+
+Validation follows InputModel in pydantic's lax mode: every field is required, other fields are
+ignored, numeric strings and booleans are coerced to numbers, and the integer fields (scores,
+rating, research) only take integral values. Non-finite numbers are rejected.
+'''
+import json
+from typing import Awaitable, Callable, Iterator
+import numpy as np
+from src.admission_control import BoundedExecutor, Overloaded, overloaded_response
+from src.batch_scoring import DEFAULT_CHUNK_SIZE
+from src.features import INPUT_FIELDS, ROW_DTYPE, validate_rows
+from src.instrumentation import stage
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if msgspec is not None:
+    # float fields accept JSON integers too; strings and booleans are coerced and integral values
+    # checked on the decoded rows, like the json fallback
+    Applicant = msgspec.defstruct('Applicant', [(field, float | str | bool) for field in INPUT_FIELDS])
+    _single_decoder = msgspec.json.Decoder(msgspec.defstruct('PredictBody', [('input_data', Applicant)]))
+    _batch_decoder = msgspec.json.Decoder(msgspec.defstruct('PredictBatchBody', [('inputs', list[Applicant]), ('chunk_size', int, DEFAULT_CHUNK_SIZE)]))
+
+
+class DecodeError(ValueError):
+    '''
+    Raised for request bodies that do not pass InputModel validation.
+    '''
+
+
+def _row_values(item) -> list:
+    if not isinstance(item, dict):
+        raise DecodeError('Each input must be a JSON object.')
+    try:
+        values = [item[field] for field in INPUT_FIELDS]
+    except KeyError as e:
+        raise DecodeError(f'Missing field {e}.') from None
+    for field, value in zip(INPUT_FIELDS, values):
+        if type(value) not in (int, float, str, bool):
+            raise DecodeError(f'{field} must be a number.')
+    return values
+
+
+def _as_rows(values: list) -> np.ndarray:
+    '''
+    Feature matrix of decoded field values; numeric strings and booleans are coerced like pydantic does.
+    '''
+    try:
+        return np.array(values, dtype=ROW_DTYPE).reshape(-1, len(INPUT_FIELDS))
+    except (TypeError, ValueError, OverflowError):
+        # e.g. a non-numeric string, or a JSON integer too large for a float
+        raise DecodeError('Inputs must be numbers or numeric strings.') from None
+
+
+def _validated(X: np.ndarray) -> np.ndarray:
+    try:
+        return validate_rows(X)
+    except ValueError as e:
+        raise DecodeError(str(e)) from None
+
+
+def decode_predict(body: bytes) -> np.ndarray:
+    '''
+    Decode a predict body ({"input_data": {...}}) into a feature row.
+    Returns:
+    - np.ndarray : Array of shape (1, n_features) in FEATURE_COLUMNS order.
+    '''
+    if msgspec is not None:
+        try:
+            applicant = _single_decoder.decode(body).input_data
+        except msgspec.ValidationError as e:
+            raise DecodeError(str(e)) from None
+        except msgspec.DecodeError:
+            raise DecodeError('Malformed JSON body.') from None
+        return _validated(_as_rows([msgspec.structs.astuple(applicant)]))
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise DecodeError('Malformed JSON body.') from None
+    if not isinstance(payload, dict) or 'input_data' not in payload:
+        raise DecodeError('Missing field input_data.')
+    return _validated(_as_rows([_row_values(payload['input_data'])]))
+
+
+def decode_predict_batch(body: bytes) -> tuple[np.ndarray, int]:
+    '''
+    Decode a predict_batch body ({"inputs": [{...}, ...], "chunk_size": n}).
+    Returns:
+    - tuple[np.ndarray, int] : The feature matrix in FEATURE_COLUMNS order and the chunk size.
+    '''
+    if msgspec is not None:
+        try:
+            payload = _batch_decoder.decode(body)
+        except msgspec.ValidationError as e:
+            raise DecodeError(str(e)) from None
+        except msgspec.DecodeError:
+            raise DecodeError('Malformed JSON body.') from None
+        X = _as_rows([msgspec.structs.astuple(a) for a in payload.inputs])
+        chunk_size = payload.chunk_size
+    else:
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            raise DecodeError('Malformed JSON body.') from None
+        if not isinstance(payload, dict) or not isinstance(payload.get('inputs'), list):
+            raise DecodeError('inputs must be a list.')
+        X = _as_rows([_row_values(item) for item in payload['inputs']])
+        chunk_size = payload.get('chunk_size', DEFAULT_CHUNK_SIZE)
+        if type(chunk_size) is not int:
+            raise DecodeError('chunk_size must be an integer.')
+    if chunk_size < 1:
+        raise DecodeError('chunk_size must be positive.')
+    return _validated(X), chunk_size
+
+
+def encode_prediction(prediction: float) -> bytes:
+    '''
+    JSON response of predict, {"admission_chance": p}, without building a dict.
+    '''
+    return b'{"admission_chance":%s}' % repr(float(prediction)).encode()
+
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def respond(send, status: int, body: bytes, content_type: bytes = b'application/json') -> None:
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', content_type), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def respond_stream(send, first: str, next_part: Callable[[], Awaitable[str | None]], content_type: bytes = b'text/csv') -> None:
+    '''
+    Stream a response part by part (chunked transfer), without joining it in memory.
+    '''
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', content_type)]})
+    part = first
+    while part is not None:
+        await send({'type': 'http.response.body', 'body': part.encode(), 'more_body': True})
+        part = await next_part()
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+class FastCodecApp:
+    '''
+    ASGI app of the fast routes, mounted on the service. The service instance of the worker
+    binds its prediction functions and its predict executor at startup:
+    - POST /predict: same body and response as the predict endpoint
+    - POST /predict_batch: same body and CSV response as the predict_batch endpoint
+    Scoring runs on the executor like predict_async, so the event loop never blocks on the
+    cache, lookup table or drift monitor, and calls beyond its queue get 503.
+    '''
+
+    ROUTES = ('/predict', '/predict_batch')
+
+    def __init__(self):
+        self.predict_rows: Callable[[np.ndarray], list[float]] | None = None
+        self.stream_scores: Callable[[Iterator[np.ndarray], int], Iterator[str]] | None = None
+        self.executor: BoundedExecutor | None = None
+
+    def bind(self, predict_rows: Callable[[np.ndarray], list[float]], stream_scores: Callable[[Iterator[np.ndarray], int], Iterator[str]],
+             executor: BoundedExecutor) -> None:
+        '''
+        Parameters:
+        - predict_rows: Callable : Predicts raw feature rows.
+        - stream_scores: Callable : Yields the CSV lines of chunks of raw feature rows.
+        - executor: BoundedExecutor : Admission-controlled pool the scoring runs on.
+        '''
+        self.predict_rows = predict_rows
+        self.stream_scores = stream_scores
+        self.executor = executor
+
+    def routes(self, mount_path: str) -> list[str]:
+        '''Full paths of the routes when mounted at mount_path.'''
+        return [f'{mount_path.rstrip("/")}{route}' for route in self.ROUTES]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return
+        path, root_path = scope['path'], scope.get('root_path', '')
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        if path not in self.ROUTES:
+            await respond(send, 404, b'{"message":"Not found"}')
+            return
+        if scope['method'] != 'POST':
+            await respond(send, 405, b'{"message":"Method not allowed"}')
+            return
+        if self.predict_rows is None:
+            await respond(send, 503, b'{"message":"Service is starting"}')
+            return
+        body = await read_body(receive)
+        try:
+            if path == '/predict':
+                with stage('features'):
+                    row = decode_predict(body)
+                prediction = (await self.executor.run(self.predict_rows, row))[0]
+                await respond(send, 200, encode_prediction(prediction))
+                return
+            with stage('features'):
+                X, chunk_size = decode_predict_batch(body)
+            chunks = (X[start:start + chunk_size] for start in range(0, len(X), chunk_size))
+            parts = self.stream_scores(chunks, chunk_size)
+            # The first chunk is scored before the response starts, so a rejection is still a 503
+            first = await self.executor.run(next, parts, None)
+        except DecodeError as e:
+            await respond(send, 400, json.dumps({'message': str(e)}).encode())
+            return
+        except Overloaded as e:
+            await overloaded_response('Too many predictions in progress', e.retry_after)(scope, receive, send)
+            return
+        # Each later chunk is one more executor call; a rejection then aborts the transfer, so
+        # the client sees an incomplete response rather than a short CSV
+        await respond_stream(send, first, lambda: self.executor.run(next, parts, None))
@@ -0,0 +1,142 @@
+'''
+Shared feature schema of the university admission data, used by data preparation,
+training and serving. Deliberately free of pandas so the service can import it cheaply.
+'''
+import numpy as np
+
+# Columns of the raw CSV that are not features
+ID_COLUMN = 'Serial No.'
+TARGET_COLUMN = 'Chance of Admit '  # Note the trailing space
+
+# Feature columns in the order the model is trained on (note the space after LOR)
+FEATURE_COLUMNS = ('GRE Score', 'TOEFL Score', 'University Rating', 'SOP', 'LOR ', 'CGPA', 'Research')
+
+# InputModel field holding each feature column, in FEATURE_COLUMNS order
+INPUT_FIELDS = ('gre_score', 'toefl_score', 'university_rating', 'sop', 'lor', 'cgpa', 'research')
+
+# Raw dtype of each feature column
+FEATURE_DTYPES = {
+    'GRE Score': np.int64,
+    'TOEFL Score': np.int64,
+    'University Rating': np.int64,
+    'SOP': np.float64,
+    'LOR ': np.float64,
+    'CGPA': np.float64,
+    'Research': np.int64
+}
+
+# Maximum score of each scaled feature; FeatureScaler divides these columns by it
+FEATURE_MAX_SCORES = {'GRE Score': 340, 'TOEFL Score': 120, 'University Rating': 5, 'SOP': 5.0, 'LOR ': 5.0, 'CGPA': 10.0}
+
+# (min, max, step) of each feature in admission.csv, for generating plausible applicant rows
+FEATURE_RANGES = {
+    'GRE Score': (290, 340, 1),
+    'TOEFL Score': (92, 120, 1),
+    'University Rating': (1, 5, 1),
+    'SOP': (1.0, 5.0, 0.5),
+    'LOR ': (1.0, 5.0, 0.5),
+    'CGPA': (6.8, 9.92, 0.01),
+    'Research': (0, 1, 1)
+}
+
+# Columns InputModel declares as int
+INTEGER_COLUMNS = np.array([np.issubdtype(FEATURE_DTYPES[column], np.integer) for column in FEATURE_COLUMNS])
+
+# dtype of model input rows
+ROW_DTYPE = np.float64
+
+# File name of the fitted scaler written by prepare_data next to the processed CSVs
+SCALER_FILE = 'scaler.joblib'
+
+
+class FeatureScaler:
+    '''
+    Max-score scaling of the feature columns, stored as one factor per column so that
+    training data and served rows go through exactly the same multiplication.
+    '''
+
+    def __init__(self, factors: np.ndarray):
+        '''
+        Parameters:
+        - factors: np.ndarray : Multiplier of each column in FEATURE_COLUMNS order.
+        '''
+        self.factors = np.asarray(factors, dtype=ROW_DTYPE)
+
+    @classmethod
+    def fit(cls, max_scores: dict = FEATURE_MAX_SCORES) -> 'FeatureScaler':
+        '''
+        Build the scaler from the maximum score of each column; unlisted columns are kept as is.
+        '''
+        return cls(np.array([1.0 / max_scores[c] if c in max_scores else 1.0 for c in FEATURE_COLUMNS]))
+
+    def transform(self, X) -> np.ndarray:
+        '''
+        Scale raw feature rows, shape (n_rows, n_features) in FEATURE_COLUMNS order.
+        '''
+        return np.asarray(X, dtype=ROW_DTYPE) * self.factors
+
+    def inverse_transform(self, X) -> np.ndarray:
+        '''
+        Raw feature rows of scaled ones, e.g. of the processed training split.
+        '''
+        return np.asarray(X, dtype=ROW_DTYPE) / self.factors
+
+
+def input_to_row(input_data) -> np.ndarray:
+    '''
+    Convert one validated input into a model input row without going through pandas.
+    Parameters:
+    - input_data: InputModel : The request payload.
+    Returns:
+    - np.ndarray : Array of shape (1, n_features) in FEATURE_COLUMNS order.
+    '''
+    return np.array([[getattr(input_data, field) for field in INPUT_FIELDS]], dtype=ROW_DTYPE)
+
+
+def inputs_to_matrix(inputs) -> np.ndarray:
+    '''
+    Convert validated inputs into a model input matrix without going through pandas.
+    Parameters:
+    - inputs: list[InputModel] : The request payloads.
+    Returns:
+    - np.ndarray : Array of shape (len(inputs), n_features) in FEATURE_COLUMNS order.
+    '''
+    matrix = np.empty((len(inputs), len(FEATURE_COLUMNS)), dtype=ROW_DTYPE)
+    for row, input_data in zip(matrix, inputs):
+        row[:] = [getattr(input_data, field) for field in INPUT_FIELDS]
+    return matrix
+
+
+def validate_rows(X: np.ndarray) -> np.ndarray:
+    '''
+    Check raw feature rows that did not go through InputModel (fast codec, uploaded files):
+    every value must be finite and the integer columns integral.
+    Parameters:
+    - X: np.ndarray : Raw feature rows, shape (n_rows, n_features) in FEATURE_COLUMNS order.
+    Returns:
+    - np.ndarray : X, unchanged.
+    '''
+    if not np.isfinite(X).all():
+        raise ValueError('Inputs must be finite numbers.')
+    integers = X[:, INTEGER_COLUMNS]
+    if (integers != np.floor(integers)).any():
+        raise ValueError(f'{", ".join(f for f, i in zip(INPUT_FIELDS, INTEGER_COLUMNS) if i)} must be integers.')
+    return X
+
+
+def sample_rows(n_rows: int, seed: int = 0) -> np.ndarray:
+    '''
+    Draw raw feature rows uniformly from FEATURE_RANGES, e.g. to warm up the model.
+    Parameters:
+    - n_rows: int : The number of rows.
+    - seed: int : The random seed.
+    Returns:
+    - np.ndarray : Array of shape (n_rows, n_features) in FEATURE_COLUMNS order.
+    '''
+    rng = np.random.default_rng(seed)
+    columns = []
+    for column in FEATURE_COLUMNS:
+        low, high, step = FEATURE_RANGES[column]
+        steps = int(round((high - low) / step))
+        columns.append(np.round(low + rng.integers(0, steps + 1, n_rows) * step, 2))
+    return np.stack(columns, axis=1).astype(ROW_DTYPE)
@@ -0,0 +1,233 @@
+'''
+Hot-path instrumentation: per-stage latency histograms exported on BentoML's /metrics, and an
+opt-in sampling profiler that writes folded stacks (flamegraph.pl / speedscope input) of
+slow requests.
+
+Stages timed inside a request are also collected per request, so the time BentoML spends
+outside of them (request decoding and InputModel validation, routing, response
+serialization) is reported as the 'framework' stage.
+'''
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Iterable
+import bentoml
+import numpy as np
+
+# Set ADMISSION_METRICS=0 to turn all stage timing into no-ops
+METRICS_ENABLED = os.environ.get('ADMISSION_METRICS', '1') != '0'
+
+# Requests slower than this (milliseconds) get their stacks dumped; 0 disables the profiler
+PROFILE_SLOW_MS = float(os.environ.get('ADMISSION_PROFILE_SLOW_MS', '0'))
+PROFILE_INTERVAL_MS = float(os.environ.get('ADMISSION_PROFILE_INTERVAL_MS', '5'))
+PROFILE_OUTPUT = os.environ.get('ADMISSION_PROFILE_OUTPUT', 'slow_requests.folded')
+
+# Latency buckets from 10us to 1s: most stages take microseconds, whole requests milliseconds
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+STAGE_DURATION = bentoml.metrics.Histogram(
+    name='admission_stage_duration_seconds',
+    documentation='Time spent per request stage (auth, password, queue, features, cache, lookup_table, model, explain, framework)',
+    labelnames=['stage'],
+    buckets=LATENCY_BUCKETS
+)
+REQUEST_DURATION = bentoml.metrics.Histogram(
+    name='admission_request_duration_seconds',
+    documentation='End-to-end request time per endpoint, including authentication',
+    labelnames=['endpoint'],
+    buckets=LATENCY_BUCKETS
+)
+SLOW_REQUESTS = bentoml.metrics.Counter(
+    name='admission_slow_requests_total',
+    documentation='Requests over ADMISSION_PROFILE_SLOW_MS whose stacks were dumped',
+    labelnames=['endpoint']
+)
+
+# Stage timings of the request being served, set by InstrumentationMiddleware
+_request_stages: ContextVar[dict | None] = ContextVar('admission_request_stages', default=None)
+
+# Histogram children per stage label, resolved on first use
+_stage_histograms: dict = {}
+
+_NOOP = nullcontext()
+
+
+class _Stage:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record_stage(self.name, time.perf_counter() - self.start)
+
+
+def stage(name: str):
+    '''
+    Context manager timing one stage of the current request:
+        with stage('model'):
+            predictions = model.predict(X)
+    Returns a shared no-op context manager when metrics are disabled.
+    '''
+    return _Stage(name) if METRICS_ENABLED else _NOOP
+
+
+def record_stage(name: str, seconds: float) -> None:
+    '''
+    Observe a stage duration in the histogram and in the current request's breakdown.
+    '''
+    histogram = _stage_histograms.get(name)
+    if histogram is None:
+        histogram = _stage_histograms[name] = STAGE_DURATION.labels(stage=name)
+    histogram.observe(seconds)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages[name] = stages.get(name, 0.0) + seconds
+
+
+def observe_values(histogram, values) -> None:
+    '''
+    Observe many values in a histogram child at once. Bucket counts are computed with NumPy
+    and added per bucket, instead of calling observe() once per value. This reads private
+    attributes of prometheus_client's Histogram, as laid out in the version pinned in
+    requirements.txt and bentofile.yaml; any other layout falls back to observe().
+    Parameters:
+    - histogram: prometheus_client Histogram child (from .labels()).
+    - values: array-like : The values to observe.
+    '''
+    if len(values) == 1:
+        histogram.observe(float(values[0]))
+        return
+    values = np.asarray(values, dtype=np.float64)
+    if not all(hasattr(histogram, name) for name in ('_upper_bounds', '_buckets', '_sum')):
+        for value in values.tolist():
+            histogram.observe(value)
+        return
+    # Same bucket as Histogram.observe: the first upper bound >= value (the last one is +Inf)
+    bounds = histogram._upper_bounds
+    counts = np.bincount(np.searchsorted(bounds, values, side='left'), minlength=len(bounds))
+    for bucket, count in zip(histogram._buckets, counts.tolist()):
+        if count:
+            bucket.inc(count)
+    histogram._sum.inc(float(values.sum()))
+
+
+def fold_stack(frame) -> str:
+    '''
+    Collapse a frame's call stack into 'root;...;leaf' with 'file:function' entries.
+    '''
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SlowRequestProfiler:
+    '''
+    Samples the stacks of all threads every interval_ms on a background thread and keeps the
+    recent samples. When a request ends slower than threshold_ms, the samples taken while it
+    ran are appended to the output file in folded format ('stack count' per line).
+    '''
+
+    # Leaf functions of threads that are idle rather than working
+    IDLE_FUNCTIONS = frozenset({'wait', 'select', 'poll', '_wait_for_tstate_lock'})
+
+    def __init__(self, threshold_ms: float, output_path: str, interval_ms: float = PROFILE_INTERVAL_MS, max_samples: int = 100000):
+        self.threshold = threshold_ms / 1000
+        self.output_path = output_path
+        self.interval = interval_ms / 1000
+        self.samples: deque[tuple[float, str]] = deque(maxlen=max_samples)
+        self._write_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='slow-request-profiler', daemon=True)
+
+    def start(self) -> 'SlowRequestProfiler':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def sample(self) -> None:
+        '''
+        Record the current stack of every other thread.
+        '''
+        now = time.perf_counter()
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id != own and frame.f_code.co_name not in self.IDLE_FUNCTIONS:
+                self.samples.append((now, fold_stack(frame)))
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def request_finished(self, endpoint: str, start: float, end: float) -> bool:
+        '''
+        Dump the stacks sampled between start and end (perf_counter) if the request was slow.
+        Returns:
+        - bool : Whether the request was over the threshold.
+        '''
+        if end - start < self.threshold:
+            return False
+        stacks = Counter(stack for t, stack in list(self.samples) if start <= t <= end)
+        prefix = endpoint.strip('/') or 'root'
+        with self._write_lock, open(self.output_path, 'a') as f:
+            f.writelines(f'{prefix};{stack} {count}\n' for stack, count in stacks.items())
+        return True
+
+
+class InstrumentationMiddleware:
+    '''
+    Pure ASGI middleware timing whole requests per endpoint and collecting the stage
+    timings recorded while serving them. Register it before JWTAuthMiddleware so that
+    authentication is included.
+    '''
+
+    def __init__(self, app, routes: Iterable[str], profile_slow_ms: float = PROFILE_SLOW_MS, profile_output: str = PROFILE_OUTPUT):
+        '''
+        Parameters:
+        - app : The ASGI app to wrap.
+        - routes: Iterable[str] : The endpoint paths to time; other paths pass through untouched.
+        - profile_slow_ms: float : Dump stacks of requests slower than this; 0 disables the profiler.
+        - profile_output: str : The file the folded stacks are appended to.
+        '''
+        self.app = app
+        self.routes = frozenset(routes)
+        # Started here rather than at import time, so only serving workers run the sampler
+        self.profiler = SlowRequestProfiler(profile_slow_ms, profile_output).start() if profile_slow_ms > 0 else None
+        self._histograms = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.routes:
+            await self.app(scope, receive, send)
+            return
+        stages = {}
+        token = _request_stages.set(stages)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            end = time.perf_counter()
+            _request_stages.reset(token)
+            self.observe(scope["path"], start, end, stages)
+
+    def observe(self, endpoint: str, start: float, end: float, stages: dict) -> None:
+        histogram = self._histograms.get(endpoint)
+        if histogram is None:
+            histogram = self._histograms[endpoint] = REQUEST_DURATION.labels(endpoint=endpoint)
+        histogram.observe(end - start)
+        record_stage('framework', max(0.0, end - start - sum(stages.values())))
+        if self.profiler is not None and self.profiler.request_finished(endpoint, start, end):
+            SLOW_REQUESTS.labels(endpoint=endpoint).inc()
@@ -1,38 +1,161 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable
+import bentoml
 from starlette.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
 import jwt
 from datetime import datetime, timedelta, timezone
+from src.instrumentation import stage
 
 # Secret key and algorithm for JWT authentication
 JWT_SECRET_KEY = "your_jwt_secret_key_here"
 JWT_ALGORITHM = "HS256"
 
-# User credentials for authentication
-USERS = {
-    "user123": "password123",
-    "user456": "password456"
-}
-
-class JWTAuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        if request.url.path == "/v1/models/rf_classifier/predict":
-            token = request.headers.get("Authorization")
-            if not token:
-                return JSONResponse(status_code=401, content={"detail": "Missing authentication token"})
-            try:
-                token = token.split()[1]  # Remove 'Bearer ' prefix
-                payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-            except jwt.ExpiredSignatureError:
-                return JSONResponse(status_code=401, content={"detail": "Token has expired"})
-            except jwt.InvalidTokenError:
-                return JSONResponse(status_code=401, content={"detail": "Invalid token"})
-            request.state.user = payload.get("sub")
-        response = await call_next(request)
-        return response
-    
+# Label of each authentication error in admission_auth_requests_total
+AUTH_RESULTS = {None: "ok", "Missing authentication token": "missing", "Invalid token": "invalid", "Token has expired": "expired"}
+
+# Maximum number of verified tokens remembered by the middleware
+TOKEN_CACHE_SIZE = 4096
+
+TOKEN_CACHE_REQUESTS = bentoml.metrics.Counter(
+    name='admission_jwt_cache_requests_total',
+    documentation='Verified-token cache lookups by result (hit or miss)',
+    labelnames=['result']
+)
+AUTH_REQUESTS = bentoml.metrics.Counter(
+    name='admission_auth_requests_total',
+    documentation='Authentication results on protected paths (ok, missing, invalid, expired)',
+    labelnames=['result']
+)
+
+
+class VerifiedTokenCache:
+    '''
+    Bounded LRU of tokens whose signature has already been verified, keyed by the SHA-256
+    digest of the token. Entries are dropped once the token's exp has passed, so a hit
+    never outlives the token itself.
+    '''
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hit_counter = TOKEN_CACHE_REQUESTS.labels(result='hit')
+        self._miss_counter = TOKEN_CACHE_REQUESTS.labels(result='miss')
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        '''
+        Return the payload of a previously verified, unexpired token, or None.
+        '''
+        key = self.digest(token)
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                if payload['exp'] > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self._hit_counter.inc()
+                    return payload
+                del self._entries[key]
+            self.misses += 1
+        self._miss_counter.inc()
+        return None
+
+    def put(self, token: str, payload: dict) -> None:
+        '''
+        Remember a verified token; tokens without exp are not cached.
+        '''
+        if self.maxsize <= 0 or not isinstance(payload.get('exp'), (int, float)):
+            return
+        key = self.digest(token)
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class JWTAuthMiddleware:
+    '''
+    Pure ASGI middleware requiring a valid Bearer JWT on the protected paths. The
+    authenticated user is stored in the request state (request.state.user).
+    '''
+
+    def __init__(self, app, protected_paths: Iterable[str], token_cache: VerifiedTokenCache | None = None):
+        self.app = app
+        self.protected_paths = frozenset(protected_paths)
+        self.token_cache = token_cache if token_cache is not None else VerifiedTokenCache()
+        self._auth_counters = {error: AUTH_REQUESTS.labels(result=result) for error, result in AUTH_RESULTS.items()}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.protected_paths:
+            await self.app(scope, receive, send)
+            return
+        with stage("auth"):
+            payload, error = self.authenticate(scope)
+        self._auth_counters[error].inc()
+        if error is not None:
+            response = JSONResponse(status_code=401, content={"detail": error})
+            await response(scope, receive, send)
+            return
+        scope.setdefault("state", {})["user"] = payload.get("sub")
+        await self.app(scope, receive, send)
+
+    def authenticate(self, scope) -> tuple[dict | None, str | None]:
+        '''
+        Verify the Authorization header of a request.
+        Returns:
+        - tuple : The token payload and None, or None and the error message.
+        '''
+        header = next((value for name, value in scope["headers"] if name == b"authorization"), None)
+        if not header:
+            return None, "Missing authentication token"
+        parts = header.decode("latin-1").split()
+        if len(parts) != 2:
+            return None, "Invalid token"
+        token = parts[1]  # Remove 'Bearer ' prefix
+        payload = self.token_cache.get(token)
+        if payload is not None:
+            return payload, None
+        try:
+            payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        except jwt.ExpiredSignatureError:
+            return None, "Token has expired"
+        except jwt.InvalidTokenError:
+            return None, "Invalid token"
+        self.token_cache.put(token, payload)
+        return payload, None
+
+def protected_api_routes(apis: dict, public_apis: Iterable[str] = ()) -> frozenset[str]:
+    '''
+    Routes of a BentoML service's API methods that require a token.
+    Parameters:
+    - apis: dict : The service's API methods by name (Service.apis).
+    - public_apis: Iterable[str] : Names of the API methods reachable without a token.
+    Returns:
+    - frozenset[str] : The routes to pass as protected_paths.
+    '''
+    public_apis = set(public_apis)
+    return frozenset(api.route for name, api in apis.items() if name not in public_apis)
+
 # Function to create a JWT token
 def create_jwt_token(user_id: str):
     expiration = datetime.now(timezone.utc) + timedelta(hours=1)
     payload = {"sub": user_id, "exp": expiration.timestamp()}
     token = jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
-    return token
\ No newline at end of file
+    return token
@@ -0,0 +1,235 @@
+'''
+Post-training compression of the admission forest under an RMSE budget. Smaller variants of
+the latest model are built in three ways:
+- tree selection: trees are added greedily, each time the one that brings the subset's
+  predictions closest to the full forest's, and the smallest subset within the budget is kept
+- depth caps: the same selection on trees cut at a lower depth
+- distillation (optional): a small gradient-boosted model fitted to the forest's predictions
+
+There is no linear student: the service serves every model through FlatForest, which only
+runs trees, so a linear model could not be deployed as a compressed variant.
+
+Ordering and subset sizes only look at the forest's own predictions on the training rows and
+on synthetic rows: a subset is kept once its predictions are within the budget (RMSE) of the
+full forest's. As RMSE obeys the triangle inequality, that bounds its loss against the
+targets too. The test split is only used for the final check of the RMSE budget, like
+train_model's evaluation, so the reported deltas are not tuned on it. The fastest variant
+within the budget is saved under its own BentoML model name, with a report of its speedup,
+size and accuracy deltas against the original.
+'''
+import os
+from os import path
+import argparse
+import copy
+import json
+import logging
+import bentoml
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor
+from src.features import FeatureScaler, sample_rows
+from src.drift import DRIFT_REFERENCE_KEY, DriftReference
+from src.data.prepare_data import load_split
+from src.model.flat_forest import FlatForest
+from src.model.hyperparameter_search import measure_latency
+from src.model.train_model import save_bento_model
+logging.basicConfig(level=logging.INFO)
+
+# Depths the trees are cut at (None keeps them whole)
+DEPTH_CAPS = (None, 12, 10, 8, 6, 4)
+
+# Synthetic rows added to the training rows to compare variants with the forest (and to
+# distil it), so regions of the input space without training data are covered too
+REFERENCE_ROWS = 5000
+
+# Gradient-boosted student fitted to the forest's predictions
+DISTIL_PARAMS = {'n_estimators': 100, 'max_depth': 3, 'learning_rate': 0.1, 'subsample': 0.8, 'random_state': 42}
+
+# Suffix of the BentoML model name the compressed variant is saved under
+COMPRESSED_SUFFIX = '_compressed'
+
+# Report of every variant of the last compression run
+COMPRESSION_REPORT_FILE = 'compression_report.json'
+
+
+def rmse(y_true: np.ndarray, y_pred: np.ndarray) -> float:
+    return float(np.sqrt(np.mean((np.asarray(y_true) - y_pred) ** 2)))
+
+
+def tree_predictions(flat_forest: FlatForest, X: np.ndarray) -> np.ndarray:
+    '''
+    Prediction of every tree on every row, shape (n_trees, n_rows).
+    '''
+    return flat_forest.value.take(flat_forest.apply(X))
+
+
+def greedy_tree_order(reference_predictions: np.ndarray) -> np.ndarray:
+    '''
+    Order the trees by greedy forward selection: each step adds the tree that brings the mean
+    of the selected trees closest (in squared error) to the mean of all trees.
+    Parameters:
+    - reference_predictions: np.ndarray : Per-tree predictions on the reference rows, shape (n_trees, n_rows).
+    Returns:
+    - np.ndarray : Tree indices in selection order.
+    '''
+    target = reference_predictions.mean(axis=0)
+    remaining = list(range(len(reference_predictions)))
+    order, selected_sum = [], np.zeros_like(target)
+    while remaining:
+        errors = (((selected_sum + reference_predictions[remaining]) / (len(order) + 1) - target) ** 2).mean(axis=1)
+        best = remaining.pop(int(np.argmin(errors)))
+        order.append(best)
+        selected_sum += reference_predictions[best]
+    return np.asarray(order)
+
+
+def smallest_subset(order: np.ndarray, reference_predictions: np.ndarray, target: np.ndarray, max_rmse: float) -> int | None:
+    '''
+    Number of trees of the shortest prefix of order whose mean prediction is within max_rmse
+    (RMSE) of target.
+    Parameters:
+    - order: np.ndarray : Tree indices in selection order.
+    - reference_predictions: np.ndarray : Per-tree predictions on the reference rows, shape (n_trees, n_rows).
+    - target: np.ndarray : Predictions to stay close to, e.g. the full forest's, shape (n_rows,).
+    - max_rmse: float : Largest accepted RMSE against target.
+    Returns:
+    - int | None : The number of trees, or None if no prefix is close enough.
+    '''
+    prefix_means = reference_predictions[order].cumsum(axis=0) / np.arange(1, len(order) + 1)[:, None]
+    errors = np.sqrt(((prefix_means - np.asarray(target)) ** 2).mean(axis=1))
+    within = np.flatnonzero(errors <= max_rmse)
+    return int(within[0]) + 1 if len(within) else None
+
+
+def compress(model, X_train: np.ndarray, X_test: np.ndarray, y_test: np.ndarray, max_rmse_increase: float,
+             distil: bool = False, reference_rows: int = REFERENCE_ROWS) -> tuple[dict, list[dict]]:
+    '''
+    Build the compressed variants of a fitted forest and measure them against it.
+    Parameters:
+    - model: RandomForestRegressor : The fitted forest.
+    - X_train: np.ndarray : Scaled training rows.
+    - X_test: np.ndarray : Scaled test rows.
+    - y_test: np.ndarray : Test targets.
+    - max_rmse_increase: float : Largest accepted test RMSE increase over the forest (absolute).
+    - distil: bool : Also fit a gradient-boosted student to the forest.
+    - reference_rows: int : Synthetic rows added to the training rows for ordering and distillation.
+    Returns:
+    - tuple[dict, list[dict]] : Metrics of the original forest and of every variant; variants
+      carry their FlatForest under 'flat_forest' and the sklearn model to store under 'model'.
+    '''
+    X_reference = np.concatenate([np.asarray(X_train), FeatureScaler.fit().transform(sample_rows(reference_rows))])
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    original = FlatForest.from_trees(trees)
+    original_metrics = {'method': 'original', 'n_trees': original.n_trees, 'max_depth': original.max_depth,
+                        'rmse': rmse(y_test, original.predict(X_test)), **measure_latency(original, X_test)}
+    max_rmse = original_metrics['rmse'] + max_rmse_increase
+    reference_target = original.predict(X_reference)
+
+    variants = []
+    for depth_cap in DEPTH_CAPS:
+        if depth_cap is not None and depth_cap >= original.max_depth:
+            continue
+        capped = FlatForest.from_trees(trees, max_depth=depth_cap)
+        reference_predictions = tree_predictions(capped, X_reference)
+        order = greedy_tree_order(reference_predictions)
+        n_trees = smallest_subset(order, reference_predictions, reference_target, max_rmse_increase)
+        if n_trees is None:
+            logging.info(f'No tree subset at depth {depth_cap} stays within RMSE {max_rmse_increase} of the forest.')
+            continue
+        selected = sorted(order[:n_trees])
+        flat_forest = FlatForest.from_trees([trees[i] for i in selected], max_depth=depth_cap)
+        subset = copy.copy(model)
+        subset.estimators_ = [model.estimators_[i] for i in selected]
+        subset.n_estimators = n_trees
+        variants.append({'method': 'tree_selection' if depth_cap is None else 'depth_cap', 'flat_forest': flat_forest, 'model': subset})
+
+    if distil:
+        student = GradientBoostingRegressor(**DISTIL_PARAMS).fit(X_reference, original.predict(X_reference))
+        variants.append({'method': 'distillation', 'flat_forest': FlatForest.from_sklearn(student), 'model': student})
+
+    for variant in variants:
+        flat_forest = variant['flat_forest']
+        variant.update({'n_trees': flat_forest.n_trees, 'max_depth': flat_forest.max_depth,
+                        'rmse': rmse(y_test, flat_forest.predict(X_test)), **measure_latency(flat_forest, X_test)})
+        variant.update({
+            'rmse_delta': variant['rmse'] - original_metrics['rmse'],
+            'within_budget': variant['rmse'] <= max_rmse,
+            'speedup': original_metrics['single_row_us'] / variant['single_row_us'],
+            'batch_speedup': original_metrics['batch_us_per_row'] / variant['batch_us_per_row'],
+            'size_ratio': variant['size_bytes'] / original_metrics['size_bytes']
+        })
+        logging.info(f"{variant['method']}: {variant['n_trees']} trees, depth {variant['max_depth']}, RMSE {variant['rmse_delta']:+.5f}, "
+                     f"{variant['speedup']:.1f}x faster, {variant['size_ratio']:.1%} of the size.")
+    return original_metrics, variants
+
+
+def compress_model(model_name: str, processed_data_path: str, max_rmse_increase: float, distil: bool = False,
+                   report_path: str | None = None) -> bentoml.Model | None:
+    '''
+    Compress the latest model of that name and save the fastest variant within the RMSE budget
+    as "<model_name>_compressed", with its metrics as labels.
+    Parameters:
+    - model_name: str : Name of the model in the BentoML model store.
+    - processed_data_path: str : The directory with the processed splits (prepare_data).
+    - max_rmse_increase: float : Largest accepted test RMSE increase (absolute).
+    - distil: bool : Also consider a gradient-boosted student.
+    - report_path: str | None : JSON file to write the comparison of all variants to.
+    Returns:
+    - bentoml.Model | None : The saved model, or None if no variant is within the budget.
+    '''
+    bento_model = bentoml.models.get(f'{model_name}:latest')
+    X_train = load_split(processed_data_path, 'X_train')
+    X_test = load_split(processed_data_path, 'X_test')
+    y_test = load_split(processed_data_path, 'y_test')
+    original, variants = compress(bento_model.load_model(), X_train, X_test, y_test, max_rmse_increase, distil=distil)
+    eligible = [v for v in variants if v['within_budget']]
+    selected = min(eligible, key=lambda v: (v['single_row_us'], v['size_bytes'])) if eligible else None
+
+    if report_path:
+        os.makedirs(path.dirname(report_path) or '.', exist_ok=True)
+        with open(report_path, 'w') as f:
+            json.dump({
+                'source': str(bento_model.tag),
+                'max_rmse_increase': max_rmse_increase,
+                'original': original,
+                'variants': [{k: v for k, v in variant.items() if k not in ('flat_forest', 'model')} for variant in variants],
+                'selected': selected and selected['method']
+            }, f, indent=2)
+        logging.info(f'Compression report written to {report_path}.')
+    if selected is None:
+        logging.warning(f'No variant of {bento_model.tag} stays within an RMSE increase of {max_rmse_increase}.')
+        return None
+
+    labels = {
+        'source_model': str(bento_model.tag),
+        'method': selected['method'],
+        'n_trees': str(selected['n_trees']),
+        'max_depth': str(selected['max_depth']),
+        'rmse_delta': f"{selected['rmse_delta']:.6f}",
+        'speedup': f"{selected['speedup']:.2f}",
+        'size_ratio': f"{selected['size_ratio']:.4f}"
+    }
+    scaler = bento_model.custom_objects.get('scaler') or FeatureScaler.fit()
+    # Same inputs as the source model, but the held-out predictions of the compressed one
+    drift_reference = DriftReference.fit(scaler.inverse_transform(X_train), selected['flat_forest'].predict(X_test))
+    # The flat forest file is what the service serves; the sklearn model (the tree subset or
+    # the student) only documents it, as it cannot express a depth cap
+    compressed = save_bento_model(f'{model_name}{COMPRESSED_SUFFIX}', selected['model'], selected['flat_forest'],
+                                  custom_objects={'scaler': scaler, DRIFT_REFERENCE_KEY: drift_reference},
+                                  labels=labels, metadata={'source_model': str(bento_model.tag), 'rmse': selected['rmse']})
+    logging.info(f'Compressed model saved as {compressed.tag}: {labels}.')
+    return compressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compress the latest admission model within an RMSE budget.')
+    parser.add_argument('--max-rmse-increase', type=float, default=0.002, help='Largest accepted test RMSE increase (absolute).')
+    parser.add_argument('--distil', action='store_true', help='Also distil the forest into a small gradient-boosted model.')
+    parser.add_argument('--model', default='university_admission_rf_model', help='BentoML model name.')
+    args = parser.parse_args()
+
+    processed_data_path = path.join(os.getcwd(), 'data', 'processed')
+    report_path = path.join(os.getcwd(), 'models', COMPRESSION_REPORT_FILE)
+    compress_model(args.model, processed_data_path, args.max_rmse_increase, distil=args.distil, report_path=report_path)
+
+if __name__ == "__main__":
+    main()
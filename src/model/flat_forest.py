@@ -0,0 +1,206 @@
+import os
+import numpy as np
+
+# Maximum absolute difference to sklearn's RandomForestRegressor.predict. With n_jobs=1 sklearn
+# sums the trees in order, exactly like FlatForest, and the results are bit-for-bit identical.
+# With n_jobs>1 sklearn adds the trees in thread completion order, so the last bits may differ.
+PREDICTION_TOLERANCE = 1e-12
+
+# Rows traversed together in predict; larger batches are processed chunk by chunk
+CHUNK_SIZE = 512
+
+# File the node arrays are stored in, inside the BentoML model directory
+FLAT_FOREST_FILE = 'flat_forest.joblib'
+
+
+class FlatForest:
+    '''
+    Random forest regressor flattened into contiguous NumPy arrays for fast inference.
+    The nodes of all trees are concatenated; leaves point to themselves so that every
+    row can be walked through all trees at once for a fixed number of steps.
+    '''
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children: np.ndarray, value: np.ndarray, roots: np.ndarray, max_depth: int):
+        '''
+        Parameters:
+        - feature: np.ndarray : Feature index tested at each node (int32, 0 for leaves).
+        - threshold: np.ndarray : Split threshold at each node (float64, +inf for leaves).
+        - children: np.ndarray : Left/right child of each node, shape (n_nodes, 2) (int32).
+        - value: np.ndarray : Prediction stored at each node (float64).
+        - roots: np.ndarray : Index of the root node of each tree (int32).
+        - max_depth: int : Depth of the deepest tree, i.e. the number of traversal steps.
+        '''
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_sklearn(cls, model) -> 'FlatForest':
+        '''
+        Export a fitted sklearn RandomForestRegressor or GradientBoostingRegressor (single
+        output) into flat arrays.
+        Parameters:
+        - model: RandomForestRegressor | GradientBoostingRegressor : The fitted ensemble.
+        Returns:
+        - FlatForest : The flattened forest.
+        '''
+        if hasattr(model, 'init_'):
+            # Boosting predicts init + learning_rate * sum(trees); scaling every leaf by
+            # n_trees * learning_rate and adding init turns that sum into the forest's mean
+            trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+            init = 0.0 if model.init_ == 'zero' else float(model.init_.predict(np.zeros((1, model.n_features_in_)))[0])
+            return cls.from_trees(trees, value_scale=len(trees) * model.learning_rate, value_offset=init)
+        return cls.from_trees([estimator.tree_ for estimator in model.estimators_])
+
+    @classmethod
+    def from_trees(cls, trees: list, max_depth: int | None = None, value_scale: float = 1.0, value_offset: float = 0.0) -> 'FlatForest':
+        '''
+        Flatten sklearn tree structures (the tree_ of fitted estimators), predicting their mean.
+        Parameters:
+        - trees: list : The sklearn Tree objects.
+        - max_depth: int | None : Cut the trees at this depth: nodes at that depth become
+          leaves predicting their training mean, deeper nodes are dropped.
+        - value_scale: float : Factor applied to every node value.
+        - value_offset: float : Constant added to every node value after scaling.
+        Returns:
+        - FlatForest : The flattened forest.
+        '''
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        depths = []
+        for tree in trees:
+            is_leaf = tree.children_left == -1
+            keep = np.ones(tree.node_count, dtype=bool)
+            if max_depth is not None and tree.max_depth > max_depth:
+                depth = np.zeros(tree.node_count, dtype=np.int32)
+                # Nodes are numbered depth-first, parents before children, so one pass suffices
+                for node in np.flatnonzero(~is_leaf):
+                    depth[tree.children_left[node]] = depth[tree.children_right[node]] = depth[node] + 1
+                keep = depth <= max_depth
+                is_leaf = is_leaf | (depth == max_depth)
+            node_ids = np.cumsum(keep) - 1 + offset
+            left = np.where(is_leaf, node_ids, node_ids[tree.children_left])[keep]
+            right = np.where(is_leaf, node_ids, node_ids[tree.children_right])[keep]
+            features.append(np.where(is_leaf, 0, tree.feature)[keep])
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold)[keep])
+            children.append(np.stack([left, right], axis=1))
+            values.append(tree.value[keep, 0, 0] * value_scale + value_offset)
+            roots.append(offset)
+            offset += int(keep.sum())
+            depths.append(tree.max_depth if max_depth is None else min(tree.max_depth, max_depth))
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.int32),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            children=np.ascontiguousarray(np.concatenate(children), dtype=np.int32),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max(depths)
+        )
+
+    def save(self, file_path: str) -> None:
+        '''
+        Write the node arrays uncompressed with joblib, so that load can memory-map them. The
+        file is written under a temporary name and renamed, so concurrent workers exporting
+        the same forest never map a partially written file.
+        '''
+        import joblib
+        tmp_path = f'{file_path}.{os.getpid()}.tmp'
+        joblib.dump({
+            'feature': self.feature, 'threshold': self.threshold, 'children': self.children,
+            'value': self.value, 'roots': self.roots, 'max_depth': self.max_depth
+        }, tmp_path)
+        os.replace(tmp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path: str, mmap_mode: str | None = 'r') -> 'FlatForest':
+        '''
+        Load a forest written by save. With mmap_mode='r' the arrays stay in the page cache,
+        shared by every worker process that maps the same file, instead of being copied
+        onto each worker's heap.
+        '''
+        import joblib
+        data = joblib.load(file_path, mmap_mode=mmap_mode)
+        # Plain ndarray views of the maps avoid np.memmap's per-operation overhead
+        return cls(**{name: np.asarray(value) if isinstance(value, np.ndarray) else value for name, value in data.items()})
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        '''Total size of the node arrays in bytes.'''
+        return self.feature.nbytes + self.threshold.nbytes + self.children.nbytes + self.value.nbytes + self.roots.nbytes
+
+    def apply(self, X) -> np.ndarray:
+        '''
+        Find the leaf reached by each row in each tree.
+        Parameters:
+        - X: array-like : Input rows, shape (n_rows, n_features), in training column order.
+        Returns:
+        - np.ndarray : Leaf node indices, shape (n_trees, n_rows).
+        '''
+        # sklearn compares float32 inputs against float64 thresholds; do the same
+        X = np.asarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        flat_children = self.children.ravel()
+        # One entry per (tree, row) pair, tree-major; 1-D arrays keep the per-step overhead low
+        node = np.repeat(self.roots, n_rows)
+        row_offsets = np.tile(np.arange(n_rows, dtype=np.int32) * n_features, self.n_trees) if n_rows > 1 else None
+        # ndarray.take is markedly faster than fancy indexing on these small arrays
+        for _ in range(self.max_depth):
+            index = self.feature.take(node)
+            if row_offsets is not None:
+                index += row_offsets
+            go_right = flat_X.take(index) > self.threshold.take(node)
+            node = flat_children.take((node << 1) + go_right)
+        return node.reshape(self.n_trees, n_rows)
+
+    def predict(self, X) -> np.ndarray:
+        '''
+        Predict with the mean of all trees, matching RandomForestRegressor.predict.
+        Parameters:
+        - X: array-like : Input rows, shape (n_rows, n_features), in training column order.
+        Returns:
+        - np.ndarray : One prediction per row.
+        '''
+        X = np.asarray(X)
+        if len(X) > CHUNK_SIZE:
+            # Keep the per-step working set cache-sized for large batches
+            return np.concatenate([self.predict(X[i:i + CHUNK_SIZE]) for i in range(0, len(X), CHUNK_SIZE)])
+        # cumsum adds the trees one by one in order, like sklearn; sum() would use pairwise summation
+        return self.value.take(self.apply(X)).cumsum(axis=0)[-1] / self.n_trees
+
+    def contributions(self, X) -> tuple[float, np.ndarray]:
+        '''
+        Decision-path feature contributions. Along a row's path, every split moves the tree's
+        value from the parent node to the child, and the difference is credited to the split
+        feature. Averaged over the trees, the bias (mean root value) plus a row's contributions
+        equal its prediction. All trees and rows are walked together, like apply.
+        Parameters:
+        - X: array-like : Input rows, shape (n_rows, n_features), in training column order.
+        Returns:
+        - tuple[float, np.ndarray] : The bias and the contributions, shape (n_rows, n_features).
+        '''
+        X = np.asarray(X)
+        bias = float(self.value.take(self.roots).mean())
+        if len(X) > CHUNK_SIZE:
+            return bias, np.concatenate([self.contributions(X[i:i + CHUNK_SIZE])[1] for i in range(0, len(X), CHUNK_SIZE)])
+        X = np.asarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        flat_children = self.children.ravel()
+        node = np.repeat(self.roots, n_rows)
+        row_offsets = np.tile(np.arange(n_rows, dtype=np.int64) * n_features, self.n_trees)
+        totals = np.zeros(n_rows * n_features)
+        for _ in range(self.max_depth):
+            # Leaves point to themselves, so rows already at a leaf add a zero difference
+            slot = row_offsets + self.feature.take(node)
+            child = flat_children.take((node << 1) + (flat_X.take(slot) > self.threshold.take(node)))
+            totals += np.bincount(slot, weights=self.value.take(child) - self.value.take(node), minlength=len(totals))
+            node = child
+        return bias, totals.reshape(n_rows, n_features) / self.n_trees
@@ -0,0 +1,215 @@
+'''
+Hyperparameter search for the admission random forest. Candidates are fitted and scored on a
+validation split in a process pool, either the whole grid at once or with successive halving:
+every round trains on HALVING_FACTOR times more rows and only keeps the best 1/HALVING_FACTOR
+of the candidates, so poor settings are stopped early on a fraction of the data.
+
+The candidates of the last round are exported to flat forests and timed in the main process,
+one after the other, so the latencies are not skewed by fits running next to them. The model
+to serve is picked from the Pareto front of validation RMSE, single-row latency and size.
+'''
+import itertools
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import root_mean_squared_error
+from sklearn.model_selection import train_test_split
+from src.model.flat_forest import FlatForest
+
+# Values tried for each RandomForestRegressor parameter
+SEARCH_SPACE = {
+    'n_estimators': [25, 50, 100, 200],
+    'max_depth': [None, 8, 12, 16],
+    'min_samples_leaf': [1, 2, 5]
+}
+
+# Fixed parameters of every candidate; each worker process fits on a single core
+CANDIDATE_PARAMS = {'criterion': 'friedman_mse', 'random_state': 42, 'n_jobs': 1}
+
+# Share of the training split held out to score the candidates (the test split stays untouched)
+VALIDATION_SIZE = 0.2
+RANDOM_STATE = 42
+
+# Successive halving: growth of the training rows and shrink of the candidates per round
+HALVING_FACTOR = 3
+# Candidates left for the last round, which trains on all rows and measures latency and size
+FINALISTS = 6
+# Fewest training rows a halving round is run with
+MIN_ROWS = 50
+
+# Single-row predictions timed per finalist, and rows of the timed batch
+LATENCY_REPEATS = 200
+BATCH_ROWS = 1024
+BATCH_REPEATS = 5
+
+# Objectives of the Pareto front, all minimized
+OBJECTIVES = ('rmse', 'single_row_us', 'size_bytes')
+
+# Data of the search, set once per worker process by the pool initializer
+_data = {}
+
+
+def _init_worker(X_fit: np.ndarray, y_fit: np.ndarray, X_val: np.ndarray, y_val: np.ndarray) -> None:
+    _data.update(X_fit=X_fit, y_fit=y_fit, X_val=X_val, y_val=y_val)
+
+
+def candidates(space: dict[str, list]) -> list[dict]:
+    '''
+    All parameter combinations of a search space, in a stable order.
+    '''
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def halving_schedule(n_candidates: int, n_rows: int, factor: int = HALVING_FACTOR, finalists: int = FINALISTS,
+                     min_rows: int = MIN_ROWS) -> list[tuple[int, int]]:
+    '''
+    Rounds of successive halving, as (candidates, training rows) pairs. The last round keeps at
+    most `finalists` candidates and trains them on all rows.
+    Parameters:
+    - n_candidates: int : Candidates of the first round.
+    - n_rows: int : Training rows available.
+    - factor: int : Growth of the rows and shrink of the candidates per round.
+    - finalists: int : Most candidates of the last round.
+    - min_rows: int : Fewest training rows of a round.
+    Returns:
+    - list[tuple[int, int]] : Candidates and training rows of each round.
+    '''
+    counts = [n_candidates]
+    while counts[-1] > finalists:
+        counts.append(max(finalists, math.ceil(counts[-1] / factor)))
+    rounds = len(counts)
+    return [(count, min(n_rows, max(min_rows, n_rows // factor ** (rounds - 1 - i)))) for i, count in enumerate(counts)]
+
+
+def evaluate_candidate(params: dict, n_rows: int | None = None, export: bool = False) -> dict:
+    '''
+    Fit a candidate on the first n_rows training rows (the split is already shuffled) of the
+    worker's data and score it on the validation rows.
+    Parameters:
+    - params: dict : Searched parameters of the candidate.
+    - n_rows: int | None : Training rows to fit on; all of them if None.
+    - export: bool : Also return the fitted forest as a FlatForest, to time it.
+    Returns:
+    - dict : params, rows, rmse, fit_seconds and, if exported, flat_forest.
+    '''
+    X_fit, y_fit = _data['X_fit'][:n_rows], _data['y_fit'][:n_rows]
+    start = time.perf_counter()
+    model = RandomForestRegressor(**CANDIDATE_PARAMS, **params).fit(X_fit, y_fit)
+    result = {
+        'params': params,
+        'rows': len(X_fit),
+        'rmse': float(root_mean_squared_error(_data['y_val'], model.predict(_data['X_val']))),
+        'fit_seconds': time.perf_counter() - start
+    }
+    if export:
+        result['flat_forest'] = FlatForest.from_sklearn(model)
+    return result
+
+
+def measure_latency(flat_forest: FlatForest, X: np.ndarray) -> dict:
+    '''
+    Median single-row latency and per-row latency of a BATCH_ROWS batch, in microseconds,
+    and the size of the node arrays.
+    '''
+    X = np.ascontiguousarray(X)
+    flat_forest.predict(X[:1])
+    single = []
+    for i in range(LATENCY_REPEATS):
+        row = X[i % len(X)][None, :]
+        start = time.perf_counter()
+        flat_forest.predict(row)
+        single.append(time.perf_counter() - start)
+    batch = X[np.arange(BATCH_ROWS) % len(X)]
+    batched = []
+    for _ in range(BATCH_REPEATS):
+        start = time.perf_counter()
+        flat_forest.predict(batch)
+        batched.append(time.perf_counter() - start)
+    return {
+        'single_row_us': float(np.median(single)) * 1e6,
+        'batch_us_per_row': float(np.median(batched)) / BATCH_ROWS * 1e6,
+        'size_bytes': flat_forest.nbytes
+    }
+
+
+def pareto_front(results: list[dict], objectives: tuple[str, ...] = OBJECTIVES) -> list[dict]:
+    '''
+    Results not dominated by another one, i.e. no other result is at least as good on every
+    objective and better on one.
+    '''
+    def dominates(a: dict, b: dict) -> bool:
+        return all(a[o] <= b[o] for o in objectives) and any(a[o] < b[o] for o in objectives)
+
+    return [r for r in results if not any(dominates(other, r) for other in results if other is not r)]
+
+
+def select_candidate(front: list[dict], rmse_tolerance: float) -> dict:
+    '''
+    The fastest single-row candidate of the Pareto front whose RMSE is within rmse_tolerance
+    (a fraction) of the best RMSE; ties go to the smaller model.
+    '''
+    best_rmse = min(r['rmse'] for r in front)
+    eligible = [r for r in front if r['rmse'] <= best_rmse * (1 + rmse_tolerance)]
+    return min(eligible, key=lambda r: (r['single_row_us'], r['size_bytes'], r['rmse']))
+
+
+def search(X_train: np.ndarray, y_train: np.ndarray, schedule: str = 'halving', space: dict[str, list] = SEARCH_SPACE,
+           workers: int | None = None, rmse_tolerance: float = 0.01) -> tuple[dict, list[dict]]:
+    '''
+    Search the forest parameters on a validation split carved out of the training split.
+    Parameters:
+    - X_train: np.ndarray : Scaled training features.
+    - y_train: np.ndarray : Training targets.
+    - schedule: str : 'grid' to score every candidate on all rows, 'halving' for successive halving.
+    - space: dict[str, list] : Values tried for each parameter.
+    - workers: int | None : Processes fitting candidates; the number of CPUs if None.
+    - rmse_tolerance: float : RMSE loss (a fraction of the best) accepted for a faster model.
+    Returns:
+    - tuple[dict, list[dict]] : The selected candidate, and every evaluation of the search
+      (finalists carry single_row_us, batch_us_per_row, size_bytes and pareto).
+    '''
+    if schedule not in ('grid', 'halving'):
+        raise ValueError(f'Unknown search schedule "{schedule}".')
+    X_fit, X_val, y_fit, y_val = train_test_split(np.asarray(X_train), np.asarray(y_train), test_size=VALIDATION_SIZE, random_state=RANDOM_STATE)
+    remaining = candidates(space)
+    rounds = halving_schedule(len(remaining), len(X_fit)) if schedule == 'halving' else [(len(remaining), len(X_fit))]
+    evaluations = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(X_fit, y_fit, X_val, y_val)) as executor:
+        for i, (count, n_rows) in enumerate(rounds):
+            remaining = remaining[:count]
+            last = i == len(rounds) - 1
+            results = list(executor.map(evaluate_candidate, remaining, itertools.repeat(n_rows), itertools.repeat(last)))
+            for result in results:
+                result['round'] = i
+            evaluations.extend(results)
+            logging.info(f'Search round {i}: {len(results)} candidates on {n_rows} rows, best RMSE {min(r["rmse"] for r in results):.5f}.')
+            remaining = [r['params'] for r in sorted(results, key=lambda r: r['rmse'])]
+
+    finalists = [r for r in evaluations if 'flat_forest' in r]
+    for result in finalists:
+        result.update(measure_latency(result.pop('flat_forest'), X_val))
+    front = pareto_front(finalists)
+    for result in finalists:
+        result['pareto'] = any(result is r for r in front)
+    best = select_candidate(front, rmse_tolerance)
+    logging.info(f'Selected {best["params"]}: RMSE {best["rmse"]:.5f}, {best["single_row_us"]:.1f}us per row, {best["size_bytes"]} bytes.')
+    return best, evaluations
+
+
+def search_labels(best: dict) -> dict[str, str]:
+    '''
+    BentoML labels (string values) with the parameters and measured metrics of a candidate.
+    '''
+    labels = {name: str(value) for name, value in best['params'].items()}
+    labels.update({
+        'validation_rmse': f'{best["rmse"]:.6f}',
+        'single_row_us': f'{best["single_row_us"]:.2f}',
+        'batch_us_per_row': f'{best["batch_us_per_row"]:.3f}',
+        'size_bytes': str(best['size_bytes'])
+    })
+    return labels
@@ -0,0 +1,189 @@
+'''
+Precomputed lookup table of model outputs over the discrete input grid. Every feature except
+CGPA only takes a few values, so the forest can be evaluated once per grid point at build time;
+CGPA is bucketed at a configurable resolution. Serving then becomes an array lookup in a
+memory-mapped .npy file, with the live model as fallback for inputs outside the grid.
+'''
+import argparse
+import json
+import logging
+import os
+import time
+from os import path
+import numpy as np
+from src.features import FEATURE_COLUMNS
+
+# (start, stop, step, bucketed) of each feature in FEATURE_COLUMNS order. Bucketed features are
+# rounded to the nearest grid value, the others must lie exactly on the grid.
+DEFAULT_GRID = {
+    'GRE Score': (290, 340, 1, False),
+    'TOEFL Score': (90, 120, 1, False),
+    'University Rating': (1, 5, 1, False),
+    'SOP': (1.0, 5.0, 0.5, False),
+    'LOR ': (1.0, 5.0, 0.5, False),
+    'CGPA': (6.5, 10.0, 0.1, True),
+    'Research': (0, 1, 1, False)
+}
+
+LOOKUP_TABLE_FILE = path.join('models', 'admission_lut.npy')
+LOOKUP_TABLE_DTYPE = np.float32
+
+# Grid points evaluated per model call while building
+BUILD_CHUNK_SIZE = 65536
+
+# Tolerance for a non-bucketed value to count as on the grid
+GRID_TOLERANCE = 1e-9
+
+
+def spec_path(table_path: str) -> str:
+    '''Path of the JSON grid specification stored next to the table.'''
+    return path.splitext(table_path)[0] + '.json'
+
+
+class LookupTable:
+    '''
+    Model outputs for every point of a regular grid over the raw features.
+    '''
+
+    def __init__(self, table: np.ndarray, grid: dict, model_tag: str | None = None):
+        '''
+        Parameters:
+        - table: np.ndarray : Predictions, one axis per feature in FEATURE_COLUMNS order.
+        - grid: dict : (start, stop, step, bucketed) of each feature column.
+        - model_tag: str | None : Tag of the model the table was computed from.
+        '''
+        self.table = table
+        self.grid = grid
+        self.model_tag = model_tag
+        axes = [grid[c] for c in FEATURE_COLUMNS]
+        self.start = np.array([a[0] for a in axes], dtype=np.float64)
+        self.step = np.array([a[2] for a in axes], dtype=np.float64)
+        self.bucketed = np.array([a[3] for a in axes], dtype=bool)
+        self.shape = np.array(table.shape)
+        self._flat_table = table.reshape(-1)
+
+    @staticmethod
+    def grid_shape(grid: dict) -> tuple[int, ...]:
+        return tuple(int(round((stop - start) / step)) + 1 for start, stop, step, _ in (grid[c] for c in FEATURE_COLUMNS))
+
+    @classmethod
+    def build(cls, model, grid: dict = DEFAULT_GRID, out_path: str | None = None, model_tag: str | None = None) -> 'LookupTable':
+        '''
+        Evaluate the model on every grid point.
+        Parameters:
+        - model: object : Anything with a predict(X) method on raw feature rows.
+        - grid: dict : (start, stop, step, bucketed) of each feature column.
+        - out_path: str | None : If given, the table is written to this .npy file chunk by chunk
+          (plus its JSON grid specification) instead of being held in memory.
+        - model_tag: str | None : Tag of the model, recorded with the table.
+        Returns:
+        - LookupTable : The computed table.
+        '''
+        shape = cls.grid_shape(grid)
+        if out_path is None:
+            table = np.empty(shape, dtype=LOOKUP_TABLE_DTYPE)
+        else:
+            os.makedirs(path.dirname(out_path) or '.', exist_ok=True)
+            table = np.lib.format.open_memmap(out_path, mode='w+', dtype=LOOKUP_TABLE_DTYPE, shape=shape)
+        lookup_table = cls(table, grid, model_tag)
+        flat_table = table.reshape(-1)
+        for start in range(0, flat_table.size, BUILD_CHUNK_SIZE):
+            flat_index = np.arange(start, min(start + BUILD_CHUNK_SIZE, flat_table.size))
+            coordinates = np.stack(np.unravel_index(flat_index, shape), axis=1)
+            flat_table[flat_index] = model.predict(lookup_table.start + coordinates * lookup_table.step)
+        if out_path is not None:
+            table.flush()
+            with open(spec_path(out_path), 'w') as f:
+                json.dump({'grid': grid, 'model_tag': model_tag}, f, indent=2)
+        return lookup_table
+
+    @classmethod
+    def load(cls, table_path: str = LOOKUP_TABLE_FILE) -> 'LookupTable':
+        '''
+        Memory-map a table written by build; pages are only read when looked up and are
+        shared between worker processes.
+        '''
+        with open(spec_path(table_path)) as f:
+            spec = json.load(f)
+        grid = {column: tuple(axis) for column, axis in spec['grid'].items()}
+        return cls(np.load(table_path, mmap_mode='r'), grid, spec.get('model_tag'))
+
+    def lookup(self, X: np.ndarray) -> np.ndarray:
+        '''
+        Look up raw feature rows.
+        Parameters:
+        - X: np.ndarray : Raw feature rows, shape (n_rows, n_features) in FEATURE_COLUMNS order.
+        Returns:
+        - np.ndarray : Predictions as float64, NaN for rows outside the grid.
+        '''
+        position = (np.asarray(X, dtype=np.float64) - self.start) / self.step
+        index = np.rint(position)
+        valid = ((index >= 0) & (index < self.shape) & (self.bucketed | (np.abs(position - index) < GRID_TOLERANCE))).all(axis=1)
+        result = np.full(len(position), np.nan)
+        if valid.any():
+            flat_index = np.ravel_multi_index(index[valid].astype(np.intp).T, self.table.shape)
+            result[valid] = self._flat_table[flat_index]
+        return result
+
+
+def accuracy_report(lookup_table: LookupTable, model, X: np.ndarray) -> dict:
+    '''
+    Compare table lookups with the live model.
+    Parameters:
+    - lookup_table: LookupTable : The table to evaluate.
+    - model: object : The live model on raw feature rows.
+    - X: np.ndarray : Raw feature rows to compare on.
+    Returns:
+    - dict : Coverage of the grid and absolute error statistics on covered rows.
+    '''
+    table_values = lookup_table.lookup(X)
+    covered = ~np.isnan(table_values)
+    error = np.abs(table_values[covered] - model.predict(X[covered])) if covered.any() else np.zeros(1)
+    return {
+        'rows': len(X),
+        'coverage': float(covered.mean()),
+        'mean_abs_error': float(error.mean()),
+        'p99_abs_error': float(np.percentile(error, 99)),
+        'max_abs_error': float(error.max()),
+        'within_0.01': float((error <= 0.01).mean())
+    }
+
+
+def main() -> None:
+    import bentoml
+    from src.data.prepare_data import load_split, split_path
+    from src.features import FEATURE_MAX_SCORES
+    from src.service import MODEL_TAG, load_engine
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Precompute the admission model over the input grid.')
+    parser.add_argument('--cgpa-step', type=float, default=DEFAULT_GRID['CGPA'][2], help='CGPA bucket width.')
+    parser.add_argument('--output', default=LOOKUP_TABLE_FILE)
+    parser.add_argument('--model', default=MODEL_TAG)
+    args = parser.parse_args()
+
+    bento_model = bentoml.models.get(args.model)
+    model = load_engine(bento_model)
+    grid = dict(DEFAULT_GRID, CGPA=(*DEFAULT_GRID['CGPA'][:2], args.cgpa_step, True))
+    started = time.perf_counter()
+    lookup_table = LookupTable.build(model, grid, args.output, str(bento_model.tag))
+    logging.info(f'Lookup table {lookup_table.table.shape} written to {args.output} '
+                 f'({lookup_table.table.nbytes / 1e6:.1f} MB) in {time.perf_counter() - started:.1f}s.')
+
+    # Accuracy against the live forest: held-out applicants and random profiles with continuous CGPA
+    rng = np.random.default_rng(0)
+    n = 10000
+    random_rows = np.column_stack([
+        rng.integers(290, 341, n), rng.integers(92, 121, n), rng.integers(1, 6, n),
+        rng.integers(2, 11, n) / 2, rng.integers(2, 11, n) / 2, rng.uniform(6.8, 9.92, n), rng.integers(0, 2, n)
+    ])
+    report = {'random_profiles': accuracy_report(lookup_table, model, random_rows)}
+    processed_path = path.join('data', 'processed')
+    if path.exists(split_path(processed_path, 'X_test')):
+        max_scores = np.array([FEATURE_MAX_SCORES.get(c, 1) for c in FEATURE_COLUMNS])
+        test_rows = np.round(load_split(processed_path, 'X_test') * max_scores, 2)
+        report['test_split'] = accuracy_report(lookup_table, model, test_rows)
+    logging.info(f'Accuracy against the live forest:\n{json.dumps(report, indent=2)}')
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,90 @@
 import os
 from os import path
+import argparse
+import hashlib
+import json
 import logging
 import bentoml
+import sklearn
+from bentoml.exceptions import NotFound
 from datetime import datetime
-import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import root_mean_squared_error
 import joblib
+from src.model.flat_forest import FlatForest, FLAT_FOREST_FILE, PREDICTION_TOLERANCE
+from src.features import SCALER_FILE, FeatureScaler
+from src.drift import DRIFT_REFERENCE_KEY, DriftReference
+from src.data.prepare_data import SPLIT_NAMES, load_split, split_path
+from src.data.stage_cache import StageCache
 logging.basicConfig(level=logging.INFO)
 
-def train_random_forest_model(processed_data_path: str, model_output_path: str, model_name: str, store_to_disk: bool = True) -> None:
+MODEL_PARAMS = {'n_estimators': 100, 'n_jobs': -1, 'criterion': 'friedman_mse', 'random_state': 42}
+
+# Remembers the digests of the processed splits, so unchanged splits are not hashed again
+TRAIN_MANIFEST_FILE = 'train_model.manifest.json'
+
+# Every candidate evaluated by train_model --search, with the measured metrics of the finalists
+SEARCH_REPORT_FILE = 'hyperparameter_search.json'
+
+# File bentoml.sklearn keeps the estimator in; its load_model() reads it back
+SKLEARN_MODEL_FILE = 'saved_model.pkl'
+
+def save_bento_model(model_name: str, model, flat_forest: FlatForest, custom_objects: dict,
+                     labels: dict | None = None, metadata: dict | None = None) -> bentoml.Model:
+    '''
+    Save an sklearn model to the BentoML model store together with the flat forest the
+    service serves. Both files are written inside bentoml.models.create, so the entry (and
+    ':latest') only appears in the store once it is complete.
+    Parameters:
+    - model_name: str : The name to save the model under.
+    - model: sklearn estimator : The model, loadable with bento_model.load_model().
+    - flat_forest: FlatForest : The engine served for this model.
+    - custom_objects: dict : BentoML custom objects (scaler, drift reference).
+    - labels: dict | None : BentoML labels.
+    - metadata: dict | None : BentoML metadata.
+    Returns:
+    - bentoml.Model : The saved model.
     '''
-    Train a Random Forest model using processed data and save the trained model.
+    context = bentoml.models.ModelContext(framework_name='sklearn', framework_versions={'scikit-learn': sklearn.__version__})
+    with bentoml.models.create(model_name, module='bentoml.sklearn', api_version='v1', signatures={'predict': {'batchable': False}},
+                               labels=labels, custom_objects=custom_objects, metadata=metadata, context=context) as bento_model:
+        joblib.dump(model, bento_model.path_of(SKLEARN_MODEL_FILE))
+        # A plain file next to the model, so the service can memory-map it
+        flat_forest.save(bento_model.path_of(FLAT_FOREST_FILE))
+    return bento_model
+
+def train_random_forest_model(processed_data_path: str, model_output_path: str, model_name: str, store_to_disk: bool = True, force: bool = False,
+                               model_params: dict | None = None, labels: dict | None = None, metadata: dict | None = None) -> None:
+    '''
+    Train a Random Forest model using processed data and save the trained model. Skipped when
+    the latest stored model was trained on the same processed data with the same parameters.
     Parameters:
-    - processed_data_path: str : The file path to the processed data.
+    - processed_data_path: str : The directory with the processed splits (prepare_data).
     - model_output_path: str : The directory path to save the trained model.
     - model_name: str : The name to use when saving the model to BentoML.
     - store_model: bool : Whether to save the trained model to disk.
+    - force: bool : Train even if an up-to-date model is already stored.
+    - model_params: dict | None : RandomForestRegressor parameters; MODEL_PARAMS by default.
+    - labels: dict | None : Extra BentoML labels of the saved model (e.g. search metrics).
+    - metadata: dict | None : Extra BentoML metadata of the saved model.
     Returns:
     - None
     '''
-    X_train_path = path.join(processed_data_path, 'X_train.csv')
-    y_train_path = path.join(processed_data_path, 'y_train.csv')
-    X_test_path = path.join(processed_data_path, 'X_test.csv')
-    y_test_path = path.join(processed_data_path, 'y_test.csv')
-    model = RandomForestRegressor(n_estimators=100, n_jobs=-1, criterion='friedman_mse', random_state=42)
+    scaler_path = path.join(processed_data_path, SCALER_FILE)
+    model_params = model_params or MODEL_PARAMS
+    model = RandomForestRegressor(**model_params)
  
-    if path.exists(X_train_path) and path.exists(y_train_path):
-        X_train = pd.read_csv(X_train_path)
-        y_train = pd.read_csv(y_train_path).values.ravel()
+    if path.exists(split_path(processed_data_path, 'X_train')) and path.exists(split_path(processed_data_path, 'y_train')):
+        # Fingerprint of the training inputs, stored with the model to make retraining a no-op
+        inputs = {name: split_path(processed_data_path, name) for name in SPLIT_NAMES}
+        cache = StageCache(path.join(processed_data_path, TRAIN_MANIFEST_FILE))
+        digests = cache.input_digests(inputs)
+        training_digest = hashlib.sha256(json.dumps({'inputs': digests, 'params': model_params}, sort_keys=True).encode()).hexdigest()
+        if not force and latest_training_digest(model_name) == training_digest:
+            logging.info(f'Latest "{model_name}" model was trained on the same data and parameters; skipping.')
+            return
+        X_train = load_split(processed_data_path, 'X_train')
+        y_train = load_split(processed_data_path, 'y_train')
         model.fit(X_train, y_train)
         # Save model to disk
         if store_to_disk:
@@ -37,22 +93,66 @@ def train_random_forest_model(processed_data_path: str, model_output_path: str,
             model_path = path.join(model_output_path, f'{model_name}_{timestamp}.joblib')
             joblib.dump(model, model_path)
             logging.info(f'Model trained and saved to disk: {model_path}.')
-        # Save model to BentoML model store
-        bentoml.sklearn.save_model(model_name, model)
+        # Export the forest into flat arrays for the serving engine and check it reproduces sklearn
+        X_test = load_split(processed_data_path, 'X_test')
+        y_test = load_split(processed_data_path, 'y_test')
+        flat_forest = FlatForest.from_sklearn(model)
+        max_diff = float(abs(flat_forest.predict(X_test) - model.predict(X_test)).max())
+        if max_diff > PREDICTION_TOLERANCE:
+            raise ValueError(f'Flat forest export deviates from sklearn by {max_diff}.')
+        logging.info(f'Flat forest exported: {flat_forest.nbytes} bytes, max deviation from sklearn {max_diff}.')
+        # Save model to BentoML model store, with the scaler the training data went through and
+        # the distribution of the raw training inputs and of held-out predictions, for drift monitoring
+        scaler = joblib.load(scaler_path) if path.exists(scaler_path) else FeatureScaler.fit()
+        drift_reference = DriftReference.fit(scaler.inverse_transform(X_train), flat_forest.predict(X_test))
+        save_bento_model(model_name, model, flat_forest, custom_objects={'scaler': scaler, DRIFT_REFERENCE_KEY: drift_reference},
+                         labels=labels, metadata={**(metadata or {}), 'training_digest': training_digest})
+        cache.record(inputs, model_params, {})
         logging.info(f'Model trained and saved to BentoML model store as "{model_name}".')
         # Evaluate model
-        X_test = pd.read_csv(X_test_path)
-        y_test = pd.read_csv(y_test_path).values.ravel()
         rmse = root_mean_squared_error(y_test, model.predict(X_test))
         logging.info(f'Training metrics: RMSE={rmse}')
     else:
         print("Training data not found.")
 
+def latest_training_digest(model_name: str) -> str | None:
+    '''
+    Training digest stored with the latest model of that name, if any.
+    '''
+    try:
+        return bentoml.models.get(f'{model_name}:latest').info.metadata.get('training_digest')
+    except NotFound:
+        return None
+
 def main():
+    parser = argparse.ArgumentParser(description='Train the admission model on the processed data.')
+    parser.add_argument('--force', action='store_true', help='Train even if an up-to-date model is already stored.')
+    parser.add_argument('--search', action='store_true', help='Search the forest parameters first and train the selected candidate.')
+    parser.add_argument('--schedule', choices=['halving', 'grid'], default='halving', help='Successive halving or the full grid.')
+    parser.add_argument('--workers', type=int, default=None, help='Processes fitting search candidates (default: CPU count).')
+    parser.add_argument('--rmse-tolerance', type=float, default=0.01, help='RMSE loss accepted for a faster model, e.g. 0.01 for 1%%.')
+    args = parser.parse_args()
+
     bento_model_name = 'university_admission_rf_model'
     processed_data_path = path.join(os.getcwd(), 'data', 'processed')
     model_output_path = path.join(os.getcwd(), 'models')
-    train_random_forest_model(processed_data_path, model_output_path, model_name=bento_model_name, store_to_disk=False)
+    if not args.search:
+        train_random_forest_model(processed_data_path, model_output_path, model_name=bento_model_name, store_to_disk=False, force=args.force)
+        return
+
+    # Imported here: the search pulls in the process pool machinery only when asked for
+    from src.model.hyperparameter_search import search, search_labels
+    X_train = load_split(processed_data_path, 'X_train', mmap_mode=None)
+    y_train = load_split(processed_data_path, 'y_train', mmap_mode=None)
+    best, evaluations = search(X_train, y_train, schedule=args.schedule, workers=args.workers, rmse_tolerance=args.rmse_tolerance)
+    os.makedirs(model_output_path, exist_ok=True)
+    report_path = path.join(model_output_path, SEARCH_REPORT_FILE)
+    with open(report_path, 'w') as f:
+        json.dump({'schedule': args.schedule, 'rmse_tolerance': args.rmse_tolerance, 'selected': best, 'evaluations': evaluations}, f, indent=2)
+    logging.info(f'Search report with {len(evaluations)} evaluations written to {report_path}.')
+    train_random_forest_model(processed_data_path, model_output_path, model_name=bento_model_name, store_to_disk=False, force=args.force,
+                              model_params={**MODEL_PARAMS, **best['params']}, labels=search_labels(best),
+                              metadata={'search_schedule': args.schedule, 'search_evaluations': len(evaluations)})
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,251 @@
+'''
+Versioned model serving. A loaded model version bundles its engine, prediction cache and
+lookup table, and every request picks one version up front and uses it to the end, so a model
+swap never affects requests already in flight.
+
+ModelWatcher polls the local BentoML store in a background thread. A new tag is loaded and
+warmed there, off the request path, and only then handed to ModelRouter, which installs it
+with a single reference assignment: either as the active version, or first as a canary that
+gets a share of the requests until it is promoted.
+'''
+import logging
+import random
+import threading
+import time
+from typing import Callable
+import bentoml
+import numpy as np
+from bentoml.exceptions import NotFound
+from src.cache import PredictionCache
+from src.drift import DriftMonitor
+from src.features import sample_rows
+from src.instrumentation import LATENCY_BUCKETS, METRICS_ENABLED, observe_values
+from src.model.lookup_table import LookupTable
+
+logger = logging.getLogger('bentoml')
+
+# Seconds before a version that failed to load is tried again, doubled after every failure
+LOAD_RETRY_DELAY = 60.0
+LOAD_RETRY_MAX_DELAY = 3600.0
+
+MODEL_PREDICT_DURATION = bentoml.metrics.Histogram(
+    name='admission_model_predict_duration_seconds',
+    documentation='Prediction time (cache, lookup table and model) per model version',
+    labelnames=['model_version'],
+    buckets=LATENCY_BUCKETS
+)
+MODEL_PREDICTIONS = bentoml.metrics.Histogram(
+    name='admission_model_predictions',
+    documentation='Predicted admission chance per model version',
+    labelnames=['model_version'],
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+)
+MODEL_TRAFFIC_SHARE = bentoml.metrics.Gauge(
+    name='admission_model_traffic_share',
+    documentation='Share of requests routed to each model version (0 once it is replaced)',
+    labelnames=['model_version']
+)
+
+
+class ModelVersion:
+    '''
+    One loaded model version with the state that belongs to it.
+    '''
+
+    def __init__(self, tag: str, model, cache: PredictionCache, lookup_table: LookupTable | None = None,
+                 drift: DriftMonitor | None = None, explanation_cache: PredictionCache | None = None):
+        '''
+        Parameters:
+        - tag: str : The BentoML model tag.
+        - model: AdmissionModel : The engine predicting raw feature rows.
+        - cache: PredictionCache : Prediction cache, bound to this tag.
+        - lookup_table: LookupTable | None : Precomputed outputs of this version, if served.
+        - drift: DriftMonitor | None : Drift monitor against this version's training data, if enabled.
+        - explanation_cache: PredictionCache | None : Explanation cache, bound to this tag; disabled if None.
+        '''
+        self.tag = tag
+        self.model = model
+        self.cache = cache
+        self.lookup_table = lookup_table
+        self.drift = drift
+        self.explanation_cache = explanation_cache if explanation_cache is not None else PredictionCache(0, name='explanations')
+        self._duration = MODEL_PREDICT_DURATION.labels(model_version=tag)
+        self._predictions = MODEL_PREDICTIONS.labels(model_version=tag)
+
+    def warm_up(self, n_rows: int) -> None:
+        '''
+        Predict synthetic rows once, so the first requests do not pay for page faults on the
+        mapped model and lookup table or for first-call overhead. The prediction cache is bypassed.
+        '''
+        if n_rows <= 0:
+            return
+        X = sample_rows(n_rows)
+        self.model.predict(X[:1])
+        self.model.predict(X)
+        if self.lookup_table is not None:
+            self.lookup_table.lookup(X)
+
+    def observe(self, seconds: float, X: np.ndarray, predictions: list[float]) -> None:
+        '''
+        Record the prediction time of a request, its predicted values and, for drift
+        monitoring, its input rows. The metrics are skipped with ADMISSION_METRICS=0.
+        '''
+        if METRICS_ENABLED:
+            self._duration.observe(seconds)
+            observe_values(self._predictions, predictions)
+        if self.drift is not None:
+            self.drift.observe(X, predictions)
+
+
+class ModelRouter:
+    '''
+    Picks the model version of each request: the active one, or with probability
+    canary_fraction the canary, which replaces the active version after promote_after seconds.
+    '''
+
+    def __init__(self, active: ModelVersion, canary_fraction: float = 0.0, promote_after: float = 600.0):
+        '''
+        Parameters:
+        - active: ModelVersion : The version served at startup.
+        - canary_fraction: float : Share of requests sent to a new version before it is
+          promoted; 0 promotes new versions at once.
+        - promote_after: float : Seconds a canary is served before it is promoted.
+        '''
+        self.canary_fraction = canary_fraction
+        self.promote_after = promote_after
+        # (active, canary, canary start); replaced as a whole so readers never see a mix
+        self._state: tuple[ModelVersion, ModelVersion | None, float] = (active, None, 0.0)
+        self._lock = threading.Lock()
+        self._publish_shares()
+
+    @property
+    def active(self) -> ModelVersion:
+        return self._state[0]
+
+    @property
+    def canary(self) -> ModelVersion | None:
+        return self._state[1]
+
+    @property
+    def tags(self) -> set[str]:
+        active, canary, _ = self._state
+        return {active.tag} if canary is None else {active.tag, canary.tag}
+
+    def route(self) -> ModelVersion:
+        '''
+        The version to serve one request with.
+        '''
+        active, canary, since = self._state
+        if canary is None:
+            return active
+        if time.monotonic() - since >= self.promote_after:
+            self.promote(canary)
+            return canary
+        return canary if random.random() < self.canary_fraction else active
+
+    def install(self, version: ModelVersion) -> None:
+        '''
+        Serve a loaded, warmed version: as the canary (replacing any previous canary) when a
+        canary fraction is set, otherwise as the active version right away.
+        '''
+        with self._lock:
+            active, canary, _ = self._state
+            if self.canary_fraction > 0:
+                self._state = (active, version, time.monotonic())
+                logger.info(f'Model {version.tag} serves {self.canary_fraction:.0%} of requests as a canary of {active.tag}.')
+            else:
+                self._state = (version, None, 0.0)
+                logger.info(f'Model {version.tag} replaced {active.tag}.')
+            self._publish_shares(replaced=[v for v in (active, canary) if v is not None and v is not version])
+
+    def promote(self, canary: ModelVersion) -> None:
+        '''
+        Make the canary the active version, unless it was replaced in the meantime.
+        '''
+        with self._lock:
+            active, current, _ = self._state
+            if current is not canary:
+                return
+            self._state = (canary, None, 0.0)
+            self._publish_shares(replaced=[active])
+        logger.info(f'Canary model {canary.tag} promoted, replacing {active.tag}.')
+
+    def _publish_shares(self, replaced: list[ModelVersion] = ()) -> None:
+        active, canary, _ = self._state
+        for version in replaced:
+            MODEL_TRAFFIC_SHARE.labels(model_version=version.tag).set(0)
+        share = self.canary_fraction if canary is not None else 0.0
+        MODEL_TRAFFIC_SHARE.labels(model_version=active.tag).set(1 - share)
+        if canary is not None:
+            MODEL_TRAFFIC_SHARE.labels(model_version=canary.tag).set(share)
+
+
+class ModelWatcher:
+    '''
+    Background thread installing new versions of a model tag (e.g. ':latest') from the local
+    BentoML store. Versions are loaded and warmed on this thread; a version that fails to
+    load is logged and tried again with exponential backoff.
+    '''
+
+    def __init__(self, model_tag: str, router: ModelRouter, load_version: Callable[[bentoml.Model], ModelVersion],
+                 interval: float = 30.0, retry_delay: float = LOAD_RETRY_DELAY, max_retry_delay: float = LOAD_RETRY_MAX_DELAY):
+        '''
+        Parameters:
+        - model_tag: str : The tag to resolve in the store.
+        - router: ModelRouter : Receives the new versions.
+        - load_version: Callable : Loads and warms the version of a store model.
+        - interval: float : Seconds between two checks of the store.
+        - retry_delay: float : Seconds before a version that failed to load is tried again.
+        - max_retry_delay: float : Upper limit of the delay, which doubles after every failure.
+        '''
+        self.model_tag = model_tag
+        self.router = router
+        self.load_version = load_version
+        self.interval = interval
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        # Tag -> (monotonic time of the next attempt, delay after the next failure)
+        self._retries: dict[str, tuple[float, float]] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception(f'Checking {self.model_tag} for a new version failed.')
+
+    def check(self) -> bool:
+        '''
+        Install the version the tag resolves to, if it is new.
+        Returns:
+        - bool : Whether a new version was installed.
+        '''
+        try:
+            bento_model = bentoml.models.get(self.model_tag)
+        except NotFound:
+            return False
+        tag = str(bento_model.tag)
+        if tag in self.router.tags:
+            return False
+        retry_at, delay = self._retries.get(tag, (0.0, self.retry_delay))
+        if time.monotonic() < retry_at:
+            return False
+        started = time.perf_counter()
+        try:
+            version = self.load_version(bento_model)
+        except Exception:
+            self._retries[tag] = (time.monotonic() + delay, min(delay * 2, self.max_retry_delay))
+            logger.exception(f'Loading model {tag} failed; keeping {self.router.active.tag} and retrying in {delay:.0f}s.')
+            return False
+        self._retries.pop(tag, None)
+        self.router.install(version)
+        logger.info(f'Model {tag} loaded and warmed up in {time.perf_counter() - started:.3f}s.')
+        return True
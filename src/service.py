@@ -1,9 +1,98 @@
+import time
+# Import time of this module, reported at startup
+IMPORT_STARTED = time.perf_counter()
+import os
+import asyncio
+import logging
+from os import path
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Generator, Iterator
 import bentoml
-import pandas as pd
+import numpy as np
+from bentoml.exceptions import InvalidArgument
 from pydantic import BaseModel
 from starlette.responses import JSONResponse
-from src.jwt_middleware import create_jwt_token, USERS
+from src.jwt_middleware import JWTAuthMiddleware, create_jwt_token, protected_api_routes
+from src.credentials import CredentialStore, LoginRateLimiter
+from src.instrumentation import InstrumentationMiddleware, METRICS_ENABLED, stage
+from src.model.flat_forest import FlatForest, FLAT_FOREST_FILE
+from src.features import INPUT_FIELDS, FeatureScaler, input_to_row, inputs_to_matrix
+from src.cache import PredictionCache, row_key
+from src.model.lookup_table import LookupTable, LOOKUP_TABLE_FILE
+from src.batch_scoring import DEFAULT_CHUNK_SIZE, ScoringStats, iter_file_chunks, iter_input_chunks, score_chunks, iter_csv_lines
+from src.model_versions import ModelRouter, ModelVersion, ModelWatcher
+from src.admission_control import BoundedExecutor, Overloaded, overloaded_response
+from src.fast_codec import FastCodecApp
+from src.drift import DRIFT_REFERENCE_KEY, DriftMonitor
 
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+
+# Service logs go through BentoML's logger so they show up in `bentoml serve` output
+logger = logging.getLogger('bentoml')
+
+# Adaptive micro-batching limits for predict_adaptive (overridable per deployment)
+MAX_BATCH_SIZE = int(os.environ.get('ADMISSION_MAX_BATCH_SIZE', '64'))
+MAX_LATENCY_MS = int(os.environ.get('ADMISSION_MAX_LATENCY_MS', '100'))
+
+# Prediction cache size (0 disables it) and entry lifetime in seconds
+CACHE_SIZE = int(os.environ.get('ADMISSION_CACHE_SIZE', '10000'))
+CACHE_TTL = float(os.environ.get('ADMISSION_CACHE_TTL', '3600'))
+
+# 'forest' evaluates the model per request, 'lookup_table' reads precomputed outputs
+# (make build_lookup_table) and only falls back to the forest for inputs outside the grid
+SERVING_MODE = os.environ.get('ADMISSION_SERVING_MODE', 'forest')
+LOOKUP_TABLE_PATH = os.environ.get('ADMISSION_LOOKUP_TABLE', LOOKUP_TABLE_FILE)
+
+# Password verification pool size and the number of logins allowed to wait for it; beyond
+# that, logins are rejected with 503 so a burst cannot queue unbounded work
+LOGIN_WORKERS = int(os.environ.get('ADMISSION_LOGIN_WORKERS', '2'))
+LOGIN_MAX_PENDING = int(os.environ.get('ADMISSION_LOGIN_MAX_PENDING', '64'))
+
+# Login attempts per user and minute (0 disables the limit), and how many may come at once
+LOGIN_RATE_PER_MINUTE = float(os.environ.get('ADMISSION_LOGIN_RATE_PER_MINUTE', '30'))
+LOGIN_BURST = int(os.environ.get('ADMISSION_LOGIN_BURST', '10'))
+
+# Threads running predict_async inference per worker, how many requests may wait for them,
+# and how long (ms); requests beyond either limit get 503 with Retry-After instead of queueing
+PREDICT_WORKERS = int(os.environ.get('ADMISSION_PREDICT_WORKERS', '2'))
+PREDICT_MAX_QUEUE = int(os.environ.get('ADMISSION_PREDICT_MAX_QUEUE', '32'))
+PREDICT_MAX_WAIT_MS = float(os.environ.get('ADMISSION_PREDICT_MAX_WAIT_MS', '50'))
+
+# Worker processes per host ('cpu_count' for one per core). Workers map the same forest file
+# instead of loading private copies; ADMISSION_MMAP_MODEL=0 loads it onto each worker's heap.
+WORKERS = os.environ.get('ADMISSION_WORKERS', '1')
+MMAP_MODEL = os.environ.get('ADMISSION_MMAP_MODEL', '1') != '0'
+
+# Synthetic rows predicted once at startup, before the worker reports ready (0 disables it)
+WARMUP_ROWS = int(os.environ.get('ADMISSION_WARMUP_ROWS', '256'))
+
+# Model served, e.g. 'university_admission_rf_model_compressed:latest' (make compress_model)
+MODEL_TAG = os.environ.get('ADMISSION_MODEL_TAG', 'university_admission_rf_model:latest')
+
+# Seconds between checks of the model store for a new version of MODEL_TAG (0 disables reloads)
+RELOAD_INTERVAL = float(os.environ.get('ADMISSION_RELOAD_INTERVAL', '30'))
+# Share of requests a new version gets as a canary, and seconds until it replaces the active
+# version; with a fraction of 0 a new version replaces the active one as soon as it is warm
+CANARY_FRACTION = float(os.environ.get('ADMISSION_CANARY_FRACTION', '0'))
+CANARY_PROMOTE_AFTER = float(os.environ.get('ADMISSION_CANARY_PROMOTE_AFTER', '600'))
+
+# Seconds between two drift scores of the served inputs and predictions against the model's
+# training data (0 disables drift monitoring)
+DRIFT_INTERVAL = float(os.environ.get('ADMISSION_DRIFT_INTERVAL', '60'))
+
+STARTUP_SECONDS = bentoml.metrics.Gauge(
+    name='admission_startup_seconds',
+    documentation='Worker startup time by phase (import, load, warmup)',
+    labelnames=['phase']
+)
+
+# API methods callable without a token; every other @bentoml.api route requires one
+PUBLIC_APIS = frozenset({'login'})
+
+# predict and predict_batch with msgspec/json decoding straight into feature rows, mounted here
+FAST_CODEC_PATH = '/fast'
+FAST_CODEC_APP = FastCodecApp()
 
 
 class InputModel(BaseModel):
@@ -19,16 +108,152 @@ class InputModel(BaseModel):
     cgpa: float
     research: int
 
-@bentoml.service
+
+class AdmissionModel:
+    '''
+    Serving model: scales raw input rows like prepare_data did for training, then runs the forest.
+    '''
+
+    def __init__(self, scaler: FeatureScaler, forest: FlatForest):
+        self.scaler = scaler
+        self.forest = forest
+
+    def predict(self, X) -> np.ndarray:
+        '''
+        Predict from raw feature rows, shape (n_rows, n_features) in FEATURE_COLUMNS order.
+        '''
+        return self.forest.predict(self.scaler.transform(X))
+
+    def explain(self, X) -> tuple[np.ndarray, float, np.ndarray]:
+        '''
+        Decision-path explanation of raw feature rows.
+        Returns:
+        - tuple[np.ndarray, float, np.ndarray] : The predictions, the baseline (mean root value)
+          and the per-feature contributions, shape (n_rows, n_features); for each row,
+          baseline + sum(contributions) == prediction.
+        '''
+        baseline, contributions = self.forest.contributions(self.scaler.transform(X))
+        return baseline + contributions.sum(axis=1), baseline, contributions
+
+
+def load_engine(bento_model: bentoml.Model) -> AdmissionModel:
+    '''
+    Load the flat inference engine and feature scaler saved with the model. Models saved with
+    the flat forest as a custom object (before it was stored as a file) are still supported.
+    Parameters:
+    - bento_model: bentoml.Model : The model from the BentoML model store.
+    Returns:
+    - AdmissionModel : The engine used for predictions on raw inputs.
+    '''
+    flat_forest = bento_model.custom_objects.get('flat_forest')
+    if flat_forest is None:
+        forest_path = bento_model.path_of(FLAT_FOREST_FILE)
+        if not path.exists(forest_path) and bento_model.info.labels.get('method') == 'depth_cap':
+            # compress_model's depth caps only exist in the flat forest; the stored sklearn
+            # model is the uncapped tree subset, so converting it would serve another model
+            raise ValueError(f'Depth-capped model {bento_model.tag} has no {FLAT_FOREST_FILE}.')
+        if not path.exists(forest_path):
+            # Model saved before the flat export existed: convert it once and store the export,
+            # so that the other workers and later starts map it instead of converting again
+            flat_forest = FlatForest.from_sklearn(bento_model.load_model())
+            try:
+                flat_forest.save(forest_path)
+            except OSError as e:
+                logger.warning(f'Could not store the flat forest in {forest_path} ({e}); each worker keeps its own copy.')
+        if path.exists(forest_path):
+            # Memory-mapped, so all workers share the same pages
+            flat_forest = FlatForest.load(forest_path, mmap_mode='r' if MMAP_MODEL else None)
+    # Models saved before the scaler was stored were trained on the same max-score scaling
+    scaler = bento_model.custom_objects.get('scaler') or FeatureScaler.fit()
+    return AdmissionModel(scaler, flat_forest)
+
+def load_lookup_table(model_tag: str) -> LookupTable | None:
+    '''
+    Memory-map the precomputed lookup table, unless it was built from a different model version.
+    '''
+    lookup_table = LookupTable.load(LOOKUP_TABLE_PATH)
+    if lookup_table.model_tag != model_tag:
+        logger.warning(f'Lookup table {LOOKUP_TABLE_PATH} was built for {lookup_table.model_tag}, not {model_tag}; serving from the forest.')
+        return None
+    return lookup_table
+
+@bentoml.service(workers=WORKERS if WORKERS == 'cpu_count' else int(WORKERS))
 class UniversityAdmissionService:
     def __init__(self):
-        self.model = bentoml.models.get('university_admission_rf_model:latest').load_model()
+        started = time.perf_counter()
+        version = self.load_version(bentoml.models.get(MODEL_TAG))
+        self.models = ModelRouter(version, CANARY_FRACTION, CANARY_PROMOTE_AFTER)
+        self.credentials = CredentialStore.from_env()
+        self.login_limiter = LoginRateLimiter(LOGIN_RATE_PER_MINUTE, LOGIN_BURST)
+        self.login_executor = ThreadPoolExecutor(max_workers=LOGIN_WORKERS, thread_name_prefix='login')
+        self.pending_logins = 0
+        self.predict_executor = BoundedExecutor('predict', PREDICT_WORKERS, PREDICT_MAX_QUEUE, PREDICT_MAX_WAIT_MS)
+        FAST_CODEC_APP.bind(self.predict_matrix, self._stream_scores, self.predict_executor)
+        loaded = time.perf_counter()
+        # BentoML reports the worker ready once __init__ returns, so warm up before that
+        version.warm_up(WARMUP_ROWS)
+        warmed = time.perf_counter()
+        STARTUP_SECONDS.labels(phase='import').set(IMPORT_SECONDS)
+        STARTUP_SECONDS.labels(phase='load').set(loaded - started)
+        STARTUP_SECONDS.labels(phase='warmup').set(warmed - loaded)
+        logger.info(f'Service started: imports {IMPORT_SECONDS:.3f}s, model load {loaded - started:.3f}s, '
+                    f'warm-up of {WARMUP_ROWS} rows {warmed - loaded:.3f}s.')
+
+        # Later versions are loaded and warmed on the watcher thread, then swapped in
+        self.watcher = ModelWatcher(MODEL_TAG, self.models, self.load_and_warm_up, RELOAD_INTERVAL)
+        if RELOAD_INTERVAL > 0:
+            self.watcher.start()
+
+    @property
+    def model(self) -> AdmissionModel:
+        '''Engine of the active model version.'''
+        return self.models.active.model
+
+    @property
+    def cache(self) -> PredictionCache:
+        '''Prediction cache of the active model version.'''
+        return self.models.active.cache
+
+    def load_version(self, bento_model: bentoml.Model) -> ModelVersion:
+        '''
+        Load a model version with its own prediction and explanation caches and, in lookup table
+        mode, its table.
+        '''
+        tag = str(bento_model.tag)
+        cache = PredictionCache(CACHE_SIZE, CACHE_TTL)
+        cache.bind(tag)
+        explanation_cache = PredictionCache(CACHE_SIZE, CACHE_TTL, name='explanations')
+        explanation_cache.bind(tag)
+        lookup_table = load_lookup_table(tag) if SERVING_MODE == 'lookup_table' else None
+        # Models trained before the drift reference was stored are served without monitoring
+        reference = bento_model.custom_objects.get(DRIFT_REFERENCE_KEY)
+        drift = DriftMonitor(reference, tag, interval=DRIFT_INTERVAL) if reference is not None and DRIFT_INTERVAL > 0 else None
+        return ModelVersion(tag, load_engine(bento_model), cache, lookup_table, drift, explanation_cache)
+
+    def load_and_warm_up(self, bento_model: bentoml.Model) -> ModelVersion:
+        version = self.load_version(bento_model)
+        version.warm_up(WARMUP_ROWS)
+        return version
 
     @bentoml.api
-    def login(self, credentials: dict) -> dict:
+    async def login(self, credentials: dict) -> dict:
+        '''
+        Issue a token for valid credentials. The password hash is checked on the login thread
+        pool, so a burst of logins does not hold up predict requests on the event loop.
+        '''
         username = credentials.get('username')
         password = credentials.get('password')
-        if username in USERS and USERS[username] == password:
+        if username in self.credentials and not self.login_limiter.allow(username):
+            return JSONResponse(status_code=429, content={'message': 'Too many login attempts'})
+        if self.pending_logins >= LOGIN_MAX_PENDING:
+            return overloaded_response('Too many logins in progress', retry_after=1)
+        self.pending_logins += 1
+        try:
+            with stage('password'):
+                valid = await asyncio.get_running_loop().run_in_executor(self.login_executor, self.credentials.verify, username, password)
+        finally:
+            self.pending_logins -= 1
+        if valid:
             token = create_jwt_token(username)
             return {'token': token}
         else:
@@ -36,16 +261,175 @@ class UniversityAdmissionService:
 
     @bentoml.api
     def predict(self, input_data: InputModel) -> dict:
-        # Convert input to DataFrame with proper column names
-        input_dict = {
-            'GRE Score': [input_data.gre_score],
-            'TOEFL Score': [input_data.toefl_score],
-            'University Rating': [input_data.university_rating],
-            'SOP': [input_data.sop],
-            'LOR ': [input_data.lor],  # Note the space after LOR
-            'CGPA': [input_data.cgpa],
-            'Research': [input_data.research]
-        }
-        input_df = pd.DataFrame(input_dict)
-        prediction = self.model.predict(input_df)
-        return {'admission_chance': float(prediction[0])}
\ No newline at end of file
+        # Convert input to a row in training column order
+        version = self.models.route()
+        with stage('features'):
+            row = input_to_row(input_data)
+        prediction = self._predict_rows(version, row)
+        return {'admission_chance': prediction[0]}
+
+    @bentoml.api
+    async def predict_async(self, input_data: InputModel) -> dict:
+        '''
+        Non-blocking variant of predict: inference runs on the service's own sized thread pool
+        while the event loop keeps accepting requests. When ADMISSION_PREDICT_MAX_QUEUE requests
+        already wait for it, or a request waited over ADMISSION_PREDICT_MAX_WAIT_MS, it is
+        rejected with 503 and a Retry-After header.
+        '''
+        version = self.models.route()
+        with stage('features'):
+            row = input_to_row(input_data)
+        try:
+            prediction = await self.predict_executor.run(self._predict_rows, version, row)
+        except Overloaded as e:
+            return overloaded_response('Too many predictions in progress', e.retry_after)
+        return {'admission_chance': prediction[0]}
+
+    @bentoml.api(batchable=True, max_batch_size=MAX_BATCH_SIZE, max_latency_ms=MAX_LATENCY_MS)
+    def predict_adaptive(self, inputs: list[InputModel]) -> list[dict]:
+        '''
+        Adaptive micro-batching variant of predict: BentoML merges the input lists of
+        concurrent requests into batches of up to MAX_BATCH_SIZE rows, the forest runs once
+        on the merged matrix and the results are split back per request. Requests that cannot
+        be served within MAX_LATENCY_MS are rejected with 503 instead of queueing further.
+        '''
+        version = self.models.route()
+        with stage('features'):
+            X = inputs_to_matrix(inputs)
+        predictions = self._predict_rows(version, X)
+        return [{'admission_chance': p} for p in predictions]
+
+    @bentoml.api(batchable=True, max_batch_size=MAX_BATCH_SIZE, max_latency_ms=MAX_LATENCY_MS)
+    def explain(self, inputs: list[InputModel]) -> list[dict]:
+        '''
+        Why each input got its score: the forest's baseline (its mean prediction over the
+        training data) plus one contribution per input field add up to the admission chance.
+        Contributions follow each input's decision path through every tree in one vectorized
+        pass, concurrent requests are merged like in predict_adaptive, and explanations are
+        cached per input in a cache of their own. Always computed from the forest; in lookup
+        table mode admission_chance is the served (table) prediction, as from predict, and may
+        differ from the baseline plus the contributions by the table's error.
+        '''
+        version = self.models.route()
+        with stage('features'):
+            X = inputs_to_matrix(inputs)
+        return [
+            {'admission_chance': prediction, 'baseline': baseline, 'contributions': dict(zip(INPUT_FIELDS, contributions))}
+            for prediction, baseline, contributions in self._explain_rows(version, X)
+        ]
+
+    @bentoml.api
+    def predict_batch(self, inputs: list[InputModel], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Generator[str, None, None]:
+        '''
+        Bulk scoring of a whole cohort. Rows are scored chunk_size at a time and streamed back
+        as CSV text (one admission_chance per row, in input order).
+        '''
+        yield from self._stream_scores(iter_input_chunks(inputs, chunk_size), chunk_size)
+
+    @bentoml.api
+    def predict_batch_file(self, file: Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Generator[str, None, None]:
+        '''
+        Bulk scoring of an uploaded CSV or Parquet file (chosen by file suffix) with the feature
+        columns; streamed back like predict_batch without reading the whole file into memory.
+        '''
+        yield from self._stream_scores(iter_file_chunks(file, chunk_size), chunk_size)
+
+    def predict_matrix(self, X: np.ndarray) -> list[float]:
+        '''
+        Predict raw feature rows with the model version routed for this call (fast codec routes).
+        '''
+        return self._predict_rows(self.models.route(), X)
+
+    def _predict_rows(self, version: ModelVersion, X: np.ndarray) -> list[float]:
+        '''
+        Predict raw feature rows with one model version, from its lookup table when enabled
+        and otherwise live.
+        '''
+        started = time.perf_counter()
+        if version.lookup_table is None:
+            results = self._predict_live(version, X)
+        else:
+            with stage('lookup_table'):
+                results = version.lookup_table.lookup(X)
+            off_grid = np.flatnonzero(np.isnan(results))
+            if len(off_grid):
+                results[off_grid] = self._predict_live(version, X[off_grid])
+            results = results.tolist()
+        version.observe(time.perf_counter() - started, X, results)
+        return results
+
+    def _predict_live(self, version: ModelVersion, X: np.ndarray) -> list[float]:
+        '''
+        Predict raw feature rows through the version's prediction cache; misses are scored in
+        one model call.
+        '''
+        if not version.cache.enabled:
+            with stage('model'):
+                return [float(p) for p in version.model.predict(X)]
+        with stage('cache'):
+            keys = [row_key(row) for row in X]
+            results = [version.cache.get(key) for key in keys]
+            missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            with stage('model'):
+                predictions = version.model.predict(X[missing])
+            for i, prediction in zip(missing, predictions):
+                results[i] = float(prediction)
+                version.cache.put(keys[i], results[i])
+        return results
+
+    def _explain_rows(self, version: ModelVersion, X: np.ndarray) -> list[tuple]:
+        '''
+        Explain raw feature rows through the version's explanation cache; misses are explained
+        in one call. In lookup table mode, the prediction of rows on the grid is the table's.
+        Returns:
+        - list[tuple] : (prediction, baseline, contributions in FEATURE_COLUMNS order) per row.
+        '''
+        cache = version.explanation_cache
+        keys = [row_key(row) for row in X] if cache.enabled else []
+        with stage('cache'):
+            results = [cache.get(key) for key in keys] or [None] * len(X)
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            with stage('explain'):
+                predictions, baseline, contributions = version.model.explain(X[missing])
+            for i, prediction, row in zip(missing, predictions.tolist(), contributions.tolist()):
+                # Tuples, so that cached explanations cannot be modified through a response
+                results[i] = (prediction, baseline, tuple(row))
+                if keys:
+                    cache.put(keys[i], results[i])
+        if version.lookup_table is not None:
+            with stage('lookup_table'):
+                served = version.lookup_table.lookup(X).tolist()
+            # Off-grid rows are served from the forest, like in predict
+            results = [result if np.isnan(prediction) else (prediction, *result[1:]) for prediction, result in zip(served, results)]
+        return results
+
+    def _stream_scores(self, chunks: Iterator[np.ndarray], chunk_size: int) -> Generator[str, None, None]:
+        if chunk_size < 1:
+            raise InvalidArgument('chunk_size must be positive.')
+        stats = ScoringStats()
+        version = self.models.route()
+        observe = version.drift.observe if version.drift is not None else None
+        try:
+            yield from iter_csv_lines(score_chunks(version.model, chunks, stats, observe))
+        except (ValueError, KeyError, IndexError) as e:
+            raise InvalidArgument(f'Invalid batch input: {e}') from e
+        logger.info(f'Batch scoring: {stats.rows} rows in {stats.seconds:.3f}s ({stats.rows_per_sec:.0f} rows/sec).')
+
+
+UniversityAdmissionService.mount_asgi_app(FAST_CODEC_APP, path=FAST_CODEC_PATH)
+
+# Time every API route; registered first so it wraps authentication too
+if METRICS_ENABLED:
+    UniversityAdmissionService.add_asgi_middleware(
+        InstrumentationMiddleware,
+        routes=[api.route for api in UniversityAdmissionService.apis.values()] + FAST_CODEC_APP.routes(FAST_CODEC_PATH)
+    )
+
+# Protect every API route except the public ones; the set is computed once at import time,
+# so new @bentoml.api methods are covered without touching the middleware
+UniversityAdmissionService.add_asgi_middleware(
+    JWTAuthMiddleware,
+    protected_paths=protected_api_routes(UniversityAdmissionService.apis, PUBLIC_APIS) | frozenset(FAST_CODEC_APP.routes(FAST_CODEC_PATH))
+)
@@ -0,0 +1,8 @@
+import os
+# Unit tests count model calls on mocked models; keep the startup warm-up out of them
+os.environ.setdefault('ADMISSION_WARMUP_ROWS', '0')
+# No model store watcher threads outliving the mocked store of a test
+os.environ.setdefault('ADMISSION_RELOAD_INTERVAL', '0')
+# Resolve bentoml's lazily loaded `models` submodule up front, so that patching
+# `src.service.bentoml.models.get` targets the real module in every test.
+import bentoml.models  # noqa: F401
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+from unittest.mock import Mock, patch
+import numpy as np
+import pytest
+from src.admission_control import BoundedExecutor, Overloaded
+from src.instrumentation import _request_stages
+from src.service import UniversityAdmissionService, InputModel
+
+
+class TestBoundedExecutor:
+    '''Test suite for the bounded inference executor'''
+
+    def test_runs_calls_in_the_callers_context(self):
+        '''Verify that calls return their result and record their queue wait in the current request'''
+        executor = BoundedExecutor('test', workers=1, max_queue=1, max_wait_ms=0)
+
+        async def call():
+            stages = {}
+            _request_stages.set(stages)
+            return await executor.run(lambda x: x * 2, 21), stages
+
+        result, stages = asyncio.run(call())
+
+        assert result == 42
+        assert 'queue' in stages
+        assert executor.pending == 0
+
+    def test_rejects_when_queue_is_full(self):
+        '''Verify that calls beyond the workers and the queue are rejected at once'''
+        executor = BoundedExecutor('test', workers=1, max_queue=1, max_wait_ms=0)
+        release = threading.Event()
+
+        async def call():
+            blocked = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            with pytest.raises(Overloaded) as rejected:
+                await executor.run(lambda: None)
+            release.set()
+            await asyncio.gather(*blocked)
+            return rejected.value
+
+        rejected = asyncio.run(call())
+
+        assert rejected.reason == 'queue_full'
+        assert rejected.retry_after >= 1
+
+    def test_rejects_calls_that_waited_too_long(self):
+        '''Verify that a call queued longer than the wait limit is dropped instead of run'''
+        executor = BoundedExecutor('test', workers=1, max_queue=4, max_wait_ms=20)
+        function = Mock()
+
+        async def call():
+            slow = asyncio.ensure_future(executor.run(time.sleep, 0.1))
+            await asyncio.sleep(0.01)
+            with pytest.raises(Overloaded) as rejected:
+                await executor.run(function)
+            await slow
+            return rejected.value
+
+        assert asyncio.run(call()).reason == 'queue_wait'
+        assert not function.called
+
+
+class TestPredictAsync:
+    '''Test suite for the non-blocking predict endpoint'''
+
+    @patch('src.service.bentoml.models.get')
+    def test_predict_async(self, mock_model_get):
+        '''Verify that predict_async returns the same prediction as predict'''
+        mock_model = Mock()
+        mock_model.predict.return_value = np.array([0.85])
+        mock_model_get.return_value.custom_objects = {'flat_forest': mock_model}
+        service = UniversityAdmissionService()
+        input_data = InputModel(gre_score=320, toefl_score=110, university_rating=4, sop=4.5, lor=4.0, cgpa=9.0, research=1)
+
+        result = asyncio.run(service.predict_async(input_data))
+
+        assert result == {'admission_chance': 0.85}
+
+    @patch('src.service.bentoml.models.get')
+    def test_predict_async_rejects_when_overloaded(self, mock_model_get):
+        '''Verify that an overloaded predict_async answers 503 with a Retry-After header'''
+        mock_model_get.return_value.custom_objects = {'flat_forest': Mock()}
+        service = UniversityAdmissionService()
+        service.predict_executor.pending = service.predict_executor.workers + service.predict_executor.max_queue
+        input_data = InputModel(gre_score=320, toefl_score=110, university_rating=4, sop=4.5, lor=4.0, cgpa=9.0, research=1)
+
+        response = asyncio.run(service.predict_async(input_data))
+
+        assert response.status_code == 503
+        assert int(response.headers['Retry-After']) >= 1
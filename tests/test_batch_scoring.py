@@ -0,0 +1,164 @@
+import numpy as np
+import pytest
+from unittest.mock import Mock, patch
+from bentoml.exceptions import InvalidArgument
+from src.batch_scoring import iter_csv_chunks, iter_input_chunks, score_chunks, score_file, ScoringStats
+from src.features import FEATURE_COLUMNS, INPUT_FIELDS, FeatureScaler
+from src.service import UniversityAdmissionService, InputModel
+
+
+class SumModel:
+    '''Stand-in model predicting the row sum, so outputs identify their inputs'''
+
+    def predict(self, X):
+        return np.asarray(X).sum(axis=1)
+
+
+def write_csv(file_path, header, rows):
+    with open(file_path, 'w') as f:
+        f.write(','.join(header) + '\n')
+        for row in rows:
+            f.write(','.join(str(v) for v in row) + '\n')
+
+
+@pytest.fixture
+def applicants():
+    rng = np.random.default_rng(0)
+    return np.column_stack([
+        rng.integers(290, 341, 25), rng.integers(92, 121, 25), rng.integers(1, 6, 25),
+        rng.integers(2, 11, 25) / 2, rng.integers(2, 11, 25) / 2, rng.uniform(6.8, 9.9, 25).round(2), rng.integers(0, 2, 25)
+    ])
+
+
+class TestBatchScoring:
+    '''Test suite for chunked bulk scoring'''
+
+    def test_csv_chunks_follow_feature_order(self, tmp_path, applicants):
+        '''Verify that CSV rows are read in fixed-size chunks, reordered to the training columns'''
+        file_path = tmp_path / 'cohort.csv'
+        # Shuffled column order with extra id and target columns
+        header = ['Chance of Admit ', *reversed(FEATURE_COLUMNS), 'Serial No.']
+        write_csv(file_path, header, [[0.5, *reversed(row), i] for i, row in enumerate(applicants)])
+
+        chunks = list(iter_csv_chunks(file_path, chunk_size=10))
+
+        assert [len(c) for c in chunks] == [10, 10, 5]
+        np.testing.assert_array_equal(np.vstack(chunks), applicants)
+
+    def test_csv_accepts_input_field_names(self, tmp_path, applicants):
+        '''Verify that files may use the InputModel field names as headers'''
+        file_path = tmp_path / 'cohort.csv'
+        write_csv(file_path, INPUT_FIELDS, applicants)
+
+        np.testing.assert_array_equal(np.vstack(list(iter_csv_chunks(file_path))), applicants)
+
+    def test_csv_missing_column_raises(self, tmp_path, applicants):
+        '''Verify that a file without all feature columns is rejected'''
+        file_path = tmp_path / 'cohort.csv'
+        write_csv(file_path, FEATURE_COLUMNS[:-1], applicants[:, :-1])
+
+        with pytest.raises(ValueError):
+            next(iter_csv_chunks(file_path))
+
+    def test_csv_blank_lines_are_skipped(self, tmp_path, applicants):
+        '''Verify that blank lines, e.g. a trailing one, do not break the stream'''
+        file_path = tmp_path / 'cohort.csv'
+        write_csv(file_path, INPUT_FIELDS, applicants[:5])
+        with open(file_path, 'a') as f:
+            f.write('\n' + ','.join(str(v) for v in applicants[5]) + '\n\n')
+
+        np.testing.assert_array_equal(np.vstack(list(iter_csv_chunks(file_path, chunk_size=4))), applicants[:6])
+
+    def test_csv_empty_file_raises(self, tmp_path):
+        '''Verify that an empty file is rejected with a clear error instead of a StopIteration'''
+        file_path = tmp_path / 'cohort.csv'
+        file_path.write_text('')
+
+        with pytest.raises(ValueError, match='empty'):
+            next(iter_csv_chunks(file_path))
+
+    @pytest.mark.parametrize('column, value', [('CGPA', 'nan'), ('GRE Score', '320.5'), ('SOP', 'inf')])
+    def test_csv_invalid_cells_raise(self, tmp_path, applicants, column, value):
+        '''Verify that non-finite cells and fractional integer columns are rejected like in the fast codec'''
+        file_path = tmp_path / 'cohort.csv'
+        rows = applicants.astype(object)
+        rows[3, FEATURE_COLUMNS.index(column)] = value
+        write_csv(file_path, FEATURE_COLUMNS, rows)
+
+        with pytest.raises(ValueError):
+            list(iter_csv_chunks(file_path, chunk_size=10))
+
+    @patch('src.service.bentoml.models.get')
+    def test_predict_batch_file_rejects_invalid_cells(self, mock_model_get, tmp_path, applicants):
+        '''Verify that a nan cell is a client error (InvalidArgument) instead of a silent score'''
+        mock_model_get.return_value.custom_objects = {'flat_forest': SumModel()}
+        service = UniversityAdmissionService()
+        file_path = tmp_path / 'cohort.csv'
+        rows = applicants.astype(object)
+        rows[0, FEATURE_COLUMNS.index('CGPA')] = 'nan'
+        write_csv(file_path, FEATURE_COLUMNS, rows)
+
+        with pytest.raises(InvalidArgument):
+            ''.join(service.predict_batch_file(file_path))
+
+    @patch('src.service.bentoml.models.get')
+    def test_predict_batch_file_rejects_empty_upload(self, mock_model_get, tmp_path):
+        '''Verify that an empty upload is a client error (InvalidArgument), not a server error'''
+        mock_model_get.return_value.custom_objects = {'flat_forest': SumModel()}
+        service = UniversityAdmissionService()
+        file_path = tmp_path / 'cohort.csv'
+        file_path.write_text('')
+
+        with pytest.raises(InvalidArgument):
+            ''.join(service.predict_batch_file(file_path))
+
+    def test_score_file_writes_predictions_in_order(self, tmp_path, applicants):
+        '''Verify that offline scoring writes one prediction per input row and counts rows'''
+        input_path, output_path = tmp_path / 'cohort.csv', tmp_path / 'scores.csv'
+        write_csv(input_path, FEATURE_COLUMNS, applicants)
+
+        stats = score_file(SumModel(), input_path, output_path, chunk_size=7)
+
+        assert stats.rows == len(applicants)
+        assert stats.rows_per_sec > 0
+        lines = output_path.read_text().splitlines()
+        assert lines[0] == 'admission_chance'
+        np.testing.assert_allclose([float(v) for v in lines[1:]], applicants.sum(axis=1))
+
+    def test_parquet_chunks(self, tmp_path, applicants):
+        '''Verify that Parquet files are read in chunks like CSV files'''
+        pa = pytest.importorskip('pyarrow')
+        pq = pytest.importorskip('pyarrow.parquet')
+        from src.batch_scoring import iter_file_chunks
+        file_path = tmp_path / 'cohort.parquet'
+        pq.write_table(pa.table({c: applicants[:, i] for i, c in enumerate(FEATURE_COLUMNS)}), file_path)
+
+        chunks = list(iter_file_chunks(file_path, chunk_size=10))
+
+        assert [len(c) for c in chunks] == [10, 10, 5]
+        np.testing.assert_array_equal(np.vstack(chunks), applicants)
+
+    def test_score_chunks_calls_model_per_chunk(self, applicants):
+        '''Verify that the model runs once per chunk'''
+        model = Mock(wraps=SumModel())
+        inputs = [InputModel(**dict(zip(INPUT_FIELDS, row))) for row in applicants.tolist()]
+        stats = ScoringStats()
+
+        predictions = list(score_chunks(model, iter_input_chunks(inputs, chunk_size=10), stats))
+
+        assert model.predict.call_count == 3
+        assert stats.rows == len(applicants)
+        np.testing.assert_allclose(np.concatenate(predictions), applicants.sum(axis=1))
+
+    @patch('src.service.bentoml.models.get')
+    def test_predict_batch_streams_csv(self, mock_model_get, applicants):
+        '''Verify that the bulk endpoint streams a CSV header followed by one line per input'''
+        mock_model_get.return_value.custom_objects = {'flat_forest': SumModel()}
+        service = UniversityAdmissionService()
+        inputs = [InputModel(**dict(zip(INPUT_FIELDS, row))) for row in applicants.tolist()]
+
+        body = ''.join(service.predict_batch(inputs, chunk_size=10))
+
+        lines = body.splitlines()
+        assert lines[0] == 'admission_chance'
+        np.testing.assert_allclose([float(v) for v in lines[1:]], FeatureScaler.fit().transform(applicants).sum(axis=1))
@@ -0,0 +1,90 @@
+import numpy as np
+from unittest.mock import Mock, patch
+from src.cache import PredictionCache, row_key
+from src.service import UniversityAdmissionService, InputModel
+
+
+class TestPredictionCache:
+    '''Test suite for the prediction cache'''
+
+    def test_lru_eviction(self):
+        '''Verify that the least recently used entry is evicted beyond maxsize'''
+        cache = PredictionCache(maxsize=2)
+        cache.put(b'a', 0.1)
+        cache.put(b'b', 0.2)
+        cache.get(b'a')
+        cache.put(b'c', 0.3)
+
+        assert cache.get(b'b') is None
+        assert cache.get(b'a') == 0.1
+        assert cache.get(b'c') == 0.3
+        assert cache.stats()['evictions'] == 1
+
+    def test_ttl_expiry(self):
+        '''Verify that entries older than the TTL are treated as misses'''
+        cache = PredictionCache(maxsize=10, ttl=60)
+        with patch('src.cache.time.monotonic', return_value=1000.0):
+            cache.put(b'a', 0.1)
+        with patch('src.cache.time.monotonic', return_value=1059.0):
+            assert cache.get(b'a') == 0.1
+        with patch('src.cache.time.monotonic', return_value=1061.0):
+            assert cache.get(b'a') is None
+
+        assert len(cache) == 0
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+
+    def test_bind_new_model_tag_invalidates(self):
+        '''Verify that binding the cache to a different model version drops all entries'''
+        cache = PredictionCache()
+        cache.bind('model:v1')
+        cache.put(b'a', 0.1)
+        cache.bind('model:v1')
+        assert cache.get(b'a') == 0.1
+
+        cache.bind('model:v2')
+
+        assert cache.get(b'a') is None
+        assert cache.model_tag == 'model:v2'
+
+    def test_row_key_is_canonical(self):
+        '''Verify that equal feature rows map to the same key whatever their dtype'''
+        assert row_key(np.array([320, 110, 4, 4.5, 4.0, 9.0, 1])) == row_key(np.array([320.0, 110.0, 4.0, 4.5, 4.0, 9.0, 1.0]))
+        assert row_key(np.array([-0.0])) == row_key(np.array([0.0]))
+        assert row_key(np.array([9.0])) != row_key(np.array([9.01]))
+
+
+class TestServiceCaching:
+    '''Test suite for the cached prediction path of the service'''
+
+    @patch('src.service.bentoml.models.get')
+    def test_repeated_input_is_served_from_cache(self, mock_model_get):
+        '''Verify that the model only runs for the first of several identical requests'''
+        mock_model = Mock()
+        mock_model.predict.return_value = [0.85]
+        mock_model_get.return_value.custom_objects = {'flat_forest': mock_model}
+        service = UniversityAdmissionService()
+        input_data = InputModel(gre_score=320, toefl_score=110, university_rating=4, sop=4.5, lor=4.0, cgpa=9.0, research=1)
+
+        results = [service.predict(input_data) for _ in range(3)]
+
+        assert results == [{'admission_chance': 0.85}] * 3
+        assert mock_model.predict.call_count == 1
+        assert service.cache.stats()['hits'] == 2
+
+    @patch('src.service.bentoml.models.get')
+    def test_batch_scores_only_misses(self, mock_model_get):
+        '''Verify that a batch only sends uncached rows to the model, keeping the result order'''
+        mock_model = Mock()
+        mock_model_get.return_value.custom_objects = {'flat_forest': mock_model}
+        service = UniversityAdmissionService()
+        first = InputModel(gre_score=320, toefl_score=110, university_rating=4, sop=4.5, lor=4.0, cgpa=9.0, research=1)
+        second = InputModel(gre_score=300, toefl_score=95, university_rating=2, sop=3.0, lor=2.5, cgpa=7.5, research=0)
+        mock_model.predict.return_value = [0.85]
+        service.predict(first)
+
+        mock_model.predict.return_value = [0.45]
+        result = service.predict_adaptive([second, first])
+
+        assert result == [{'admission_chance': 0.45}, {'admission_chance': 0.85}]
+        assert len(mock_model.predict.call_args[0][0]) == 1
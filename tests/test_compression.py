@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from src.features import FeatureScaler, sample_rows
+from src.model.compression import compress, greedy_tree_order, smallest_subset
+
+
+@pytest.fixture(scope='module')
+def forest_data():
+    '''Forest trained on scaled synthetic admission rows'''
+    rng = np.random.default_rng(42)
+    X = FeatureScaler.fit().transform(sample_rows(500, seed=1))
+    y = X @ rng.uniform(0, 0.3, size=X.shape[1]) + rng.normal(0, 0.02, size=len(X))
+    model = RandomForestRegressor(n_estimators=20, random_state=42, n_jobs=1).fit(X[:400], y[:400])
+    return model, X[:400], X[400:], y[400:]
+
+
+class TestCompression:
+    '''Test suite for the latency-budgeted model compression'''
+
+    def test_greedy_order_starts_with_the_closest_tree(self):
+        '''Verify that the first selected tree is the one closest to the mean of all trees'''
+        predictions = np.array([[0.0, 0.0], [1.0, 1.0], [0.4, 0.5], [0.7, 0.6]])
+
+        order = greedy_tree_order(predictions)
+
+        assert order[0] == 2
+        assert sorted(order) == [0, 1, 2, 3]
+
+    def test_smallest_subset_within_budget(self):
+        '''Verify that the shortest prefix within the RMSE budget of the target is returned'''
+        predictions = np.array([[0.5, 0.5], [0.0, 0.0], [1.0, 1.0]])
+        y = np.array([0.5, 0.5])
+
+        assert smallest_subset(np.array([1, 2, 0]), predictions, y, max_rmse=0.01) == 2
+        assert smallest_subset(np.array([1, 0, 2]), predictions, y, max_rmse=0.01) == 3
+        assert smallest_subset(np.array([1, 0]), predictions, y, max_rmse=0.01) is None
+
+    def test_subsets_are_not_sized_on_the_test_split(self, forest_data):
+        '''Verify that the selected tree counts do not depend on the test targets'''
+        model, X_train, X_test, y_test = forest_data
+
+        _, variants = compress(model, X_train, X_test, y_test, max_rmse_increase=0.005, reference_rows=500)
+        _, shifted = compress(model, X_train, X_test, y_test + 0.5, max_rmse_increase=0.005, reference_rows=500)
+
+        assert [(v['method'], v['n_trees']) for v in variants] == [(v['method'], v['n_trees']) for v in shifted]
+
+    def test_variants_respect_the_budget(self, forest_data):
+        '''Verify that the variants within budget are smaller than the forest and report their deltas'''
+        model, X_train, X_test, y_test = forest_data
+
+        original, variants = compress(model, X_train, X_test, y_test, max_rmse_increase=0.005, distil=True, reference_rows=500)
+
+        methods = {variant['method'] for variant in variants}
+        assert 'tree_selection' in methods and 'distillation' in methods
+        for variant in variants:
+            assert variant['flat_forest'].predict(X_test).shape == y_test.shape
+            assert variant['size_ratio'] == variant['size_bytes'] / original['size_bytes']
+            # Subsets are sized on the reference rows; the test split only decides the budget check
+            assert variant['within_budget'] == (variant['rmse'] <= original['rmse'] + 0.005)
+            if variant['method'] != 'distillation':
+                assert variant['n_trees'] <= original['n_trees']
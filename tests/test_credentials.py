@@ -0,0 +1,94 @@
+import json
+import pytest
+from unittest.mock import patch
+from src.credentials import CredentialStore, LoginRateLimiter, hash_password, verify_password, DEFAULT_CREDENTIALS
+
+
+class TestPasswordHashing:
+    '''Test suite for scrypt password hashing'''
+
+    def test_hash_round_trip(self):
+        '''Verify that a hashed password verifies and a different one does not'''
+        encoded = hash_password('secret')
+
+        assert encoded.startswith('scrypt$')
+        assert verify_password('secret', encoded)
+        assert not verify_password('Secret', encoded)
+
+    def test_salted(self):
+        '''Verify that hashing the same password twice gives different hashes'''
+        assert hash_password('secret') != hash_password('secret')
+
+    def test_malformed_hash(self):
+        '''Verify that a malformed or plaintext entry never verifies'''
+        assert not verify_password('secret', 'secret')
+        assert not verify_password('secret', 'md5$1$1$1$00$00')
+
+    def test_corrupt_scrypt_hash(self):
+        '''Verify that a scrypt entry with bad hex or invalid parameters is rejected instead of raising'''
+        salt, digest = hash_password('secret').split('$')[-2:]
+
+        for encoded in (f'scrypt$16384$8$1$zz${digest}', f'scrypt$16384$8$1${salt}$not-hex', f'scrypt$n$8$1${salt}${digest}',
+                        f'scrypt$3$8$1${salt}${digest}', f'scrypt${2 ** 80}$8$1${salt}${digest}', f'scrypt$16384$8$1${salt}$'):
+            assert not verify_password('secret', encoded)
+        assert not verify_password('secret', 12345)
+        assert not verify_password('secret', None)
+
+
+class TestCredentialStore:
+    '''Test suite for the hashed credential store'''
+
+    def test_demo_users_by_default(self):
+        '''Verify that the demo users are served when nothing is configured'''
+        with patch.dict('os.environ', clear=True):
+            store = CredentialStore.from_env()
+
+        assert store.hashes == DEFAULT_CREDENTIALS
+        assert store.verify('user123', 'password123')
+        assert not store.verify('user123', 'password456')
+
+    def test_load_from_file(self, tmp_path):
+        '''Verify that credentials are loaded from ADMISSION_CREDENTIALS_FILE'''
+        file_path = tmp_path / 'credentials.json'
+        file_path.write_text(json.dumps({'alice': hash_password('wonderland')}))
+        with patch.dict('os.environ', {'ADMISSION_CREDENTIALS_FILE': str(file_path)}):
+            store = CredentialStore.from_env()
+
+        assert store.verify('alice', 'wonderland')
+        assert 'user123' not in store
+
+    @pytest.mark.parametrize('credentials', ['{"alice": 12345}', '{"alice": null}', '["alice"]'])
+    def test_non_string_hashes_fail_at_startup(self, credentials):
+        '''Verify that a configured hash that is not a string is rejected when loading, not on login'''
+        with patch.dict('os.environ', {'ADMISSION_CREDENTIALS': credentials}, clear=True):
+            with pytest.raises(ValueError):
+                CredentialStore.from_env()
+
+    def test_unknown_user_and_bad_types(self):
+        '''Verify that unknown users and non-string credentials are rejected'''
+        store = CredentialStore(DEFAULT_CREDENTIALS)
+
+        assert not store.verify('nobody', 'password123')
+        assert not store.verify(None, 'password123')
+        assert not store.verify('user123', None)
+        assert ['user123'] not in store
+
+
+class TestLoginRateLimiter:
+    '''Test suite for the per-user login rate limiter'''
+
+    def test_burst_then_refill(self):
+        '''Verify that a user gets the burst at once and further attempts as the bucket refills'''
+        limiter = LoginRateLimiter(per_minute=60, burst=2)
+        with patch('src.credentials.time.monotonic', return_value=100.0):
+            assert [limiter.allow('user123') for _ in range(3)] == [True, True, False]
+            assert limiter.allow('user456')
+        with patch('src.credentials.time.monotonic', return_value=101.0):
+            assert limiter.allow('user123')
+            assert not limiter.allow('user123')
+
+    def test_disabled(self):
+        '''Verify that a rate of 0 disables the limit'''
+        limiter = LoginRateLimiter(per_minute=0, burst=1)
+
+        assert all(limiter.allow('user123') for _ in range(10))
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import numpy as np
+from unittest.mock import MagicMock, patch
+from src.data.load_data import load_data, meta_path
+from src.data.prepare_data import SPLIT_NAMES, load_split, prepare_data
+from src.data.synthetic_data import generate_admission_data
+from src.features import FEATURE_COLUMNS
+
+URL = 'https://example.com/admission.csv'
+
+
+def mock_response(status_code: int = 200, content: bytes = b'', etag: str | None = None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = {'ETag': etag} if etag else {}
+    response.iter_content.return_value = [content[i:i + 4] for i in range(0, len(content), 4)]
+    response.__enter__.return_value = response
+    return response
+
+
+class TestLoadData:
+    '''Test suite for the streamed, cached download'''
+
+    def test_streams_to_file_and_records_etag(self, tmp_path):
+        '''Verify that the download is written chunk by chunk and its ETag and digest recorded'''
+        file_path = str(tmp_path / 'raw' / 'admission.csv')
+        with patch('src.data.load_data.requests.get', return_value=mock_response(content=b'a,b\n1,2\n', etag='"v1"')) as get:
+            assert load_data(URL, file_path)
+
+        assert get.call_args.kwargs['stream'] is True
+        assert open(file_path, 'rb').read() == b'a,b\n1,2\n'
+        meta = json.load(open(meta_path(file_path)))
+        assert meta == {'url': URL, 'etag': '"v1"', 'sha256': hashlib.sha256(b'a,b\n1,2\n').hexdigest()}
+
+    def test_not_modified_skips_download(self, tmp_path):
+        '''Verify that the stored ETag is sent and a 304 leaves the file alone'''
+        file_path = str(tmp_path / 'admission.csv')
+        with patch('src.data.load_data.requests.get', return_value=mock_response(content=b'a,b\n', etag='"v1"')):
+            load_data(URL, file_path)
+        with patch('src.data.load_data.requests.get', return_value=mock_response(status_code=304)) as get:
+            assert not load_data(URL, file_path)
+
+        assert get.call_args.kwargs['headers'] == {'If-None-Match': '"v1"'}
+        assert open(file_path, 'rb').read() == b'a,b\n'
+
+    def test_same_content_keeps_file(self, tmp_path):
+        '''Verify that a re-download with identical content does not replace the file'''
+        file_path = tmp_path / 'admission.csv'
+        with patch('src.data.load_data.requests.get', return_value=mock_response(content=b'a,b\n')):
+            load_data(URL, str(file_path))
+        mtime = file_path.stat().st_mtime_ns
+        with patch('src.data.load_data.requests.get', return_value=mock_response(content=b'a,b\n')):
+            assert not load_data(URL, str(file_path))
+
+        assert file_path.stat().st_mtime_ns == mtime
+        assert not (tmp_path / 'admission.csv.part').exists()
+
+
+class TestPrepareData:
+    '''Test suite for the cached data preparation stage'''
+
+    def test_writes_npy_splits(self, tmp_path):
+        '''Verify that the splits are written as arrays in feature order with a 80/20 split'''
+        raw_file = tmp_path / 'admission.csv'
+        generate_admission_data(200).to_csv(raw_file, index=False)
+
+        assert prepare_data(str(raw_file), str(tmp_path / 'processed'))
+
+        splits = {name: load_split(str(tmp_path / 'processed'), name) for name in SPLIT_NAMES}
+        assert splits['X_train'].shape == (160, len(FEATURE_COLUMNS))
+        assert splits['X_test'].shape == (40, len(FEATURE_COLUMNS))
+        assert splits['y_train'].shape == (160,)
+        assert np.all(splits['X_train'] <= 1.0)
+
+    def test_unchanged_input_is_a_no_op(self, tmp_path):
+        '''Verify that a second run on the same raw data is skipped, and a changed file reruns'''
+        raw_file = tmp_path / 'admission.csv'
+        generate_admission_data(200).to_csv(raw_file, index=False)
+        processed = str(tmp_path / 'processed')
+        prepare_data(str(raw_file), processed)
+
+        with patch('src.data.prepare_data.read_raw') as read_raw:
+            assert not prepare_data(str(raw_file), processed)
+        assert not read_raw.called
+
+        generate_admission_data(200, seed=1).to_csv(raw_file, index=False)
+        assert prepare_data(str(raw_file), processed)
+        assert prepare_data(str(raw_file), processed, force=True)
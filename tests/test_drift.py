@@ -0,0 +1,147 @@
+from unittest.mock import Mock, patch
+import numpy as np
+import pytest
+from src.drift import DRIFT_FIELDS, DRIFT_REFERENCE_KEY, DriftMonitor, DriftReference, ks_distance, psi
+from src.features import sample_rows
+from src.service import UniversityAdmissionService, InputModel
+
+
+@pytest.fixture(scope='module')
+def reference():
+    '''Reference of synthetic applicants, with a prediction that grows with the CGPA'''
+    X = sample_rows(5000, seed=0)
+    return DriftReference.fit(X, X[:, 5] / 10)
+
+
+def monitor(reference, **kwargs) -> DriftMonitor:
+    return DriftMonitor(reference, 'model:test', **{'interval': 0, 'min_rows': 1, **kwargs})
+
+
+class TestDriftReference:
+    '''Test suite for the training reference of the drift monitor'''
+
+    def test_predictions_may_come_from_other_rows(self):
+        '''Verify that the prediction reference can be fitted on held-out rows of another size than the inputs'''
+        reference = DriftReference.fit(sample_rows(500), np.linspace(0.3, 0.9, 100))
+
+        assert len(reference.shares) == len(DRIFT_FIELDS)
+        assert reference.shares[-1] == pytest.approx(np.full(10, 0.1))
+
+    def test_quantile_bins(self, reference):
+        '''Verify that every field gets at most ten bins holding about a tenth of the rows each'''
+        assert len(reference.edges) == len(DRIFT_FIELDS)
+        for edges, shares in zip(reference.edges, reference.shares):
+            assert len(shares) == len(edges) + 1 <= 10
+            assert shares.sum() == pytest.approx(1)
+        # research only takes 0 and 1: edges collapse to the distinct values
+        assert list(reference.edges[DRIFT_FIELDS.index('research')]) == [0.0, 1.0]
+        assert reference.shares[DRIFT_FIELDS.index('gre_score')].max() < 0.2
+
+    def test_scores(self):
+        '''Verify that PSI and KS distance are zero for equal distributions and grow with a shift'''
+        expected = np.full(4, 0.25)
+
+        assert psi(expected, expected) == 0
+        assert ks_distance(expected, expected) == 0
+        assert psi(expected, np.array([0.1, 0.2, 0.3, 0.4])) < psi(expected, np.array([0.0, 0.0, 0.5, 0.5]))
+        assert ks_distance(expected, np.array([0.0, 0.0, 0.5, 0.5])) == pytest.approx(0.5)
+
+
+class TestDriftMonitor:
+    '''Test suite for the streaming drift monitor'''
+
+    def test_stable_traffic_scores_low(self, reference):
+        '''Verify that traffic drawn like the training data has a low PSI on every field'''
+        drift = monitor(reference)
+        X = sample_rows(2000, seed=1)
+
+        drift.observe(X, (X[:, 5] / 10).tolist())
+
+        assert set(drift.scores) == set(DRIFT_FIELDS)
+        assert all(score['psi'] < 0.1 for score in drift.scores.values())
+
+    def test_shifted_field_scores_high(self, reference):
+        '''Verify that a shift of one input and of the predictions shows up on those fields only'''
+        drift = monitor(reference)
+        X = sample_rows(2000, seed=1)
+        X[:, 5] = np.minimum(X[:, 5] + 1.5, 9.92)
+
+        drift.observe(X, (X[:, 5] / 10).tolist())
+
+        assert drift.scores['cgpa']['psi'] > 0.25
+        assert drift.scores['admission_chance']['ks'] > 0.3
+        assert drift.scores['gre_score']['psi'] < 0.1
+
+    def test_rows_are_binned_in_batches(self, reference):
+        '''Verify that requests are only queued until the buffer fills, then binned into fixed counts'''
+        drift = monitor(reference, interval=3600, buffer_rows=10)
+        X = sample_rows(1)
+
+        for _ in range(9):
+            drift.observe(X, [0.8])
+        assert drift.window_rows == 0 and len(drift._pending) == 9
+
+        drift.observe(X, [0.8])
+
+        assert drift.window_rows == 10 and drift._pending == []
+        assert all(counts.sum() == 10 for counts in drift.counts)
+        # Not scored before the interval is over
+        assert drift.scores == {}
+
+    def test_small_windows_keep_counting(self, reference):
+        '''Verify that a window below the minimum row count is not scored and not reset'''
+        drift = monitor(reference, min_rows=100)
+        X = sample_rows(50)
+
+        drift.observe(X, [0.8] * 50)
+        assert drift.window_rows == 50 and drift.scores == {}
+
+        drift.observe(X, [0.8] * 50)
+
+        assert drift.window_rows == 0
+        assert set(drift.scores) == set(DRIFT_FIELDS)
+
+
+class TestServiceDrift:
+    '''Test suite for drift monitoring in the service'''
+
+    @patch('src.service.bentoml.models.get')
+    def test_predictions_feed_the_monitor(self, mock_model_get, reference):
+        '''Verify that a model saved with a reference is monitored and predict requests reach its monitor'''
+        mock_model = Mock()
+        mock_model.predict.side_effect = lambda X: np.full(len(X), 0.85)
+        mock_model_get.return_value.custom_objects = {'flat_forest': mock_model, DRIFT_REFERENCE_KEY: reference}
+        service = UniversityAdmissionService()
+        input_data = InputModel(gre_score=320, toefl_score=110, university_rating=4, sop=4.5, lor=4.0, cgpa=9.0, research=1)
+
+        service.predict(input_data)
+        service.predict_adaptive([input_data, input_data])
+        drift = service.models.active.drift
+        drift.flush()
+
+        # The warm-up rows are synthetic and stay out of the window
+        assert drift.window_rows == 3
+        assert drift.counts[DRIFT_FIELDS.index('gre_score')].sum() == 3
+
+    @patch('src.service.bentoml.models.get')
+    def test_bulk_scoring_feeds_the_monitor(self, mock_model_get, reference):
+        '''Verify that the rows and predictions of predict_batch reach the monitor'''
+        mock_model = Mock()
+        mock_model.predict.side_effect = lambda X: np.full(len(X), 0.85)
+        mock_model_get.return_value.custom_objects = {'flat_forest': mock_model, DRIFT_REFERENCE_KEY: reference}
+        service = UniversityAdmissionService()
+        input_data = InputModel(gre_score=320, toefl_score=110, university_rating=4, sop=4.5, lor=4.0, cgpa=9.0, research=1)
+
+        ''.join(service.predict_batch([input_data] * 25, chunk_size=10))
+        drift = service.models.active.drift
+        drift.flush()
+
+        assert drift.window_rows == 25
+        assert drift.counts[DRIFT_FIELDS.index('admission_chance')].sum() == 25
+
+    @patch('src.service.bentoml.models.get')
+    def test_models_without_reference_are_not_monitored(self, mock_model_get):
+        '''Verify that models trained before the reference was stored are served without a monitor'''
+        mock_model_get.return_value.custom_objects = {'flat_forest': Mock()}
+
+        assert UniversityAdmissionService().models.active.drift is None
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import httpx
+import numpy as np
+import pytest
+from src import fast_codec
+from src.admission_control import BoundedExecutor
+from src.fast_codec import DecodeError, FastCodecApp, decode_predict, decode_predict_batch, encode_prediction
+from src.features import input_to_row
+from src.service import InputModel
+
+APPLICANT = {'gre_score': 320, 'toefl_score': 110, 'university_rating': 4, 'sop': 4.5, 'lor': 4.0, 'cgpa': 9.0, 'research': 1}
+
+
+@pytest.fixture(params=['msgspec', 'json'])
+def codec(request, monkeypatch):
+    '''Run each test with msgspec decoding (when installed) and with the json fallback'''
+    if request.param == 'msgspec' and fast_codec.msgspec is None:
+        pytest.skip('msgspec is not installed')
+    if request.param == 'json':
+        monkeypatch.setattr(fast_codec, 'msgspec', None)
+    return request.param
+
+
+class TestFastCodec:
+    '''Test suite for the fast request codec'''
+
+    def test_decode_matches_input_model(self, codec):
+        '''Verify that a body decodes to the same feature row as InputModel'''
+        row = decode_predict(json.dumps({'input_data': APPLICANT}).encode())
+
+        assert np.array_equal(row, input_to_row(InputModel(**APPLICANT)))
+
+    def test_decode_accepts_integral_floats_and_ignores_extra_fields(self, codec):
+        '''Verify that integer fields take integral floats and unknown fields are ignored, like InputModel'''
+        body = json.dumps({'input_data': {**APPLICANT, 'gre_score': 320.0, 'name': 'x'}}).encode()
+
+        assert decode_predict(body)[0, 0] == 320
+
+    @pytest.mark.parametrize('field, value', [('gre_score', '320'), ('research', True), ('cgpa', '9.0'), ('sop', False)])
+    def test_decode_coerces_like_input_model(self, codec, field, value):
+        '''Verify that numeric strings and booleans are accepted and coerced like pydantic's lax InputModel'''
+        applicant = {**APPLICANT, field: value}
+        row = decode_predict(json.dumps({'input_data': applicant}).encode())
+
+        assert np.array_equal(row, input_to_row(InputModel(**applicant)))
+
+    @pytest.mark.parametrize('field, value', [('gre_score', 320.5), ('research', 0.5), ('cgpa', 'high'), ('gre_score', '320.5'), ('sop', None)])
+    def test_decode_rejects_invalid_values(self, codec, field, value):
+        '''Verify that non-integral integers, non-numeric strings and nulls are rejected'''
+        with pytest.raises(DecodeError):
+            decode_predict(json.dumps({'input_data': {**APPLICANT, field: value}}).encode())
+
+    def test_decode_rejects_huge_integers(self, codec):
+        '''Verify that an integer too large for a float is a decode error (400), not an OverflowError'''
+        body = json.dumps({'input_data': {**APPLICANT, 'gre_score': 10 ** 400}}).encode()
+
+        with pytest.raises(DecodeError):
+            decode_predict(body)
+        with pytest.raises(DecodeError):
+            decode_predict_batch(body.replace(b'"input_data": ', b'"inputs": [').replace(b'}}', b'}]}'))
+
+    @pytest.mark.parametrize('body', [b'{"input_data": {"gre_score": 320}}', b'{"inputs": []}', b'not json'])
+    def test_decode_rejects_incomplete_bodies(self, codec, body):
+        '''Verify that missing fields and malformed JSON are rejected'''
+        with pytest.raises(DecodeError):
+            decode_predict(body)
+
+    def test_decode_batch(self, codec):
+        '''Verify that a batch body decodes to a feature matrix in input order with its chunk size'''
+        second = {**APPLICANT, 'gre_score': 300}
+        X, chunk_size = decode_predict_batch(json.dumps({'inputs': [APPLICANT, second], 'chunk_size': 1}).encode())
+
+        assert X.shape == (2, 7) and list(X[:, 0]) == [320, 300]
+        assert chunk_size == 1
+        assert decode_predict_batch(b'{"inputs": []}')[0].shape == (0, 7)
+        with pytest.raises(DecodeError):
+            decode_predict_batch(json.dumps({'inputs': [APPLICANT], 'chunk_size': 0}).encode())
+
+    def test_encode_prediction(self):
+        '''Verify that the encoded response is the JSON of the regular predict endpoint'''
+        assert json.loads(encode_prediction(np.float64(0.85))) == {'admission_chance': 0.85}
+
+    def test_app_routes(self, codec):
+        '''Verify the mounted app's responses for predict, predict_batch and invalid bodies'''
+        app = FastCodecApp()
+        app.bind(lambda X: [0.5] * len(X), lambda chunks, chunk_size: iter(('admission_chance\n', *(f'{0.5!r}\n' for chunk in chunks for _ in chunk))),
+                 BoundedExecutor('test', 2, 8, 0))
+
+        async def call():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+                return await asyncio.gather(
+                    client.post('/predict', json={'input_data': APPLICANT}),
+                    client.post('/predict_batch', json={'inputs': [APPLICANT] * 3, 'chunk_size': 2}),
+                    client.post('/predict', json={'input_data': {**APPLICANT, 'research': 'yes'}}),
+                    client.get('/predict')
+                )
+        predict, batch, invalid, wrong_method = asyncio.run(call())
+
+        assert predict.json() == {'admission_chance': 0.5}
+        assert batch.text == 'admission_chance\n0.5\n0.5\n0.5\n'
+        assert invalid.status_code == 400
+        assert wrong_method.status_code == 405
+
+    def test_app_sheds_load_with_503(self, codec):
+        '''Verify that both routes score on the bound executor and answer 503 with Retry-After when it is full'''
+        executor = BoundedExecutor('test', 1, 0, 0)
+        executor.pending = 1
+        app = FastCodecApp()
+        app.bind(lambda X: [0.5] * len(X), lambda chunks, chunk_size: iter(['admission_chance\n']), executor)
+
+        async def call():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+                return await asyncio.gather(
+                    client.post('/predict', json={'input_data': APPLICANT}),
+                    client.post('/predict_batch', json={'inputs': [APPLICANT]})
+                )
+
+        for response in asyncio.run(call()):
+            assert response.status_code == 503
+            assert response.headers['retry-after'] == '1'
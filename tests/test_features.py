@@ -0,0 +1,51 @@
+import subprocess
+import sys
+import numpy as np
+from src.features import FEATURE_COLUMNS, INPUT_FIELDS, FEATURE_DTYPES, FEATURE_MAX_SCORES, FEATURE_RANGES, ROW_DTYPE, input_to_row, inputs_to_matrix, sample_rows
+from src.service import InputModel
+
+
+class TestFeatureSchema:
+    '''Test suite for the shared feature schema'''
+
+    def test_schema_covers_input_model(self):
+        '''Verify that every feature column maps to an InputModel field and has a dtype'''
+        assert len(FEATURE_COLUMNS) == len(INPUT_FIELDS)
+        assert set(INPUT_FIELDS) == set(InputModel.model_fields)
+        assert set(FEATURE_DTYPES) == set(FEATURE_COLUMNS)
+        assert set(FEATURE_MAX_SCORES) <= set(FEATURE_COLUMNS)
+
+    def test_inputs_to_matrix_matches_rows(self):
+        '''Verify that batch conversion stacks the single-row conversions'''
+        inputs = [
+            InputModel(gre_score=320, toefl_score=110, university_rating=4, sop=4.5, lor=4.0, cgpa=9.0, research=1),
+            InputModel(gre_score=300, toefl_score=95, university_rating=2, sop=3.0, lor=2.5, cgpa=7.5, research=0)
+        ]
+
+        matrix = inputs_to_matrix(inputs)
+
+        assert matrix.dtype == ROW_DTYPE
+        assert matrix.shape == (2, len(FEATURE_COLUMNS))
+        np.testing.assert_array_equal(matrix, np.vstack([input_to_row(i) for i in inputs]))
+
+    def test_service_import_does_not_load_pandas(self):
+        '''Verify that importing the service keeps pandas off the request path'''
+        code = 'import sys, src.service; sys.exit("pandas" in sys.modules)'
+        assert subprocess.run([sys.executable, '-c', code]).returncode == 0
+
+    def test_service_import_defers_heavy_modules(self):
+        '''Verify that importing the service leaves sklearn and joblib to model loading'''
+        code = 'import sys, src.service; sys.exit(any(m in sys.modules for m in ("sklearn", "joblib")))'
+        assert subprocess.run([sys.executable, '-c', code]).returncode == 0
+
+    def test_sample_rows_within_ranges(self):
+        '''Verify that sampled rows lie on the feature ranges and are reproducible'''
+        rows = sample_rows(500, seed=1)
+
+        assert rows.shape == (500, len(FEATURE_COLUMNS))
+        for i, column in enumerate(FEATURE_COLUMNS):
+            low, high, step = FEATURE_RANGES[column]
+            values = rows[:, i]
+            assert values.min() >= low and values.max() <= high
+            np.testing.assert_allclose(np.round((values - low) / step), (values - low) / step, atol=1e-6)
+        np.testing.assert_array_equal(rows, sample_rows(500, seed=1))
@@ -0,0 +1,162 @@
+import numpy as np
+import pytest
+from unittest.mock import Mock
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from src.model.flat_forest import FlatForest, FLAT_FOREST_FILE, PREDICTION_TOLERANCE, CHUNK_SIZE
+from src.service import load_engine
+
+
+@pytest.fixture(scope='module')
+def training_data():
+    '''Small synthetic regression problem with the same number of features as the admission data'''
+    rng = np.random.default_rng(42)
+    X = rng.uniform(0, 1, size=(300, 7))
+    y = X @ rng.uniform(0, 1, size=7) + rng.normal(0, 0.05, size=300)
+    return X, y
+
+
+class TestFlatForest:
+    '''Test suite for the flat-array random forest engine'''
+
+    def test_predictions_match_sklearn_exactly(self, training_data):
+        '''Verify that the flat engine reproduces sklearn bit-for-bit with sequential tree accumulation'''
+        X, y = training_data
+        model = RandomForestRegressor(n_estimators=20, n_jobs=1, random_state=42).fit(X, y)
+        flat_forest = FlatForest.from_sklearn(model)
+
+        X_new = np.random.default_rng(0).uniform(0, 1, size=(CHUNK_SIZE + 100, 7))
+
+        assert np.array_equal(flat_forest.predict(X_new), model.predict(X_new))
+        assert np.array_equal(flat_forest.predict(X_new[:1]), model.predict(X_new[:1]))
+
+    def test_predictions_within_tolerance_for_parallel_sklearn(self, training_data):
+        '''Verify that the flat engine stays within the documented tolerance of a multi-threaded forest'''
+        X, y = training_data
+        model = RandomForestRegressor(n_estimators=50, n_jobs=-1, criterion='friedman_mse', random_state=42).fit(X, y)
+        flat_forest = FlatForest.from_sklearn(model)
+
+        np.testing.assert_allclose(flat_forest.predict(X), model.predict(X), rtol=0, atol=PREDICTION_TOLERANCE)
+
+    def test_apply_returns_leaves(self, training_data):
+        '''Verify that traversal ends on leaf nodes that match sklearn's leaf values'''
+        X, y = training_data
+        model = RandomForestRegressor(n_estimators=5, random_state=42).fit(X, y)
+        flat_forest = FlatForest.from_sklearn(model)
+
+        leaves = flat_forest.apply(X[:10])
+
+        assert leaves.shape == (5, 10)
+        for tree_index, estimator in enumerate(model.estimators_):
+            np.testing.assert_array_equal(flat_forest.value[leaves[tree_index]], estimator.predict(X[:10]))
+
+    def test_depth_cap_stops_at_that_depth(self, training_data):
+        '''Verify that cutting the trees at a depth predicts the value of the node reached at that depth'''
+        X, y = training_data
+        model = RandomForestRegressor(n_estimators=5, random_state=42).fit(X, y)
+
+        capped = FlatForest.from_trees([estimator.tree_ for estimator in model.estimators_], max_depth=3)
+
+        expected = np.zeros(len(X))
+        for estimator in model.estimators_:
+            paths = estimator.decision_path(X.astype(np.float32))
+            # Node ids increase along a path, so the fourth node on it is the one at depth 3
+            nodes = [paths.indices[paths.indptr[i]:paths.indptr[i + 1]][:4][-1] for i in range(len(X))]
+            expected += estimator.tree_.value[nodes, 0, 0]
+        assert capped.max_depth == 3
+        assert capped.nbytes < FlatForest.from_sklearn(model).nbytes
+        np.testing.assert_allclose(capped.predict(X), expected / 5, rtol=0, atol=PREDICTION_TOLERANCE)
+
+    def test_gradient_boosting_export(self, training_data):
+        '''Verify that a gradient-boosted model exports to a flat forest with the same predictions'''
+        X, y = training_data
+        model = GradientBoostingRegressor(n_estimators=30, max_depth=3, random_state=42).fit(X, y)
+
+        flat_forest = FlatForest.from_sklearn(model)
+
+        assert flat_forest.n_trees == 30
+        np.testing.assert_allclose(flat_forest.predict(X), model.predict(X), rtol=0, atol=1e-9)
+
+    @pytest.mark.parametrize('estimator', [RandomForestRegressor(n_estimators=20, random_state=42),
+                                           GradientBoostingRegressor(n_estimators=30, max_depth=3, random_state=42)])
+    def test_contributions_add_up_to_predictions(self, training_data, estimator):
+        '''Verify that the bias plus each row's feature contributions equals its prediction, also across chunks'''
+        X, y = training_data
+        flat_forest = FlatForest.from_sklearn(estimator.fit(X, y))
+        X_new = np.random.default_rng(0).uniform(0, 1, size=(CHUNK_SIZE + 100, 7))
+
+        bias, contributions = flat_forest.contributions(X_new)
+
+        assert contributions.shape == (CHUNK_SIZE + 100, 7)
+        assert bias == pytest.approx(flat_forest.value[flat_forest.roots].mean())
+        np.testing.assert_allclose(bias + contributions.sum(axis=1), flat_forest.predict(X_new), rtol=0, atol=PREDICTION_TOLERANCE)
+
+    def test_contributions_only_credit_split_features(self, training_data):
+        '''Verify that a feature no tree splits on gets no contribution'''
+        X, y = training_data
+        flat_forest = FlatForest.from_sklearn(RandomForestRegressor(n_estimators=5, random_state=42).fit(X[:, :3], y))
+        # A forest on three features, explained with four columns: the last one is never used
+        X_new = np.hstack([X[:10, :3], np.ones((10, 1))])
+
+        _, contributions = flat_forest.contributions(X_new)
+
+        assert np.all(contributions[:, 3] == 0)
+
+    def test_load_engine_converts_models_without_export(self, training_data, tmp_path):
+        '''Verify that models saved without a flat export are converted at load time'''
+        X, y = training_data
+        model = RandomForestRegressor(n_estimators=5, random_state=42).fit(X, y)
+        bento_model = Mock()
+        bento_model.custom_objects = {}
+        bento_model.info.labels = {}
+        bento_model.path_of.side_effect = lambda name: str(tmp_path / name)
+        bento_model.load_model.return_value = model
+
+        engine = load_engine(bento_model)
+
+        assert isinstance(engine.forest, FlatForest)
+        assert np.array_equal(engine.forest.predict(X), model.predict(X))
+        # The conversion is stored for the other workers, which map it
+        assert (tmp_path / FLAT_FOREST_FILE).exists()
+        assert isinstance(engine.forest.value.base, np.memmap)
+
+    def test_load_engine_refuses_to_convert_depth_capped_models(self, training_data, tmp_path):
+        '''Verify that a depth-capped model without its flat forest is not served from its uncapped sklearn trees'''
+        X, y = training_data
+        bento_model = Mock()
+        bento_model.custom_objects = {}
+        bento_model.info.labels = {'method': 'depth_cap', 'max_depth': '6'}
+        bento_model.path_of.side_effect = lambda name: str(tmp_path / name)
+        bento_model.load_model.return_value = RandomForestRegressor(n_estimators=5, random_state=42).fit(X, y)
+
+        with pytest.raises(ValueError):
+            load_engine(bento_model)
+        assert not (tmp_path / FLAT_FOREST_FILE).exists()
+
+    def test_save_and_load_memory_mapped(self, training_data, tmp_path):
+        '''Verify that a saved forest loads memory-mapped and predicts exactly like the original'''
+        X, y = training_data
+        flat_forest = FlatForest.from_sklearn(RandomForestRegressor(n_estimators=5, random_state=42).fit(X, y))
+        file_path = str(tmp_path / FLAT_FOREST_FILE)
+        flat_forest.save(file_path)
+
+        loaded = FlatForest.load(file_path)
+
+        assert isinstance(loaded.value.base, np.memmap)
+        assert not loaded.value.flags.writeable
+        assert loaded.max_depth == flat_forest.max_depth
+        assert np.array_equal(loaded.predict(X), flat_forest.predict(X))
+
+    def test_load_engine_maps_the_stored_forest(self, training_data, tmp_path):
+        '''Verify that load_engine memory-maps the forest file of the model instead of converting'''
+        X, y = training_data
+        flat_forest = FlatForest.from_sklearn(RandomForestRegressor(n_estimators=5, random_state=42).fit(X, y))
+        flat_forest.save(str(tmp_path / FLAT_FOREST_FILE))
+        bento_model = Mock()
+        bento_model.custom_objects = {}
+        bento_model.path_of.side_effect = lambda name: str(tmp_path / name)
+
+        engine = load_engine(bento_model)
+
+        assert not bento_model.load_model.called
+        assert isinstance(engine.forest.value.base, np.memmap)
+        assert np.array_equal(engine.forest.predict(X), flat_forest.predict(X))
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from src.model.hyperparameter_search import candidates, halving_schedule, pareto_front, search, search_labels, select_candidate
+
+
+def result(rmse, single_row_us, size_bytes):
+    return {'params': {}, 'rmse': rmse, 'single_row_us': single_row_us, 'size_bytes': size_bytes}
+
+
+class TestHyperparameterSearch:
+    '''Test suite for the forest hyperparameter search'''
+
+    def test_candidates_cover_the_grid(self):
+        '''Verify that every parameter combination is a candidate'''
+        grid = candidates({'n_estimators': [10, 20], 'max_depth': [None, 4, 8]})
+
+        assert len(grid) == 6
+        assert {'n_estimators': 20, 'max_depth': None} in grid
+
+    def test_halving_schedule(self):
+        '''Verify that halving shrinks the candidates and grows the rows until the finalists train on all rows'''
+        schedule = halving_schedule(48, 900, factor=3, finalists=6, min_rows=50)
+
+        assert schedule == [(48, 100), (16, 300), (6, 900)]
+        assert halving_schedule(4, 900, finalists=6) == [(4, 900)]
+
+    def test_pareto_front_drops_dominated_results(self):
+        '''Verify that a result worse on every objective than another is not on the front'''
+        accurate, fast, dominated = result(0.05, 40, 4000), result(0.06, 10, 1000), result(0.07, 50, 5000)
+
+        front = pareto_front([accurate, fast, dominated])
+
+        assert accurate in front and fast in front
+        assert dominated not in front
+
+    def test_select_fastest_within_tolerance(self):
+        '''Verify that the fastest front member within the RMSE tolerance is selected'''
+        front = [result(0.0500, 40, 4000), result(0.0504, 20, 2000), result(0.0600, 5, 500)]
+
+        assert select_candidate(front, rmse_tolerance=0.01) is front[1]
+        assert select_candidate(front, rmse_tolerance=0.0) is front[0]
+
+    @pytest.mark.parametrize('schedule', ['grid', 'halving'])
+    def test_search_measures_finalists(self, schedule):
+        '''Verify that a small search times the finalists and selects one of the Pareto front'''
+        rng = np.random.default_rng(42)
+        X = rng.uniform(0, 1, size=(400, 7))
+        y = X @ rng.uniform(0, 1, size=7) + rng.normal(0, 0.05, size=400)
+        space = {'n_estimators': [5, 10], 'max_depth': [None, 3], 'min_samples_leaf': [1, 5]}
+
+        best, evaluations = search(X, y, schedule=schedule, space=space, workers=2)
+
+        finalists = [e for e in evaluations if 'single_row_us' in e]
+        assert finalists and all(e['size_bytes'] > 0 and e['batch_us_per_row'] > 0 for e in finalists)
+        assert best in finalists and best['pareto']
+        labels = search_labels(best)
+        assert all(isinstance(value, str) for value in labels.values())
+        assert labels['n_estimators'] == str(best['params']['n_estimators'])
+
+    def test_unknown_schedule(self):
+        '''Verify that an unknown schedule is rejected'''
+        with pytest.raises(ValueError):
+            search(np.zeros((10, 7)), np.zeros(10), schedule='random')
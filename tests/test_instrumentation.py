@@ -0,0 +1,143 @@
+import asyncio
+import sys
+import time
+import httpx
+from unittest.mock import Mock, patch
+from prometheus_client import CollectorRegistry, Histogram
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from src.instrumentation import InstrumentationMiddleware, SlowRequestProfiler, fold_stack, observe_values, stage
+from src.jwt_middleware import JWTAuthMiddleware, create_jwt_token
+
+
+async def predict(request):
+    with stage('model'):
+        # Blocking on purpose, so the sampled leaf frame is this handler rather than the event loop
+        time.sleep(0.01)
+    return JSONResponse({'admission_chance': 0.5})
+
+
+def run_requests(app, paths: list[str], headers: dict | None = None) -> list[httpx.Response]:
+    async def call():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+            return [await client.post(path, headers=headers) for path in paths]
+    return asyncio.run(call())
+
+
+class TestInstrumentationMiddleware:
+    '''Test suite for per-request stage timing'''
+
+    def make_app(self, **options):
+        app = Starlette(routes=[Route('/predict', predict, methods=['POST']), Route('/health', predict, methods=['POST'])])
+        return InstrumentationMiddleware(JWTAuthMiddleware(app, protected_paths={'/predict'}), routes={'/predict'}, **options)
+
+    def test_request_breakdown(self):
+        '''Verify that auth, handler stages and the framework remainder are recorded per request'''
+        app = self.make_app()
+        with patch.object(InstrumentationMiddleware, 'observe', wraps=app.observe) as observe:
+            responses = run_requests(app, ['/predict'], {'Authorization': f"Bearer {create_jwt_token('user123')}"})
+
+        assert responses[0].status_code == 200
+        endpoint, start, end, stages = observe.call_args[0]
+        assert endpoint == '/predict'
+        assert set(stages) == {'auth', 'model'}
+        assert stages['model'] >= 0.01
+        assert end - start >= sum(stages.values())
+
+    def test_untimed_routes_pass_through(self):
+        '''Verify that paths outside the timed routes are not observed'''
+        app = self.make_app()
+        with patch.object(InstrumentationMiddleware, 'observe') as observe:
+            responses = run_requests(app, ['/health'])
+
+        assert responses[0].status_code == 200
+        assert not observe.called
+
+    def test_slow_requests_are_dumped(self, tmp_path):
+        '''Verify that the stacks of a request over the threshold are written in folded format'''
+        output = tmp_path / 'slow.folded'
+        app = self.make_app(profile_slow_ms=5, profile_output=str(output))
+        app.profiler.interval = 0.001
+        try:
+            run_requests(app, ['/predict'], {'Authorization': f"Bearer {create_jwt_token('user123')}"})
+        finally:
+            app.profiler.stop()
+
+        lines = output.read_text().splitlines()
+        assert lines
+        assert all(line.startswith('predict;') and line.rsplit(' ', 1)[1].isdigit() for line in lines)
+
+
+class TestStage:
+    '''Test suite for the stage timer'''
+
+    def test_disabled_is_shared_noop(self):
+        '''Verify that disabled metrics return the same no-op context manager every time'''
+        with patch('src.instrumentation.METRICS_ENABLED', False):
+            assert stage('model') is stage('features')
+
+    def test_stage_outside_request(self):
+        '''Verify that a stage can be timed outside of an instrumented request'''
+        with stage('model') as timer:
+            pass
+
+        assert timer.name == 'model'
+
+
+class TestObserveValues:
+    '''Test suite for observing many values in a histogram at once'''
+
+    def test_matches_one_observe_per_value(self):
+        '''Verify that bucket counts and sum equal those of observing each value'''
+        registry = CollectorRegistry()
+        buckets = (0.25, 0.5, 0.75, 1.0)
+        one_by_one = Histogram('one_by_one', 'test', buckets=buckets, registry=registry)
+        at_once = Histogram('at_once', 'test', buckets=buckets, registry=registry)
+        values = [0.1, 0.25, 0.3, 0.5, 0.9, 1.0, 1.5]
+
+        for value in values:
+            one_by_one.observe(value)
+        observe_values(at_once, values)
+        observe_values(at_once, [])
+
+        collected = {m.name: {(s.name.replace(m.name, ''), s.labels.get('le')): s.value for s in m.samples if not s.name.endswith('_created')}
+                     for m in registry.collect()}
+        assert collected['one_by_one'] == collected['at_once']
+
+    def test_labelled_child_matches_and_other_layouts_fall_back(self):
+        '''Verify that a labelled child gets the counts of observe(), and histograms without the pinned internals get observe() per value'''
+        registry = CollectorRegistry()
+        histogram = Histogram('labelled', 'test', ['model_version'], buckets=(0.5, 1.0), registry=registry)
+        values = [0.2, 0.5, 0.7, 2.0]
+
+        for value in values:
+            histogram.labels(model_version='a').observe(value)
+        observe_values(histogram.labels(model_version='b'), values)
+        other = Mock(spec=['observe'])
+        observe_values(other, values)
+
+        samples = {(s.name, s.labels['model_version'], s.labels.get('le')): s.value for s in registry.collect()[0].samples
+                   if not s.name.endswith('_created')}
+        assert {k[::2]: v for k, v in samples.items() if k[1] == 'a'} == {k[::2]: v for k, v in samples.items() if k[1] == 'b'}
+        assert [c.args[0] for c in other.observe.call_args_list] == values
+
+
+class TestSlowRequestProfiler:
+    '''Test suite for the sampling profiler'''
+
+    def test_fold_stack(self):
+        '''Verify that a stack is folded root first with file:function entries'''
+        folded = fold_stack(sys._getframe())
+
+        assert folded.endswith('test_instrumentation.py:test_fold_stack')
+
+    def test_fast_requests_are_not_dumped(self, tmp_path):
+        '''Verify that only samples within a slow request window are written'''
+        output = tmp_path / 'slow.folded'
+        profiler = SlowRequestProfiler(threshold_ms=100, output_path=str(output))
+        profiler.samples.extend([(1.0, 'a;b'), (1.05, 'a;b'), (1.2, 'a;c'), (5.0, 'a;d')])
+
+        assert not profiler.request_finished('/predict', 1.0, 1.05)
+        assert profiler.request_finished('/predict', 1.0, 1.2)
+        assert sorted(output.read_text().splitlines()) == ['predict;a;b 2', 'predict;a;c 1']
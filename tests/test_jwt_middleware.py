@@ -0,0 +1,131 @@
+import asyncio
+import httpx
+import jwt
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from src.jwt_middleware import JWTAuthMiddleware, VerifiedTokenCache, create_jwt_token, protected_api_routes, JWT_SECRET_KEY, JWT_ALGORITHM
+
+
+async def whoami(request: Request):
+    return JSONResponse({'user': getattr(request.state, 'user', None)})
+
+
+def make_client(middleware: JWTAuthMiddleware | None = None, **options) -> httpx.AsyncClient:
+    '''Client for a small Starlette app behind the middleware'''
+    app = Starlette(routes=[Route('/predict', whoami, methods=['POST']), Route('/login', whoami, methods=['POST'])])
+    asgi_app = middleware or JWTAuthMiddleware(app, protected_paths={'/predict'}, **options)
+    if middleware is not None:
+        middleware.app = app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url='http://test')
+
+
+def post(client: httpx.AsyncClient, url: str, token: str | None = None) -> httpx.Response:
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+
+    async def call():
+        async with client:
+            return await client.post(url, headers=headers)
+    return asyncio.run(call())
+
+
+class TestJWTAuthMiddleware:
+    '''Test suite for the ASGI JWT middleware'''
+
+    def test_valid_token_sets_user(self):
+        '''Verify that a valid token passes and exposes the user in request.state'''
+        response = post(make_client(), '/predict', create_jwt_token('user123'))
+
+        assert response.status_code == 200
+        assert response.json() == {'user': 'user123'}
+
+    def test_missing_token(self):
+        '''Verify that a protected path without token is rejected'''
+        response = post(make_client(), '/predict')
+
+        assert response.status_code == 401
+        assert response.json() == {'detail': 'Missing authentication token'}
+
+    def test_invalid_and_malformed_tokens(self):
+        '''Verify that invalid tokens and malformed headers are rejected'''
+        assert post(make_client(), '/predict', 'invalid.token.here').json() == {'detail': 'Invalid token'}
+
+        async def call():
+            async with make_client() as client:
+                return await client.post('/predict', headers={'Authorization': 'Bearer'})
+        assert asyncio.run(call()).status_code == 401
+
+    def test_expired_token(self):
+        '''Verify that an expired token is rejected'''
+        payload = {'sub': 'user123', 'exp': (datetime.now(timezone.utc) - timedelta(hours=1)).timestamp()}
+        token = jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+
+        response = post(make_client(), '/predict', token)
+
+        assert response.status_code == 401
+        assert response.json() == {'detail': 'Token has expired'}
+
+    def test_unprotected_path_passes(self):
+        '''Verify that paths outside the protected set need no token'''
+        assert post(make_client(), '/login').status_code == 200
+
+    def test_reused_token_skips_verification(self):
+        '''Verify that a token verified once is served from the cache afterwards'''
+        token = create_jwt_token('user123')
+        middleware = JWTAuthMiddleware(None, protected_paths={'/predict'})
+
+        async def call():
+            async with make_client(middleware) as client:
+                return [await client.post('/predict', headers={'Authorization': f'Bearer {token}'}) for _ in range(5)]
+        with patch('src.jwt_middleware.jwt.decode', wraps=jwt.decode) as decode:
+            responses = asyncio.run(call())
+
+        assert all(r.status_code == 200 for r in responses)
+        assert decode.call_count == 1
+        assert middleware.token_cache.hits == 4
+
+
+class TestProtectedApiRoutes:
+    '''Test suite for deriving the protected paths from a service's API methods'''
+
+    def test_public_apis_are_excluded(self):
+        '''Verify that every API route except the public ones is protected'''
+        apis = {name: SimpleNamespace(route=f'/{name}') for name in ('login', 'predict', 'predict_batch')}
+
+        assert protected_api_routes(apis, {'login'}) == frozenset({'/predict', '/predict_batch'})
+
+    def test_custom_routes_are_used(self):
+        '''Verify that the route of an API method is used rather than its name'''
+        apis = {'predict': SimpleNamespace(route='/v1/predict')}
+
+        assert protected_api_routes(apis) == frozenset({'/v1/predict'})
+
+
+class TestVerifiedTokenCache:
+    '''Test suite for the verified-token cache'''
+
+    def test_entries_expire_with_the_token(self):
+        '''Verify that a cached token is no longer returned after its exp'''
+        cache = VerifiedTokenCache()
+        cache.put('token', {'sub': 'user123', 'exp': 1000.0})
+
+        with patch('src.jwt_middleware.time.time', return_value=999.0):
+            assert cache.get('token') == {'sub': 'user123', 'exp': 1000.0}
+        with patch('src.jwt_middleware.time.time', return_value=1000.0):
+            assert cache.get('token') is None
+        assert len(cache) == 0
+
+    def test_bounded_size(self):
+        '''Verify that the least recently used token is evicted beyond maxsize'''
+        cache = VerifiedTokenCache(maxsize=2)
+        exp = datetime.now(timezone.utc).timestamp() + 3600
+        for token in ('a', 'b', 'c'):
+            cache.put(token, {'sub': token, 'exp': exp})
+
+        assert len(cache) == 2
+        assert cache.get('a') is None
+        assert cache.get('c') is not None
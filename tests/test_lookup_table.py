@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from unittest.mock import Mock, patch
+from src.model.lookup_table import LookupTable, accuracy_report
+from src.service import UniversityAdmissionService, InputModel
+
+# Small grid over the feature columns, with CGPA bucketed at 0.5
+SMALL_GRID = {
+    'GRE Score': (300, 304, 1, False),
+    'TOEFL Score': (100, 102, 1, False),
+    'University Rating': (1, 5, 1, False),
+    'SOP': (1.0, 5.0, 0.5, False),
+    'LOR ': (3.0, 4.0, 0.5, False),
+    'CGPA': (8.0, 9.0, 0.5, True),
+    'Research': (0, 1, 1, False)
+}
+
+
+class LinearModel:
+    '''Stand-in model with a different output for every grid point'''
+
+    def predict(self, X):
+        return np.asarray(X) @ np.array([1e-3, 1e-2, 0.1, 0.2, 0.3, 0.4, 0.5])
+
+
+class TestLookupTable:
+    '''Test suite for the precomputed lookup table'''
+
+    def test_on_grid_lookups_match_model(self):
+        '''Verify that lookups on grid points return the model output'''
+        model = LinearModel()
+        lookup_table = LookupTable.build(model, SMALL_GRID)
+        X = np.array([[300, 100, 1, 1.0, 3.0, 8.0, 0], [304, 102, 5, 5.0, 4.0, 9.0, 1], [302, 101, 3, 2.5, 3.5, 8.5, 1]])
+
+        assert lookup_table.table.shape == (5, 3, 5, 9, 3, 3, 2)
+        np.testing.assert_allclose(lookup_table.lookup(X), model.predict(X), rtol=1e-6)
+
+    def test_cgpa_is_bucketed_and_off_grid_rows_miss(self):
+        '''Verify that CGPA rounds to the nearest bucket while other off-grid values return NaN'''
+        lookup_table = LookupTable.build(LinearModel(), SMALL_GRID)
+        X = np.array([
+            [300, 100, 1, 1.0, 3.0, 8.2, 0],   # CGPA bucketed to 8.0
+            [300, 100, 1, 1.0, 3.0, 9.2, 0],   # CGPA bucketed to 9.0 (within half a step)
+            [299, 100, 1, 1.0, 3.0, 8.0, 0],   # GRE below grid
+            [300, 100, 1, 1.2, 3.0, 8.0, 0],   # SOP not a half step
+            [300, 100, 1, 1.0, 3.0, 9.5, 0]    # CGPA above grid
+        ])
+
+        result = lookup_table.lookup(X)
+
+        assert result[0] == lookup_table.table[0, 0, 0, 0, 0, 0, 0]
+        assert result[1] == lookup_table.table[0, 0, 0, 0, 0, 2, 0]
+        assert np.isnan(result[2:]).all()
+
+    def test_build_to_file_and_load_memory_mapped(self, tmp_path):
+        '''Verify that a table written to disk loads memory-mapped with its grid and model tag'''
+        table_path = str(tmp_path / 'lut.npy')
+        built = LookupTable.build(LinearModel(), SMALL_GRID, out_path=table_path, model_tag='model:v1')
+
+        loaded = LookupTable.load(table_path)
+
+        assert isinstance(loaded.table, np.memmap)
+        assert loaded.model_tag == 'model:v1'
+        assert loaded.grid == SMALL_GRID
+        np.testing.assert_array_equal(loaded.table, built.table)
+
+    def test_accuracy_report(self):
+        '''Verify that the accuracy report measures coverage and bucketing error'''
+        model = LinearModel()
+        lookup_table = LookupTable.build(model, SMALL_GRID)
+        X = np.array([[300, 100, 1, 1.0, 3.0, 8.2, 0], [299, 100, 1, 1.0, 3.0, 8.0, 0]])
+
+        report = accuracy_report(lookup_table, model, X)
+
+        assert report['coverage'] == 0.5
+        assert report['max_abs_error'] == pytest.approx(0.2 * 0.4, rel=1e-5)
+
+    @patch('src.service.bentoml.models.get')
+    def test_service_falls_back_to_model_off_grid(self, mock_model_get):
+        '''Verify that lookup table mode only runs the model for inputs outside the grid'''
+        mock_model = Mock()
+        mock_model.predict.return_value = [0.5]
+        mock_model_get.return_value.custom_objects = {'flat_forest': mock_model}
+        lookup_table = LookupTable.build(LinearModel(), SMALL_GRID)
+        with patch('src.service.SERVING_MODE', 'lookup_table'), patch('src.service.load_lookup_table', return_value=lookup_table):
+            service = UniversityAdmissionService()
+        on_grid = InputModel(gre_score=300, toefl_score=100, university_rating=1, sop=1.0, lor=3.0, cgpa=8.0, research=0)
+        off_grid = InputModel(gre_score=330, toefl_score=100, university_rating=1, sop=1.0, lor=3.0, cgpa=8.0, research=0)
+
+        results = service.predict_adaptive([on_grid, off_grid])
+
+        assert results[0]['admission_chance'] == pytest.approx(float(lookup_table.table[0, 0, 0, 0, 0, 0, 0]))
+        assert results[1]['admission_chance'] == 0.5
+        assert mock_model.predict.call_count == 1
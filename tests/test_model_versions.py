@@ -0,0 +1,170 @@
+from unittest.mock import Mock, patch
+import numpy as np
+from src.cache import PredictionCache
+from src.model_versions import ModelRouter, ModelVersion, ModelWatcher
+from src.service import UniversityAdmissionService, InputModel
+
+
+def version(tag: str, prediction: float = 0.5) -> ModelVersion:
+    model = Mock()
+    model.predict.side_effect = lambda X: np.full(len(X), prediction)
+    return ModelVersion(tag, model, PredictionCache(0))
+
+
+def store_model(tag: str, flat_forest=None) -> Mock:
+    bento_model = Mock()
+    bento_model.tag = tag
+    bento_model.custom_objects = {'flat_forest': flat_forest} if flat_forest is not None else {}
+    return bento_model
+
+
+class TestModelRouter:
+    '''Test suite for routing requests between model versions'''
+
+    def test_install_replaces_active_without_canary(self):
+        '''Verify that a new version replaces the active one at once when no canary fraction is set'''
+        router = ModelRouter(version('model:v1'))
+        new = version('model:v2')
+
+        router.install(new)
+
+        assert router.route() is new
+        assert router.tags == {'model:v2'}
+
+    def test_canary_gets_its_share(self):
+        '''Verify that a canary serves about its fraction of the requests'''
+        old, new = version('model:v1'), version('model:v2')
+        router = ModelRouter(old, canary_fraction=0.2, promote_after=3600)
+
+        router.install(new)
+        routed = [router.route() for _ in range(5000)]
+
+        assert router.tags == {'model:v1', 'model:v2'}
+        assert 0.15 < sum(v is new for v in routed) / len(routed) < 0.25
+
+    def test_canary_promoted_after_delay(self):
+        '''Verify that the canary becomes the active version once its trial period is over'''
+        old, new = version('model:v1'), version('model:v2')
+        router = ModelRouter(old, canary_fraction=0.1, promote_after=0)
+
+        router.install(new)
+
+        assert router.route() is new
+        assert router.active is new and router.canary is None
+
+    def test_stale_canary_not_promoted(self):
+        '''Verify that a canary replaced by a newer one is not promoted'''
+        router = ModelRouter(version('model:v1'), canary_fraction=0.1, promote_after=3600)
+        first, second = version('model:v2'), version('model:v3')
+        router.install(first)
+        router.install(second)
+
+        router.promote(first)
+
+        assert router.active.tag == 'model:v1' and router.canary is second
+
+
+class TestModelVersion:
+    '''Test suite for the per-version state'''
+
+    def test_observe_skips_metrics_when_disabled(self):
+        '''Verify that ADMISSION_METRICS=0 leaves the per-version histograms alone'''
+        model_version = version('model:v1')
+        model_version._duration, model_version._predictions = Mock(), Mock()
+
+        with patch('src.model_versions.METRICS_ENABLED', False):
+            model_version.observe(0.001, np.zeros((64, 7)), [0.5] * 64)
+
+        assert not model_version._duration.observe.called
+        assert not model_version._predictions.observe.called
+
+
+class TestModelWatcher:
+    '''Test suite for picking up new model versions from the store'''
+
+    @patch('src.model_versions.bentoml.models.get')
+    def test_new_tag_is_loaded_and_installed(self, mock_model_get):
+        '''Verify that a new tag is loaded off the router and then installed, and an unchanged one is ignored'''
+        router = ModelRouter(version('model:v1'))
+        new = version('model:v2')
+        load_version = Mock(return_value=new)
+        watcher = ModelWatcher('model:latest', router, load_version)
+
+        mock_model_get.return_value = store_model('model:v1', Mock())
+        assert not watcher.check()
+        mock_model_get.return_value = store_model('model:v2', Mock())
+        assert watcher.check()
+
+        assert router.active is new
+        assert load_version.call_count == 1
+        assert not watcher.check()
+
+    @patch('src.model_versions.bentoml.models.get')
+    def test_failed_load_keeps_the_active_version(self, mock_model_get):
+        '''Verify that a version failing to load is skipped until its retry delay is over'''
+        active = version('model:v1')
+        router = ModelRouter(active)
+        load_version = Mock(side_effect=ValueError('corrupt model'))
+        watcher = ModelWatcher('model:latest', router, load_version, retry_delay=3600)
+        mock_model_get.return_value = store_model('model:v2', Mock())
+
+        assert not watcher.check()
+        assert not watcher.check()
+
+        assert router.active is active
+        assert load_version.call_count == 1
+
+    @patch('src.model_versions.bentoml.models.get')
+    def test_failed_load_is_retried_with_backoff(self, mock_model_get):
+        '''Verify that a version failing to load is retried with a doubling delay and installed once it loads'''
+        router = ModelRouter(version('model:v1'))
+        new = version('model:v2')
+        load_version = Mock(side_effect=[OSError('store busy'), OSError('store busy'), new])
+        watcher = ModelWatcher('model:latest', router, load_version, retry_delay=0, max_retry_delay=0)
+        mock_model_get.return_value = store_model('model:v2', Mock())
+
+        assert not watcher.check()
+        assert not watcher.check()
+        assert watcher.check()
+
+        assert router.active is new
+        assert load_version.call_count == 3
+
+    @patch('src.model_versions.bentoml.models.get')
+    def test_retry_delay_doubles_up_to_the_limit(self, mock_model_get):
+        '''Verify that each failure doubles the delay before the next attempt, up to max_retry_delay'''
+        load_version = Mock(side_effect=ValueError('corrupt model'))
+        watcher = ModelWatcher('model:latest', ModelRouter(version('model:v1')), load_version, retry_delay=10, max_retry_delay=25)
+        mock_model_get.return_value = store_model('model:v2', Mock())
+        attempts = []
+
+        for second in range(80):
+            with patch('src.model_versions.time.monotonic', return_value=1000.0 + second):
+                calls = load_version.call_count
+                watcher.check()
+                if load_version.call_count > calls:
+                    attempts.append(second)
+
+        assert attempts == [0, 10, 30, 55]
+
+
+class TestServiceReload:
+    '''Test suite for hot model reloads in the service'''
+
+    @patch('src.model_versions.bentoml.models.get')
+    @patch('src.service.bentoml.models.get')
+    def test_reload_swaps_the_served_model(self, mock_service_get, mock_watcher_get):
+        '''Verify that requests after a reload are served by the new model with a fresh cache'''
+        old_forest, new_forest = Mock(), Mock()
+        old_forest.predict.return_value = np.array([0.4])
+        new_forest.predict.return_value = np.array([0.9])
+        mock_service_get.return_value = store_model('model:v1', old_forest)
+        service = UniversityAdmissionService()
+        input_data = InputModel(gre_score=320, toefl_score=110, university_rating=4, sop=4.5, lor=4.0, cgpa=9.0, research=1)
+        assert service.predict(input_data) == {'admission_chance': 0.4}
+
+        mock_service_get.return_value = mock_watcher_get.return_value = store_model('model:v2', new_forest)
+        assert service.watcher.check()
+
+        assert service.predict(input_data) == {'admission_chance': 0.9}
+        assert service.cache.model_tag == 'model:v2'
@@ -0,0 +1,49 @@
+import joblib
+import numpy as np
+from unittest.mock import patch
+from sklearn.ensemble import RandomForestRegressor
+from src.data.prepare_data import load_split, prepare_data
+from src.data.synthetic_data import generate_admission_data
+from src.features import FEATURE_COLUMNS, FEATURE_MAX_SCORES, INPUT_FIELDS, SCALER_FILE
+from src.model.flat_forest import FlatForest
+from src.service import UniversityAdmissionService, InputModel
+
+
+def make_raw_admissions(file_path, n_rows=200):
+    '''Write a synthetic raw admission.csv with the original columns and value grids'''
+    generate_admission_data(n_rows, seed=7).to_csv(file_path, index=False)
+
+
+class TestTrainServeParity:
+    '''Test suite for the feature scaling parity between training and serving'''
+
+    @patch('src.service.bentoml.models.get')
+    def test_served_raw_inputs_match_offline_predictions(self, mock_model_get, tmp_path):
+        '''Verify that serving raw inputs reproduces offline predictions on the processed CSVs'''
+        raw_file = tmp_path / 'admission.csv'
+        make_raw_admissions(raw_file)
+        prepare_data(str(raw_file), str(tmp_path))
+
+        X_train = load_split(str(tmp_path), 'X_train')
+        y_train = load_split(str(tmp_path), 'y_train')
+        X_test = load_split(str(tmp_path), 'X_test')
+        model = RandomForestRegressor(n_estimators=20, n_jobs=1, random_state=42).fit(X_train, y_train)
+        offline = model.predict(X_test)
+
+        # Serve the model the way train_model stores it
+        mock_model_get.return_value.custom_objects = {
+            'flat_forest': FlatForest.from_sklearn(model),
+            'scaler': joblib.load(tmp_path / SCALER_FILE)
+        }
+        service = UniversityAdmissionService()
+
+        # Recover the raw applicant values (at most two decimals) from the processed test split
+        max_scores = np.array([FEATURE_MAX_SCORES.get(c, 1) for c in FEATURE_COLUMNS])
+        raw_rows = np.round(X_test * max_scores, 2)
+        inputs = [InputModel(**dict(zip(INPUT_FIELDS, row))) for row in raw_rows.tolist()]
+
+        served = [service.predict(i)['admission_chance'] for i in inputs]
+        served_batch = [r['admission_chance'] for r in service.predict_adaptive(inputs)]
+
+        np.testing.assert_array_equal(served, offline)
+        np.testing.assert_array_equal(served_batch, offline)
@@ -1,9 +1,16 @@
+import asyncio
+import httpx
 import pytest
 import jwt
+import numpy as np
 from datetime import datetime, timedelta, timezone
 from unittest.mock import Mock, patch
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
 from src.service import UniversityAdmissionService, InputModel
-from src.jwt_middleware import create_jwt_token, JWT_SECRET_KEY, JWT_ALGORITHM, USERS
+from src.credentials import LoginRateLimiter
+from src.jwt_middleware import JWTAuthMiddleware, create_jwt_token, JWT_SECRET_KEY, JWT_ALGORITHM
 
 
 class TestJWTAuthentication:
@@ -64,7 +71,7 @@ class TestLoginAPI:
     def test_login_with_valid_credentials(self, mock_model_get):
         '''Verify that the API returns a valid JWT token for correct user credentials'''
         # Mock the model loading
-        mock_model_get.return_value.load_model.return_value = Mock()
+        mock_model_get.return_value.custom_objects = {'flat_forest': Mock()}
         
         # Create service instance
         service = UniversityAdmissionService()
@@ -75,7 +82,7 @@ class TestLoginAPI:
             'password': 'password123'
         }
         
-        result = service.login(credentials)
+        result = asyncio.run(service.login(credentials))
         
         # Verify token is returned
         assert 'token' in result
@@ -90,7 +97,7 @@ class TestLoginAPI:
     def test_login_with_invalid_username(self, mock_model_get):
         '''Verify that the API returns a 401 error for incorrect username'''
         # Mock the model loading
-        mock_model_get.return_value.load_model.return_value = Mock()
+        mock_model_get.return_value.custom_objects = {'flat_forest': Mock()}
         
         # Create service instance
         service = UniversityAdmissionService()
@@ -101,7 +108,7 @@ class TestLoginAPI:
             'password': 'password123'
         }
         
-        result = service.login(credentials)
+        result = asyncio.run(service.login(credentials))
         
         # Verify 401 response
         assert hasattr(result, 'status_code')
@@ -111,7 +118,7 @@ class TestLoginAPI:
     def test_login_with_invalid_password(self, mock_model_get):
         '''Verify that the API returns a 401 error for incorrect password'''
         # Mock the model loading
-        mock_model_get.return_value.load_model.return_value = Mock()
+        mock_model_get.return_value.custom_objects = {'flat_forest': Mock()}
         
         # Create service instance
         service = UniversityAdmissionService()
@@ -122,7 +129,7 @@ class TestLoginAPI:
             'password': 'wrong_password'
         }
         
-        result = service.login(credentials)
+        result = asyncio.run(service.login(credentials))
         
         # Verify 401 response
         assert hasattr(result, 'status_code')
@@ -132,7 +139,7 @@ class TestLoginAPI:
     def test_login_with_missing_username(self, mock_model_get):
         '''Verify that the API returns a 401 error for missing username'''
         # Mock the model loading
-        mock_model_get.return_value.load_model.return_value = Mock()
+        mock_model_get.return_value.custom_objects = {'flat_forest': Mock()}
         
         # Create service instance
         service = UniversityAdmissionService()
@@ -142,7 +149,7 @@ class TestLoginAPI:
             'password': 'password123'
         }
         
-        result = service.login(credentials)
+        result = asyncio.run(service.login(credentials))
         
         # Verify 401 response
         assert hasattr(result, 'status_code')
@@ -152,7 +159,7 @@ class TestLoginAPI:
     def test_login_with_missing_password(self, mock_model_get):
         '''Verify that the API returns a 401 error for missing password'''
         # Mock the model loading
-        mock_model_get.return_value.load_model.return_value = Mock()
+        mock_model_get.return_value.custom_objects = {'flat_forest': Mock()}
         
         # Create service instance
         service = UniversityAdmissionService()
@@ -162,11 +169,74 @@ class TestLoginAPI:
             'username': 'user123'
         }
         
-        result = service.login(credentials)
+        result = asyncio.run(service.login(credentials))
         
         # Verify 401 response
         assert hasattr(result, 'status_code')
         assert result.status_code == 401
+    
+    @patch('src.service.bentoml.models.get')
+    def test_login_rate_limited_per_user(self, mock_model_get):
+        '''Verify that a user beyond the login burst gets 429 without a password check'''
+        # Mock the model loading
+        mock_model_get.return_value.custom_objects = {'flat_forest': Mock()}
+        
+        # Create service instance
+        service = UniversityAdmissionService()
+        service.login_limiter = LoginRateLimiter(per_minute=1, burst=3)
+        credentials = {'username': 'user123', 'password': 'wrong_password'}
+        
+        async def attempts():
+            return [await service.login(credentials) for _ in range(4)]
+        with patch.object(service.credentials, 'verify', wraps=service.credentials.verify) as verify:
+            results = asyncio.run(attempts())
+        
+        # Verify the burst is checked and the next attempt is rejected
+        assert [r.status_code for r in results] == [401, 401, 401, 429]
+        assert verify.call_count == 3
+
+
+class TestServiceAuthentication:
+    '''Test suite for the JWT middleware mounted on the service'''
+
+    @staticmethod
+    def registered_options() -> dict:
+        options = [options for cls, options in UniversityAdmissionService.middlewares if cls is JWTAuthMiddleware]
+        assert len(options) == 1
+        return options[0]
+
+    def test_middleware_protects_every_api_but_login(self):
+        '''Verify that the middleware is registered for all API routes except login'''
+        protected = self.registered_options()['protected_paths']
+
+        assert protected == {'/predict', '/predict_async', '/predict_adaptive', '/predict_batch', '/predict_batch_file',
+                             '/explain', '/fast/predict', '/fast/predict_batch'}
+        assert UniversityAdmissionService.apis['login'].route not in protected
+
+    def test_concurrent_requests(self):
+        '''Verify authentication of concurrent requests on the service routes through an ASGI client'''
+        async def ok(request):
+            return JSONResponse({'user': getattr(request.state, 'user', None)})
+
+        paths = {api.route for api in UniversityAdmissionService.apis.values()} | self.registered_options()['protected_paths']
+        routes = [Route(path, ok, methods=['POST']) for path in paths]
+        app = JWTAuthMiddleware(Starlette(routes=routes), **self.registered_options())
+        token = create_jwt_token('user123')
+        requests = [(path, token if i % 2 else None) for i, path in enumerate(sorted(self.registered_options()['protected_paths']) * 50)]
+
+        async def call():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+                return await asyncio.gather(*(
+                    client.post(path, headers={'Authorization': f'Bearer {t}'} if t else {}) for path, t in requests
+                ), client.post('/login'))
+        with patch('src.jwt_middleware.jwt.decode', wraps=jwt.decode) as decode:
+            *responses, login = asyncio.run(call())
+
+        assert [r.status_code for r in responses] == [200 if t else 401 for _, t in requests]
+        assert all(r.json() == {'user': 'user123'} for r in responses if r.status_code == 200)
+        assert login.status_code == 200
+        # The token is verified once, every other request is served from the cache
+        assert decode.call_count == 1
 
 
 class TestPredictionAPI:
@@ -178,7 +248,7 @@ class TestPredictionAPI:
         # Mock the model
         mock_model = Mock()
         mock_model.predict.return_value = [0.85]
-        mock_model_get.return_value.load_model.return_value = mock_model
+        mock_model_get.return_value.custom_objects = {'flat_forest': mock_model}
         
         # Create service instance
         service = UniversityAdmissionService()
@@ -207,7 +277,7 @@ class TestPredictionAPI:
         # Mock the model
         mock_model = Mock()
         mock_model.predict.return_value = [0.15]
-        mock_model_get.return_value.load_model.return_value = mock_model
+        mock_model_get.return_value.custom_objects = {'flat_forest': mock_model}
         
         # Create service instance
         service = UniversityAdmissionService()
@@ -235,7 +305,7 @@ class TestPredictionAPI:
         # Mock the model
         mock_model = Mock()
         mock_model.predict.return_value = [0.95]
-        mock_model_get.return_value.load_model.return_value = mock_model
+        mock_model_get.return_value.custom_objects = {'flat_forest': mock_model}
         
         # Create service instance
         service = UniversityAdmissionService()
@@ -286,12 +356,12 @@ class TestPredictionAPI:
             )
     
     @patch('src.service.bentoml.models.get')
-    def test_predict_dataframe_column_names(self, mock_model_get):
-        '''Verify that the DataFrame passed to model has correct column names'''
+    def test_predict_row_in_feature_order(self, mock_model_get):
+        '''Verify that the row passed to model follows the training column order'''
         # Mock the model
         mock_model = Mock()
         mock_model.predict.return_value = [0.85]
-        mock_model_get.return_value.load_model.return_value = mock_model
+        mock_model_get.return_value.custom_objects = {'flat_forest': mock_model}
         
         # Create service instance
         service = UniversityAdmissionService()
@@ -312,12 +382,98 @@ class TestPredictionAPI:
         # Verify predict was called
         assert mock_model.predict.called
         
-        # Get the DataFrame that was passed to predict
+        # Get the row that was passed to predict
         call_args = mock_model.predict.call_args[0][0]
         
-        # Verify column names match training data format
-        expected_columns = ['GRE Score', 'TOEFL Score', 'University Rating', 'SOP', 'LOR ', 'CGPA', 'Research']
-        assert list(call_args.columns) == expected_columns
+        # Verify values follow the training data format: GRE Score,TOEFL Score,University Rating,SOP,LOR ,CGPA,Research
+        # and are scaled by the max scores like the training data
+        assert isinstance(call_args, np.ndarray)
+        np.testing.assert_allclose(call_args, [[320 / 340, 110 / 120, 4 / 5, 4.5 / 5, 4.0 / 5, 9.0 / 10, 1]])
+    
+    @patch('src.service.bentoml.models.get')
+    def test_predict_adaptive_runs_model_once_per_batch(self, mock_model_get):
+        '''Verify that the batchable endpoint predicts a merged batch with a single model call'''
+        # Mock the model
+        mock_model = Mock()
+        mock_model.predict.return_value = [0.85, 0.45]
+        mock_model_get.return_value.custom_objects = {'flat_forest': mock_model}
+        
+        # Create service instance
+        service = UniversityAdmissionService()
+        
+        # Create a batch of two inputs
+        inputs = [
+            InputModel(gre_score=320, toefl_score=110, university_rating=4, sop=4.5, lor=4.0, cgpa=9.0, research=1),
+            InputModel(gre_score=300, toefl_score=95, university_rating=2, sop=3.0, lor=2.5, cgpa=7.5, research=0)
+        ]
+        
+        result = service.predict_adaptive(inputs)
+        
+        # Verify one result per input, in order, from one model call
+        assert result == [{'admission_chance': 0.85}, {'admission_chance': 0.45}]
+        assert mock_model.predict.call_count == 1
+        assert len(mock_model.predict.call_args[0][0]) == 2
+
+
+    @patch('src.service.bentoml.models.get')
+    def test_explain(self, mock_model_get):
+        '''Verify that explain returns the baseline and named contributions, and caches them per input'''
+        mock_forest = Mock()
+        mock_forest.contributions.side_effect = lambda X: (0.5, np.tile([0.1, 0.05, 0.0, 0.0, 0.0, 0.2, 0.0], (len(X), 1)))
+        mock_model_get.return_value.custom_objects = {'flat_forest': mock_forest}
+        service = UniversityAdmissionService()
+        input_data = InputModel(gre_score=320, toefl_score=110, university_rating=4, sop=4.5, lor=4.0, cgpa=9.0, research=1)
+
+        first = service.explain([input_data, input_data])
+        second = service.explain([input_data])
+
+        assert first[0]['admission_chance'] == pytest.approx(0.85)
+        assert first[0]['baseline'] == 0.5
+        assert first[0]['contributions'] == {'gre_score': 0.1, 'toefl_score': 0.05, 'university_rating': 0.0, 'sop': 0.0,
+                                             'lor': 0.0, 'cgpa': 0.2, 'research': 0.0}
+        assert second == first[:1]
+        # Both rows of the first call are explained together, the second call hits the cache
+        assert mock_forest.contributions.call_count == 1
+        # Explanations have a cache of their own and leave the prediction cache's counters alone
+        explanation_cache = service.models.active.explanation_cache
+        assert explanation_cache.stats()['hits'] == 1 and explanation_cache.name == 'explanations'
+        assert service.cache.stats()['hits'] == service.cache.stats()['misses'] == 0
+
+    @patch('src.service.SERVING_MODE', 'lookup_table')
+    @patch('src.service.load_lookup_table')
+    @patch('src.service.bentoml.models.get')
+    def test_explain_returns_the_served_prediction_in_lookup_table_mode(self, mock_model_get, mock_load_lookup_table):
+        '''Verify that explain's admission_chance is the lookup table's like predict's, and the forest's off the grid'''
+        mock_forest = Mock()
+        mock_forest.contributions.side_effect = lambda X: (0.5, np.tile([0.1, 0.05, 0.0, 0.0, 0.0, 0.2, 0.0], (len(X), 1)))
+        mock_model_get.return_value.custom_objects = {'flat_forest': mock_forest}
+        mock_load_lookup_table.return_value.lookup.side_effect = lambda X: np.array([0.84, np.nan])[:len(X)]
+        service = UniversityAdmissionService()
+        inputs = [
+            InputModel(gre_score=320, toefl_score=110, university_rating=4, sop=4.5, lor=4.0, cgpa=9.0, research=1),
+            InputModel(gre_score=321, toefl_score=110, university_rating=4, sop=4.5, lor=4.0, cgpa=9.0, research=1)
+        ]
+
+        on_grid, off_grid = service.explain(inputs)
+
+        assert on_grid['admission_chance'] == 0.84
+        assert off_grid['admission_chance'] == pytest.approx(0.85)
+        assert on_grid['baseline'] == 0.5 and on_grid['contributions'] == off_grid['contributions']
+
+    @patch('src.service.WARMUP_ROWS', 16)
+    @patch('src.service.bentoml.models.get')
+    def test_warm_up_at_startup(self, mock_model_get):
+        '''Verify that the service predicts a synthetic batch at startup without filling the cache'''
+        # Mock the model
+        mock_model = Mock()
+        mock_model_get.return_value.custom_objects = {'flat_forest': mock_model}
+        
+        # Create service instance
+        service = UniversityAdmissionService()
+        
+        # Verify the warm-up batch went straight to the model
+        assert mock_model.predict.call_args[0][0].shape == (16, 7)
+        assert len(service.cache) == 0
 
 
 class TestInputModelValidation:
@@ -0,0 +1,60 @@
+import hashlib
+import os
+from unittest.mock import patch
+from src.data.stage_cache import StageCache, file_digest
+
+
+def write(file_path, content: bytes, mtime_ns: int | None = None):
+    file_path.write_bytes(content)
+    if mtime_ns is not None:
+        os.utime(file_path, ns=(mtime_ns, mtime_ns))
+
+
+class TestStageCache:
+    '''Test suite for the content-hash based stage cache'''
+
+    def test_file_digest(self, tmp_path):
+        '''Verify that the chunked digest equals the SHA-256 of the whole content'''
+        content = os.urandom(3 * 1024 * 1024 + 17)
+        write(tmp_path / 'raw.csv', content)
+
+        assert file_digest(str(tmp_path / 'raw.csv')) == hashlib.sha256(content).hexdigest()
+
+    def test_fresh_after_record(self, tmp_path):
+        '''Verify that a recorded stage is fresh until its input, parameters or outputs change'''
+        write(tmp_path / 'raw.csv', b'a,b\n1,2\n')
+        write(tmp_path / 'out.npy', b'output')
+        inputs, outputs = {'raw': str(tmp_path / 'raw.csv')}, {'out': str(tmp_path / 'out.npy')}
+        StageCache(str(tmp_path / 'manifest.json')).record(inputs, {'test_size': 0.2}, outputs)
+
+        cache = StageCache(str(tmp_path / 'manifest.json'))
+        assert cache.is_fresh(inputs, {'test_size': 0.2}, outputs)
+        assert not cache.is_fresh(inputs, {'test_size': 0.3}, outputs)
+
+        write(tmp_path / 'out.npy', b'modified output')
+        assert not cache.is_fresh(inputs, {'test_size': 0.2}, outputs)
+
+    def test_touched_input_with_same_content_is_fresh(self, tmp_path):
+        '''Verify that freshness follows the input content, not its modification time'''
+        write(tmp_path / 'raw.csv', b'a,b\n1,2\n', mtime_ns=1_000_000_000)
+        write(tmp_path / 'out.npy', b'output')
+        inputs, outputs = {'raw': str(tmp_path / 'raw.csv')}, {'out': str(tmp_path / 'out.npy')}
+        cache = StageCache(str(tmp_path / 'manifest.json'))
+        cache.record(inputs, {}, outputs)
+
+        write(tmp_path / 'raw.csv', b'a,b\n1,2\n', mtime_ns=2_000_000_000)
+        assert cache.is_fresh(inputs, {}, outputs)
+
+        write(tmp_path / 'raw.csv', b'a,b\n1,3\n', mtime_ns=3_000_000_000)
+        assert not cache.is_fresh(inputs, {}, outputs)
+
+    def test_unchanged_inputs_are_not_rehashed(self, tmp_path):
+        '''Verify that inputs with the recorded size and mtime reuse the recorded digest'''
+        write(tmp_path / 'raw.csv', b'a,b\n1,2\n')
+        inputs = {'raw': str(tmp_path / 'raw.csv')}
+        cache = StageCache(str(tmp_path / 'manifest.json'))
+        cache.record(inputs, {}, {})
+
+        with patch('src.data.stage_cache.file_digest') as digest:
+            assert cache.is_fresh(inputs, {}, {})
+        assert not digest.called
@@ -0,0 +1,29 @@
+import pandas as pd
+from src.data.synthetic_data import generate_admission_data
+from src.features import ID_COLUMN, TARGET_COLUMN, FEATURE_COLUMNS, FEATURE_MAX_SCORES
+
+
+class TestSyntheticData:
+    '''Test suite for the synthetic admission data generator'''
+
+    def test_schema_matches_admission_csv(self):
+        '''Verify that the columns and their order match the raw admission.csv'''
+        df = generate_admission_data(100)
+
+        assert list(df.columns) == [ID_COLUMN] + list(FEATURE_COLUMNS) + [TARGET_COLUMN]
+        assert len(df) == 100
+        assert not df.isna().any().any()
+
+    def test_values_within_score_ranges(self):
+        '''Verify that every score lies within its scale and the target is a probability'''
+        df = generate_admission_data(1000)
+
+        for column, max_score in FEATURE_MAX_SCORES.items():
+            assert df[column].between(0, max_score).all()
+        assert set(df['Research']) <= {0, 1}
+        assert df[TARGET_COLUMN].between(0, 1).all()
+
+    def test_reproducible(self):
+        '''Verify that the same seed gives the same data and another seed does not'''
+        pd.testing.assert_frame_equal(generate_admission_data(50, seed=3), generate_admission_data(50, seed=3))
+        assert not generate_admission_data(50, seed=3).equals(generate_admission_data(50, seed=4))
@@ -0,0 +1,34 @@
+from contextlib import contextmanager
+from unittest.mock import Mock, patch
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from src.model.flat_forest import FlatForest, FLAT_FOREST_FILE
+from src.model.train_model import SKLEARN_MODEL_FILE, save_bento_model
+
+
+class TestSaveBentoModel:
+    '''Test suite for saving models to the BentoML store'''
+
+    @patch('src.model.train_model.bentoml.models.create')
+    def test_flat_forest_written_before_the_model_is_stored(self, mock_create, tmp_path):
+        '''Verify that the model and its flat forest both exist when the store entry is committed'''
+        committed = []
+
+        @contextmanager
+        def create(name, **kwargs):
+            bento_model = Mock()
+            bento_model.path_of.side_effect = lambda name: str(tmp_path / name)
+            yield bento_model
+            # Leaving the context is what saves the entry to the store and moves ':latest'
+            committed.extend(sorted(p.name for p in tmp_path.iterdir()))
+
+        mock_create.side_effect = create
+        rng = np.random.default_rng(0)
+        model = RandomForestRegressor(n_estimators=3, random_state=0).fit(rng.uniform(size=(50, 7)), rng.uniform(size=50))
+
+        save_bento_model('model', model, FlatForest.from_sklearn(model), custom_objects={'scaler': None})
+
+        assert committed == sorted([FLAT_FOREST_FILE, SKLEARN_MODEL_FILE])
+        assert mock_create.call_args.kwargs['module'] == 'bentoml.sklearn'
+        assert len(joblib.load(tmp_path / SKLEARN_MODEL_FILE).estimators_) == 3